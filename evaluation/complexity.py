@@ -1,7 +1,3 @@
-import glob
-
-
-
 import matplotlib
 import matplotlib.pyplot as plt
 
@@ -15,12 +11,13 @@ import numpy as np
 
 
 
-from subgraph_enumeration.kavosh.enumerate import CreateDirectoryStructure
-from subgraph_enumeration.utilities.dataIO import ReadGraph
+from subgraph_enumeration.evaluation.scheduling import PrintScheduleStatistics
+from subgraph_enumeration.kavosh.enumerate import CreateDirectoryStructure, CertificateFilenames
+from subgraph_enumeration.utilities.dataIO import ReadGraph, ReadCertificateRecords
 
 
 
-def PrintRunningTimeStatistics(graph, input_filename, motif_size, vertex_colored = False, edge_colored = False, community_based = False):
+def PrintRunningTimeStatistics(graph, input_filename, motif_size, vertex_colored = False, edge_colored = False, community_based = False, nworkers = None):
     """
     Print statistics for the running times for each vertex in the graph
 
@@ -30,12 +27,13 @@ def PrintRunningTimeStatistics(graph, input_filename, motif_size, vertex_colored
     @param vertex_colored: a boolean flag to allow for vertex colors
     @param edge_colored: a boolean flag to allow for edge colors
     @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param nworkers: also simulate the scheduling strategies for this many workers
     """
     # get the temp directory
     temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, False)
 
     # get a list of all the input filenames for this motif size
-    filenames = sorted(glob.glob('{}/certificates/motif-size-{:03d}-*.txt'.format(temp_directory, motif_size)))
+    filenames = CertificateFilenames(temp_directory, motif_size)
 
     # create a dictionary of running times
     running_times = {}
@@ -49,6 +47,20 @@ def PrintRunningTimeStatistics(graph, input_filename, motif_size, vertex_colored
         # keep track of the processor time
         cpu_time = 0.0
 
+        # binary files hold the statistics in the summary records
+        if filename.endswith('.bin'):
+            _, summaries, _ = ReadCertificateRecords(filename)
+
+            for nsubgraphs, vertex_index, time in zip(summaries['nsubgraphs'].tolist(), summaries['index'].tolist(), summaries['time'].tolist()):
+                running_times[vertex_index] = time
+                subgraphs[vertex_index] = nsubgraphs
+
+                cpu_time += time
+
+            cpu_times.append(cpu_time)
+
+            continue
+
         # open the file
         with open(filename, 'r') as fd:
             # only worry about the lines with Enumerated summaries
@@ -87,6 +99,11 @@ def PrintRunningTimeStatistics(graph, input_filename, motif_size, vertex_colored
     print ('  Idle CPU Time: {:0.2f} hours'.format(idle_cpu_time / 3600))
     print ('  Total Time: {:0.2f} seconds'.format(sum(list(running_times.values()))))
 
+    # replay the running times with every scheduling strategy
+    if nworkers is not None:
+        print ('Simulated Schedules with {} Workers'.format(nworkers))
+        PrintScheduleStatistics([running_times[vertex_index] for vertex_index in sorted(running_times.keys())], nworkers)
+
     return running_times, subgraphs
 
 
@@ -0,0 +1,207 @@
+import heapq
+import collections
+
+
+
+import numpy as np
+
+
+
+from subgraph_enumeration.kavosh.schedule import ReadRunningTimes, PartitionVertices
+from subgraph_enumeration.utilities.dataIO import ReadPrefix
+
+
+
+# roots that take longer than this fraction of the time per worker are split (as in the threaded enumeration)
+SPLIT_FRACTION = 0.125
+# the maximum number of parts per root for every worker
+MAX_ROOT_PARTS_PER_WORKER = 4
+
+
+
+def SimulateStaticChunks(running_times, nworkers):
+    """
+    Return the busy time of every worker when every worker enumerates a consecutive chunk of roots
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    return [float(np.sum(chunk)) for chunk in np.array_split(np.array(running_times, dtype=np.float64), nworkers)]
+
+
+
+def SimulateRoundRobin(running_times, nworkers):
+    """
+    Return the busy time of every worker when the roots are dealt to the workers in turn
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    running_times = np.array(running_times, dtype=np.float64)
+
+    return [float(np.sum(running_times[worker::nworkers])) for worker in range(nworkers)]
+
+
+
+def SimulateLongestProcessingTime(running_times, nworkers):
+    """
+    Return the busy time of every worker when the longest roots are assigned first to the least
+    loaded worker. The recorded times make this an oracle for the predictions of ScheduleVertices.
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    _, worker_times = PartitionVertices(dict(enumerate(running_times)), nworkers)
+
+    return worker_times
+
+
+
+def SimulateSelfScheduling(running_times, nworkers):
+    """
+    Return the busy time of every worker when every idle worker takes the next root from a shared queue
+
+    @param running_times: the running times of the roots (or parts of roots) in queue order
+    @param nworkers: the number of workers
+    """
+    loads = [(0.0, worker) for worker in range(nworkers)]
+
+    for running_time in running_times:
+        load, worker = heapq.heappop(loads)
+        heapq.heappush(loads, (load + running_time, worker))
+
+    worker_times = [0.0 for _ in range(nworkers)]
+    for load, worker in loads:
+        worker_times[worker] = load
+
+    return worker_times
+
+
+
+def SimulateWorkStealing(running_times, nworkers):
+    """
+    Return the busy time of every worker when the workers start with consecutive chunks of roots
+    and an idle worker steals the later half of the roots waiting for the most loaded worker
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    queues = [collections.deque(chunk) for chunk in np.array_split(np.array(running_times, dtype=np.float64), nworkers)]
+    worker_times = [0.0 for _ in range(nworkers)]
+
+    # the times at which every worker finishes its current root
+    events = [(0.0, worker) for worker in range(nworkers)]
+
+    while len(events):
+        now, worker = heapq.heappop(events)
+
+        if not len(queues[worker]):
+            # the victim has the most roots that have not started
+            victim = max(range(nworkers), key = lambda other: len(queues[other]))
+            nstolen = (len(queues[victim]) + 1) // 2
+
+            # the worker stops once there is nothing left to steal
+            if not nstolen: continue
+
+            stolen = [queues[victim].pop() for _ in range(nstolen)]
+            queues[worker].extend(reversed(stolen))
+
+        running_time = queues[worker].popleft()
+        worker_times[worker] += running_time
+
+        heapq.heappush(events, (now + running_time, worker))
+
+    return worker_times
+
+
+
+def SplitRunningTimes(running_times, nworkers):
+    """
+    Return the running times of the parts after splitting expensive roots into equal parts with
+    the rule of the threaded enumeration. The enumeration also limits the number of parts by the
+    neighbors of the root, so this is an optimistic bound.
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    split_time = SPLIT_FRACTION * sum(running_times) / nworkers
+
+    parts = []
+    for running_time in running_times:
+        if nworkers > 1 and running_time > split_time:
+            nparts = int(min(MAX_ROOT_PARTS_PER_WORKER * nworkers, np.ceil(running_time / split_time)))
+            parts += [running_time / nparts for _ in range(nparts)]
+        else:
+            parts.append(running_time)
+
+    return parts
+
+
+
+def SimulateSubrootSplitting(running_times, nworkers):
+    """
+    Return the busy time of every worker when expensive roots are split into parts and every idle
+    worker takes the next part from a shared queue
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    return SimulateSelfScheduling(SplitRunningTimes(running_times, nworkers), nworkers)
+
+
+
+def PrintScheduleStatistics(running_times, nworkers):
+    """
+    Print the simulated wall time, idle CPU time and speedup of every scheduling strategy. Returns
+    a mapping from the strategies to the busy time of every worker.
+
+    @param running_times: the running times of the roots in enumeration order
+    @param nworkers: the number of workers
+    """
+    strategies = collections.OrderedDict([
+        ('Static Chunks', SimulateStaticChunks),
+        ('Round Robin', SimulateRoundRobin),
+        ('Longest Processing Time', SimulateLongestProcessingTime),
+        ('Work Stealing', SimulateWorkStealing),
+        ('Sub-Root Splitting', SimulateSubrootSplitting),
+    ])
+
+    total_time = sum(running_times)
+
+    schedules = collections.OrderedDict()
+    for strategy, simulate in strategies.items():
+        worker_times = simulate(running_times, nworkers)
+
+        wall_time = max(worker_times)
+        idle_cpu_time = sum(wall_time - worker_time for worker_time in worker_times)
+
+        print ('  {}'.format(strategy))
+        print ('    Wall Time: {:0.2f} minutes'.format(wall_time / 60))
+        print ('    Idle CPU Time: {:0.2f} hours'.format(idle_cpu_time / 3600))
+        print ('    Speedup: {:0.2f}x'.format(total_time / max(wall_time, 1e-12)))
+
+        schedules[strategy] = worker_times
+
+    return schedules
+
+
+
+def SimulateSchedules(input_filename, motif_size, nworkers, vertex_colored = False, edge_colored = False, community_based = False):
+    """
+    Replay the running times of every root from a previous enumeration with several scheduling
+    strategies for nworkers workers
+
+    @param input_filename: location for the graph that was enumerated
+    @parak motif_size: the motif subgraph size that was enumerated
+    @param nworkers: the number of workers to simulate
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    """
+    running_times = ReadRunningTimes(input_filename, motif_size, vertex_colored, edge_colored, community_based)
+    assert (len(running_times))
+
+    print ('Simulated Schedules for {} Motif Size {} with {} Workers'.format(ReadPrefix(input_filename), motif_size, nworkers))
+
+    # the roots in the order of the sequential enumeration
+    return PrintScheduleStatistics([running_times[vertex_index] for vertex_index in sorted(running_times.keys())], nworkers)
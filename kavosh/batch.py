@@ -0,0 +1,162 @@
+import os
+
+
+
+import numpy as np
+
+
+
+from subgraph_enumeration.utilities.dataIO import ReadGraph, ReadPrefix
+from subgraph_enumeration.kavosh.enumerate import CreateDirectoryStructure, CertificateFilenames, CreateGraphImage, RunChunks, CombineEnumeratedSubgraphs
+from subgraph_enumeration.data_structures.enumeration import MapVerticesToNeighborhoodSizes
+from subgraph_enumeration.kavosh.schedule import ReadRunningTimes, ModelVertices, PredictRunningTimes, PredictRelativeCosts
+
+
+
+def ParseJob(job):
+    """
+    Return the input filename, motif size and the keyword arguments for the mode of a job
+
+    @param job: a tuple (input_filename, k, vertex_colored, edge_colored, community_based) where the flags default to False
+    """
+    assert (2 <= len(job) <= 5)
+
+    input_filename, k = job[0], job[1]
+    vertex_colored, edge_colored, community_based = list(job[2:]) + [False] * (5 - len(job))
+
+    # the graph cannot be both vertex and edge colored
+    assert (not vertex_colored or not edge_colored)
+
+    mode = {
+        'vertex_colored': vertex_colored,
+        'edge_colored': edge_colored,
+        'community_based': community_based,
+    }
+
+    return input_filename, k, mode
+
+
+
+def SplitByCost(nodes, predicted_times, nchunks):
+    """
+    Split the nodes into at most nchunks consecutive chunks with similar predicted times
+
+    @param nodes: the sorted list of nodes
+    @param predicted_times: a mapping from vertices to their predicted running times
+    @param nchunks: the maximum number of chunks
+    """
+    costs = np.array([predicted_times[node] for node in nodes], dtype=np.float64)
+    total = max(np.sum(costs), 1e-12)
+
+    # every node belongs to the chunk containing the predicted time that precedes it
+    chunk_indices = np.minimum(((np.cumsum(costs) - costs) / total * nchunks).astype(np.int64), nchunks - 1)
+
+    nodes = np.array(nodes, dtype=np.int64)
+
+    return [nodes[chunk_indices == chunk_index] for chunk_index in np.unique(chunk_indices)]
+
+
+
+def EnumerateSubgraphsBatch(jobs, nworkers, chunks_per_worker = 4, retries = 2, shared_image = False, binary_output = False):
+    """
+    Enumerate several graphs, motif sizes and modes with one pool of processes. The roots of every
+    job are split into consecutive chunks with about the same predicted time across all jobs, and
+    the chunks start longest first so that no job runs alone on a few processes at the end. The
+    combined certificates of every job match those of its sequential enumeration.
+
+    Predictions are in seconds for jobs with previous timings. Jobs without enough timings to fit
+    a model are predicted in seconds per combination below every root, as measured on the jobs with
+    timings. If no job has timings, every job uses relative costs.
+
+    @param jobs: a list of tuples (input_filename, k, vertex_colored, edge_colored, community_based) where the flags default to False
+    @param nworkers: the number of processes that enumerate in parallel
+    @param chunks_per_worker: the number of chunks per process over all jobs (more chunks balance better)
+    @param retries: the number of times to rerun a chunk whose process fails
+    @param shared_image: read every graph once into an image in /dev/shm that all processes attach to
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+    """
+    assert (nworkers >= 1)
+
+    jobs = [ParseJob(job) for job in jobs]
+
+    # every job needs a separate output directory
+    temp_directories = [CreateDirectoryStructure(input_filename, write_subgraphs = False, **mode) for input_filename, _, mode in jobs]
+    assert (len(set(zip(temp_directories, [k for _, k, _ in jobs]))) == len(jobs))
+
+    # predict the running time and relative cost of every root in every job, reading every graph once
+    predicted_times = [None for _ in jobs]
+    relative_costs = [None for _ in jobs]
+    timed = [False for _ in jobs]
+    for input_filename in sorted(set(input_filename for input_filename, _, _ in jobs)):
+        graph = ReadGraph(input_filename)
+        neighborhood_sizes = MapVerticesToNeighborhoodSizes(graph, enumerated = True)
+
+        for job_index, (job_filename, k, mode) in enumerate(jobs):
+            if not job_filename == input_filename: continue
+
+            predicted_times[job_index] = PredictRunningTimes(graph, input_filename, k, **mode)
+            relative_costs[job_index] = PredictRelativeCosts(neighborhood_sizes, k)
+            timed[job_index] = len(ModelVertices(neighborhood_sizes, ReadRunningTimes(input_filename, k, **mode))) > 0
+
+        del graph
+
+    # relative costs and seconds cannot be mixed, so jobs without timings are converted with the seconds per
+    # relative cost of the jobs with timings
+    if any(timed):
+        timed_time = sum(sum(predicted_times[job_index].values()) for job_index in range(len(jobs)) if timed[job_index])
+        timed_cost = sum(sum(relative_costs[job_index].values()) for job_index in range(len(jobs)) if timed[job_index])
+        seconds_per_cost = timed_time / max(timed_cost, 1e-12)
+
+        for job_index in range(len(jobs)):
+            if timed[job_index]: continue
+
+            predicted_times[job_index] = {vertex_index: seconds_per_cost * cost for vertex_index, cost in relative_costs[job_index].items()}
+
+    # the chunks of all jobs have about the same predicted time
+    total_time = sum(sum(job_times.values()) for job_times in predicted_times)
+    chunk_time = total_time / (nworkers * chunks_per_worker)
+
+    # the processes attach to one image per graph rather than each reading their own copy
+    image_filenames = {}
+    if shared_image:
+        for input_filename in sorted(set(input_filename for input_filename, _, _ in jobs)):
+            if os.path.isdir('/dev/shm'): image_directory = '/dev/shm'
+            else: image_directory = os.path.dirname(os.path.abspath(input_filename))
+            image_filename = '{}/{}-{}-{}.graph.csr'.format(image_directory, ReadPrefix(input_filename), os.getpid(), len(image_filenames))
+
+            CreateGraphImage(input_filename, image_filename)
+            image_filenames[input_filename] = image_filename
+
+    try:
+        chunks = []
+        for job_index, (input_filename, k, mode) in enumerate(jobs):
+            # remove the output of previous runs for this motif size since all files are combined
+            for filename in CertificateFilenames(temp_directories[job_index], k):
+                os.remove(filename)
+
+            job_times = predicted_times[job_index]
+            nodes = sorted(job_times.keys())
+            nchunks = int(max(min(np.ceil(sum(job_times.values()) / max(chunk_time, 1e-12)), len(nodes)), 1))
+
+            kwargs = dict(mode)
+            kwargs['binary_output'] = binary_output
+            if input_filename in image_filenames: kwargs['image_filename'] = image_filenames[input_filename]
+
+            # consecutive chunks keep the combined certificates in the sequential order
+            for chunk_index, chunk in enumerate(SplitByCost(nodes, job_times, nchunks)):
+                predicted_time = sum(job_times[node] for node in chunk)
+                chunks.append((predicted_time, (input_filename, k, chunk, chunk_index), kwargs))
+
+        print ('Batch of {} jobs in {} chunks'.format(len(jobs), len(chunks)))
+
+        # start the longest chunks first
+        chunks.sort(key = lambda chunk: -chunk[0])
+
+        RunChunks([(args, kwargs) for _, args, kwargs in chunks], nworkers, retries)
+    finally:
+        for image_filename in image_filenames.values():
+            os.remove(image_filename)
+
+    # combine the certificates of every job
+    for input_filename, k, mode in jobs:
+        CombineEnumeratedSubgraphs(input_filename, k, **mode)
@@ -0,0 +1,121 @@
+#include <stdlib.h>
+#include <string.h>
+#include "cpp-cache.h"
+
+
+
+CanonicalCache::CanonicalCache(long capacity, short input_nkey_words, short input_ncertificate_words, short input_k)
+{
+    /*
+    Bounded cache from the adjacency and colors of a subgraph (before canonization) to its
+    certificate and canonical labeling. Entries are evicted with the clock algorithm per set.
+
+    @param capacity: the maximum number of entries (rounded up to a power of two number of sets)
+    @param nkey_words: the number of 64-bit words in every key
+    @param ncertificate_words: the number of 64-bit words in every certificate
+    @param k: motif size (the length of every labeling)
+    */
+    nkey_words = input_nkey_words;
+    ncertificate_words = input_ncertificate_words;
+    k = input_k;
+
+    // the number of sets is a power of two
+    nsets = 1;
+    while (nsets * CACHE_WAYS < capacity) nsets *= 2;
+
+    long nentries = nsets * CACHE_WAYS;
+
+    keys = (uint64_t *)malloc(nentries * nkey_words * sizeof(uint64_t));
+    if (keys == NULL) exit(-1);
+    certificates = (uint64_t *)malloc(nentries * ncertificate_words * sizeof(uint64_t));
+    if (certificates == NULL) exit(-1);
+    labs = (unsigned char *)malloc(nentries * k * sizeof(unsigned char));
+    if (labs == NULL) exit(-1);
+    valid = (bool *)calloc(nentries, sizeof(bool));
+    if (valid == NULL) exit(-1);
+    referenced = (bool *)calloc(nentries, sizeof(bool));
+    if (referenced == NULL) exit(-1);
+    hands = (unsigned char *)calloc(nsets, sizeof(unsigned char));
+    if (hands == NULL) exit(-1);
+
+    hits = 0;
+    misses = 0;
+}
+
+CanonicalCache::~CanonicalCache(void)
+{
+    /*
+    Destructor for eliminating canonical cache object
+    */
+    free(keys);
+    free(certificates);
+    free(labs);
+    free(valid);
+    free(referenced);
+    free(hands);
+}
+
+bool CanonicalCache::Lookup(const uint64_t *key, uint64_t *certificate, int *lab)
+{
+    /*
+    Find the certificate and canonical labeling for this key. Returns true on a hit.
+
+    @param key: the key for the subgraph
+    @param certificate: the certificate to populate on a hit
+    @param lab: the canonical labeling to populate on a hit (first k entries)
+    */
+    long set = (long) (HashWords(key, nkey_words) & (nsets - 1));
+
+    for (long entry = set * CACHE_WAYS; entry < (set + 1) * CACHE_WAYS; ++entry) {
+        if (!valid[entry]) continue;
+        if (memcmp(keys + entry * nkey_words, key, nkey_words * sizeof(uint64_t))) continue;
+
+        // copy the certificate and labeling
+        memcpy(certificate, certificates + entry * ncertificate_words, ncertificate_words * sizeof(uint64_t));
+        for (short iv = 0; iv < k; ++iv) {
+            lab[iv] = labs[entry * k + iv];
+        }
+
+        // give this entry a second chance before eviction
+        referenced[entry] = true;
+        hits += 1;
+
+        return true;
+    }
+
+    misses += 1;
+
+    return false;
+}
+
+void CanonicalCache::Insert(const uint64_t *key, const uint64_t *certificate, const int *lab)
+{
+    /*
+    Add the certificate and canonical labeling for this key, evicting an entry if the set is full
+
+    @param key: the key for the subgraph
+    @param certificate: the certificate for the subgraph
+    @param lab: the canonical labeling for the subgraph (first k entries)
+    */
+    long set = (long) (HashWords(key, nkey_words) & (nsets - 1));
+
+    // advance the clock hand past recently referenced entries
+    long entry = set * CACHE_WAYS + hands[set];
+    while (valid[entry] && referenced[entry]) {
+        referenced[entry] = false;
+
+        hands[set] = (hands[set] + 1) % CACHE_WAYS;
+        entry = set * CACHE_WAYS + hands[set];
+    }
+
+    // replace the entry under the clock hand
+    memcpy(keys + entry * nkey_words, key, nkey_words * sizeof(uint64_t));
+    memcpy(certificates + entry * ncertificate_words, certificate, ncertificate_words * sizeof(uint64_t));
+    for (short iv = 0; iv < k; ++iv) {
+        labs[entry * k + iv] = (unsigned char) lab[iv];
+    }
+    valid[entry] = true;
+    referenced[entry] = false;
+
+    hands[set] = (hands[set] + 1) % CACHE_WAYS;
+}
@@ -0,0 +1,47 @@
+#ifndef __CPP_CACHE_H__
+#define __CPP_CACHE_H__
+
+#include <stdint.h>
+#include "cpp-certificate.h"
+
+
+
+// the largest cache key in 64-bit words (8 bytes of adjacency and four bits per edge color for k = 8)
+#define MAX_CACHE_KEY_WORDS 5
+// the number of entries per set in the cache
+#define CACHE_WAYS 4
+
+
+
+class CanonicalCache {
+public:
+    // constructors/destructors
+    CanonicalCache(long capacity, short nkey_words, short ncertificate_words, short k);
+    ~CanonicalCache();
+
+    // access functions
+    bool Lookup(const uint64_t *key, uint64_t *certificate, int *lab);
+    void Insert(const uint64_t *key, const uint64_t *certificate, const int *lab);
+
+    // instance variables
+    long nsets;
+    short nkey_words;
+    short ncertificate_words;
+    short k;
+    // set associative storage, every set has CACHE_WAYS consecutive entries
+    uint64_t *keys;
+    uint64_t *certificates;
+    unsigned char *labs;
+    bool *valid;
+    // reference bits and per set clock hands for eviction
+    bool *referenced;
+    unsigned char *hands;
+
+    // statistics
+    long hits;
+    long misses;
+};
+
+
+
+#endif
@@ -0,0 +1,184 @@
+#include <stdlib.h>
+#include <string.h>
+#include <algorithm>
+#include "cpp-certificate.h"
+
+
+
+void WriteCertificate(FILE *fp, const uint64_t *certificate, short nbytes)
+{
+    /*
+    Write the certificate in hexadecimal (two characters per byte in memory order)
+
+    @param fp: the file to write the certificate to
+    @param certificate: the packed certificate
+    @param nbytes: the number of bytes in the certificate
+    */
+    static const char hexadecimal[] = "0123456789abcdef";
+
+    const unsigned char *certificate_bytes = (const unsigned char *) certificate;
+
+    char buffer[2 * 8 * MAX_CERTIFICATE_WORDS];
+    for (short ib = 0; ib < nbytes; ++ib) {
+        buffer[2 * ib] = hexadecimal[certificate_bytes[ib] >> 4];
+        buffer[2 * ib + 1] = hexadecimal[certificate_bytes[ib] & 15];
+    }
+
+    fwrite(buffer, sizeof(char), 2 * nbytes, fp);
+}
+
+
+
+class CompareCertificates {
+public:
+    CompareCertificates(CertificateTable *input_table) : table(input_table) {}
+
+    bool operator()(long one, long two) const {
+        // the keys are compared bytewise which matches the ordering of the hexadecimal strings
+        return memcmp(table->keys + one * table->nwords, table->keys + two * table->nwords, table->nwords * sizeof(uint64_t)) < 0;
+    }
+
+    CertificateTable *table;
+};
+
+
+
+CertificateTable::CertificateTable(short input_nwords)
+{
+    /*
+    Histogram of certificates stored as fixed width keys in an open addressing hash table
+
+    @param nwords: the number of 64-bit words in every certificate (unused bytes must be zero)
+    */
+    nwords = input_nwords;
+    capacity = 0;
+    nentries = 0;
+    keys = NULL;
+    counts = NULL;
+    entries = NULL;
+
+    // the capacity is always a power of two
+    Resize(1024);
+}
+
+CertificateTable::~CertificateTable(void)
+{
+    /*
+    Destructor for eliminating certificate table object
+    */
+    free(keys);
+    free(counts);
+    free(entries);
+}
+
+void CertificateTable::Resize(long new_capacity)
+{
+    /*
+    Resize the hash table and reinsert all of the existing certificates
+
+    @param new_capacity: the new number of slots (a power of two)
+    */
+    uint64_t *old_keys = keys;
+    long *old_counts = counts;
+    long *old_entries = entries;
+    long old_nentries = nentries;
+
+    capacity = new_capacity;
+    nentries = 0;
+
+    keys = (uint64_t *)malloc(capacity * nwords * sizeof(uint64_t));
+    if (keys == NULL) exit(-1);
+    counts = (long *)calloc(capacity, sizeof(long));
+    if (counts == NULL) exit(-1);
+    // the table is never more than half full
+    entries = (long *)malloc((capacity / 2 + 1) * sizeof(long));
+    if (entries == NULL) exit(-1);
+
+    // reinsert the certificates in their previous order
+    for (long ie = 0; ie < old_nentries; ++ie) {
+        long slot = old_entries[ie];
+        Add(old_keys + slot * nwords, old_counts[slot]);
+    }
+
+    free(old_keys);
+    free(old_counts);
+    free(old_entries);
+}
+
+void CertificateTable::Add(const uint64_t *certificate, long count)
+{
+    /*
+    Add occurrences of this certificate to the histogram
+
+    @param certificate: the packed certificate
+    @param count: the number of occurrences to add
+    */
+    long slot = (long) (HashWords(certificate, nwords) & (capacity - 1));
+
+    // linear probing until the certificate or an empty slot is found
+    while (counts[slot]) {
+        if (!memcmp(keys + slot * nwords, certificate, nwords * sizeof(uint64_t))) {
+            counts[slot] += count;
+            return;
+        }
+
+        slot = (slot + 1) & (capacity - 1);
+    }
+
+    // add this new certificate to the table
+    memcpy(keys + slot * nwords, certificate, nwords * sizeof(uint64_t));
+    counts[slot] = count;
+    entries[nentries] = slot;
+    nentries += 1;
+
+    // keep the load factor under one half
+    if (2 * nentries > capacity) Resize(2 * capacity);
+}
+
+void CertificateTable::Clear(void)
+{
+    /*
+    Remove all certificates from the table, only visits the occupied slots
+    */
+    for (long ie = 0; ie < nentries; ++ie) {
+        counts[entries[ie]] = 0;
+    }
+
+    nentries = 0;
+}
+
+void CertificateTable::Sort(void)
+{
+    /*
+    Order the entries by certificate (bytewise)
+    */
+    std::sort(entries, entries + nentries, CompareCertificates(this));
+}
+
+long CertificateTable::NEntries(void)
+{
+    /*
+    Return the number of unique certificates in the table
+    */
+    return nentries;
+}
+
+const uint64_t *CertificateTable::Certificate(long entry)
+{
+    /*
+    Return the certificate for this entry
+
+    @param entry: the entry between 0 and NEntries() - 1
+    */
+    return keys + entries[entry] * nwords;
+}
+
+long CertificateTable::Count(long entry)
+{
+    /*
+    Return the number of occurrences for this entry
+
+    @param entry: the entry between 0 and NEntries() - 1
+    */
+    return counts[entries[entry]];
+}
@@ -0,0 +1,106 @@
+#ifndef __CPP_CERTIFICATE_H__
+#define __CPP_CERTIFICATE_H__
+
+#include <stdio.h>
+#include <stdint.h>
+
+
+
+// the largest certificate in 64-bit words (8 bytes of adjacency and 56 bytes of edge colors for k = 8)
+#define MAX_CERTIFICATE_WORDS 8
+
+
+
+// I/O functions for certificates
+void WriteCertificate(FILE *fp, const uint64_t *certificate, short nbytes);
+
+
+
+// binary certificate files begin with a header followed by one block per root: a summary record
+// and then the certificate records of the root. The certificate records hold the packed key
+// (key_width bytes: the adjacency bytes, then two bytes per vertex color or four bits per edge
+// color, padded with zeros) and a uint32 count. Counts above UINT32_MAX span several records.
+#define CERTIFICATE_FILE_MAGIC "CERTRECS"
+#define CERTIFICATE_FILE_VERSION 2
+#define CERTIFICATE_MODE_VERTEX_COLORED 1
+#define CERTIFICATE_MODE_EDGE_COLORED 2
+#define CERTIFICATE_MODE_COMMUNITY_BASED 4
+
+
+
+class CertificateFileHeader {
+public:
+    char magic[8];
+    int64_t version;
+    int64_t k;
+    int64_t mode;
+    int64_t key_width;
+};
+
+
+
+class CertificateRootSummary {
+public:
+    int64_t index;
+    int64_t nsubgraphs;
+    double time;
+    // the number of certificate records that follow
+    int64_t nrecords;
+};
+
+
+
+inline uint64_t HashWords(const uint64_t *words, short nwords)
+{
+    /*
+    Return the hash of an array of words (finalizer from splitmix64 applied to every word)
+
+    @param words: the words to hash
+    @param nwords: the number of words
+    */
+    uint64_t hash = 0;
+    for (short iw = 0; iw < nwords; ++iw) {
+        hash ^= words[iw] + 0x9e3779b97f4a7c15ULL + (hash << 6) + (hash >> 2);
+        hash = (hash ^ (hash >> 30)) * 0xbf58476d1ce4e5b9ULL;
+        hash = (hash ^ (hash >> 27)) * 0x94d049bb133111ebULL;
+        hash = hash ^ (hash >> 31);
+    }
+
+    return hash;
+}
+
+
+
+class CertificateTable {
+public:
+    // constructors/destructors
+    CertificateTable(short nwords);
+    ~CertificateTable();
+
+    // modifying functions
+    void Add(const uint64_t *certificate, long count = 1);
+    void Clear(void);
+    void Sort(void);
+
+    // attribute functions
+    long NEntries(void);
+    const uint64_t *Certificate(long entry);
+    long Count(long entry);
+
+    // instance variables
+    short nwords;
+    long capacity;
+    long nentries;
+    // open addressing with linear probing, a count of zero marks an empty slot
+    uint64_t *keys;
+    long *counts;
+    // the occupied slots in insertion order (sorted order after calls to Sort)
+    long *entries;
+
+private:
+    void Resize(long new_capacity);
+};
+
+
+
+#endif
@@ -1,22 +1,106 @@
 #include <stdio.h>
 #include <math.h>
+#include <time.h>
 #include <chrono>
-#include <map>
-#include <string>
 #include <algorithm>
+#include <atomic>
+#include <map>
+#include <mutex>
+#include <thread>
+#include <unordered_set>
+#include <vector>
+#include <unistd.h>
+#include <sys/stat.h>
 #include <nauty.h>
 #include "cpp-nauty.h"
 #include "cpp-graph.h"
+#include "cpp-certificate.h"
+#include "cpp-cache.h"
+#include "cpp-table.h"
 
 
 
-static long enumerated_subgraphs = 0;              // the number of enumerated subgraphs identified
-static NyGraph *nauty_graph;                       // graph object for canonical labeling
+// every worker thread owns its engine state, only the graph and the tables below are shared
+static thread_local long enumerated_subgraphs = 0;              // the number of enumerated subgraphs identified
+static thread_local NyGraph *nauty_graph = NULL;                // graph object for canonical labeling
+static thread_local CertificateTable *certificates = NULL;      // histogram of certificates
+static thread_local CanonicalCache *cache = NULL;               // cache of certificates for subgraphs before canonization
+static thread_local short root_part = 0;                        // the part of the current root that this worker enumerates
+static thread_local short root_nparts = 1;                      // the number of parts the current root is split into
+static thread_local long root_combinations = 0;                 // the number of combinations for S[1] seen so far
+
+// shared read only state
 static short nvertex_layers = 1;                   // the number of duplicate layers in the nauty input (for edge colors)
-static std::map<std::string, long> certificates;   // map of certificates
+static CanonicalTable *table = NULL;               // exhaustive table of certificates for small colorless motifs
+static bool use_cache = false;                     // indicates if the workers cache certificates for subgraphs before canonization
 
+// shared output state, the certificates are written in the order of the roots
 static FILE *certificate_fp = NULL;             // file descriptor to write all certificates
-static FILE *subgraph_fp = NULL;    // file descriptor to write all subgraphs
+static FILE *subgraph_fp = NULL;    // file descriptor to write all subgraphs (locked per subgraph)
+static std::mutex output_mutex;                 // guards the certificate file and the finished roots
+static long next_output = 0;                    // the position of the next root to write
+static std::map<long, std::pair<char *, size_t> > finished_roots;  // roots that finished before an earlier root
+
+// the queue of work items, workers claim the next item atomically
+static std::atomic<long> next_item(0);
+
+// the largest number of parts per thread that a single root is split into
+#define MAX_ROOT_PARTS_PER_THREAD 4
+// roots whose estimated cost exceeds this fraction of the work per thread are split
+#define SPLIT_FRACTION 0.125
+
+
+
+class WorkItem {
+public:
+    // the position of the root in the queue of roots
+    long position;
+    // the part of the root (combinations for S[1]) to enumerate
+    short part;
+    short nparts;
+};
+
+
+
+class SplitRoot {
+public:
+    // certificates and statistics merged over the finished parts of a root
+    CertificateTable *certificates;
+    long enumerated_subgraphs;
+    float time;
+    short nfinished;
+};
+
+static std::mutex split_mutex;                  // guards the split roots
+static std::map<long, SplitRoot> split_roots;   // the partially finished roots that are split
+
+// cache statistics summed over all workers
+static long cache_hits = 0;
+static long cache_misses = 0;
+
+// progress of the running enumeration (read by other threads) and the request to stop after the roots in progress
+static std::atomic<bool> cancelled(false);
+static std::atomic<long> nroots_total(0);
+static std::atomic<long> nroots_finished(0);
+static std::atomic<long> nroots_resumed(0);
+static std::atomic<long> nsubgraphs_finished(0);
+
+
+
+// the largest motif that fits in the certificates (one byte per vertex)
+#define MAX_MOTIF_SIZE 8
+// the number of subgraphs in the canonical cache
+#define CANONICAL_CACHE_SIZE 65536
+
+// preallocated recursion state per worker, the hot loop does not allocate memory
+static thread_local long subgraph[MAX_MOTIF_SIZE];                   // selected vertices, S[i] is subgraph[level_offsets[i]] ... subgraph[level_offsets[i + 1] - 1]
+static thread_local short level_offsets[MAX_MOTIF_SIZE + 1];         // the start of every level of the selection in subgraph
+static thread_local long frontier_offsets[MAX_MOTIF_SIZE + 1];       // the start of the candidate vertices for every level in frontier
+static thread_local long *frontier = NULL;                           // candidate vertices for every level stacked consecutively
+static thread_local bool *visited = NULL;                            // marks for the vertices visited at higher enumeration steps
+static thread_local setword adjacency[MAX_MOTIF_SIZE + 1][MAX_MOTIF_SIZE];   // adjacency bitmask (nauty rows) of the vertices in S[0] ... S[i - 1] for every depth i
+static thread_local int8_t edge_colors[MAX_MOTIF_SIZE][MAX_MOTIF_SIZE];      // edge colors between the selected vertices (valid where adjacency has an edge)
+static thread_local setword layered_cycles[WORDSIZE];                        // the edges linking the layers of the nauty input (for edge colors)
 
 
 
@@ -25,328 +109,435 @@ static bool VERTEX_COLORED = false;
 static bool EDGE_COLORED = false;
 static bool COMMUNITY_BASED = false;
 static bool WRITE_SUBGRAPHS = false;
+static short THREADS = 1;
+static bool RESUME = false;
+static bool BINARY_OUTPUT = false;
 
 
 
-std::vector<long> Validate(Graph *G,
-                           std::unordered_set<long> &parents,
-                           long u,
-                           std::unordered_set<long> &visited)
+double ThreadTime(void)
 {
     /*
-    Find the valid vertices for the next recursive level. Excludes elements with indices smaller
-    than the root vertex and those already visited at a previous recursive level
+    Return the processor time in seconds used by the calling thread (clock() counts all threads)
+    */
+    struct timespec time;
+    clock_gettime(CLOCK_THREAD_CPUTIME_ID, &time);
+
+    return time.tv_sec + time.tv_nsec / 1e9;
+}
 
-    @param G: graph
-    @param parents: selected vertices of last layer
-    @param u: root vertex
-    visited: a list of vertices already visited
 
-    Returns a sorted list of valid vertices for the next level of analysis
+
+short CertificateWords(short k)
+{
+    /*
+    Return the number of 64-bit words needed for the certificates of motifs of size k
+
+    @param k: motif size
     */
+    // one byte of adjacency per vertex
+    short nbytes = k;
 
-    // create a set of valid vertices at this level
-    std::unordered_set<long> valid_vertices = std::unordered_set<long>();
+    // vertex colors use two bytes per vertex and edge colors one byte per (directed) edge
+    if (VERTEX_COLORED) nbytes += 2 * k;
+    else if (EDGE_COLORED) nbytes += k * (k - 1);
 
-    // iterate over all the parents of this layer
-    for (std::unordered_set<long>::iterator it1 = parents.begin(); it1 != parents.end(); ++it1) {
-        long v = *it1;
+    return (nbytes + 7) / 8;
+}
 
-        // iterate over all the neighbors of this parent
-        std::unordered_set<long> neighbors = G->vertices[v]->neighbors;
-        for (std::unordered_set<long>::iterator it2 = neighbors.begin(); it2 != neighbors.end(); ++it2) {
-            long w = *it2;
 
-            // only consider neighbors that are in the same community if community based
-            if (COMMUNITY_BASED && G->vertices[v]->community != G->vertices[w]->community) continue;
-
-            // if the root vertex is less than the neighbor and the neighbor has not been visited
-            // we use <= rather than < since u is always in visited as the S[0] entry
-            // By using <=, we can enumerate all subgraphs with duplication by setting the enumeration indices to be non unique
-            if (G->vertices[u]->enumeration_index <= G->vertices[w]->enumeration_index && visited.find(w) == visited.end()) {
-                valid_vertices.insert(w);
-                visited.insert(w);
-            }
+
+short CertificateLength(const uint64_t *certificate, short k)
+{
+    /*
+    Return the number of bytes in this certificate
+
+    @param certificate: the packed certificate
+    @param k: motif size
+    */
+    // vertex colored certificates have a fixed length
+    if (VERTEX_COLORED) return 3 * k;
+
+    // edge colored certificates have one color per edge, and every edge is a bit in the adjacency bytes
+    if (EDGE_COLORED) {
+        const unsigned char *certificate_bytes = (const unsigned char *) certificate;
+
+        short nedges = 0;
+        for (short iv = 0; iv < k; ++iv) {
+            nedges += __builtin_popcount(certificate_bytes[iv]);
         }
-    }
 
-    // convert the set into a vector
-    std::vector<long> valid_vertices_vector = std::vector<long>();
-    for (std::unordered_set<long>::iterator it = valid_vertices.begin(); it != valid_vertices.end(); ++it) {
-        valid_vertices_vector.push_back(*it);
+        return k + nedges;
     }
 
-    return valid_vertices_vector;
+    return k;
 }
 
 
 
-void EnumerateVertex(Graph *G,
-                     long u,
-                     std::map<long, std::unordered_set<long> > &S,
-                     short rem,
-                     short i,
-                     std::unordered_set<long> &visited);
-
-
-void Combination(Graph *G,
-                 long u,
-                 std::map<long, std::unordered_set<long> > &S,
-                 short rem,
-                 short k_i,
-                 short i,
-                 std::unordered_set<long> &visited,
-                 std::vector<long> &vertices,
-                 long nvertices,
-                 long r,
-                 long combo_index,
-                 long combination[],
-                 long vertex_index)
+short CacheKeyWords(short k)
 {
     /*
-    Generate a new combination
-
-    @param nvertices: size of input
-    @param combinations: a vector to return the combinations
-    @param r: size of combination
-    @param index: current index within the new combination
-    @param data: temporary array to store current combination
-    @param vertex_index: index of current element in the input vector
+    Return the number of 64-bit words needed for the cache keys of motifs of size k
+
+    @param k: motif size
     */
+    // one byte of adjacency per vertex
+    short nwords = 1;
 
-    // current combination is ready
-    if (combo_index == r) {
-        // update the set S value at this level with this combination
-        S[i] = std::unordered_set<long>();
-        for (long iv = 0; iv < r; ++iv) {
-            S[i].insert(combination[iv]);
-        }
+    // vertex colors use two bytes per vertex and edge colors four bits per (directed) edge
+    if (VERTEX_COLORED) nwords += (2 * k + 7) / 8;
+    else if (EDGE_COLORED) nwords += (k * (k - 1) + 15) / 16;
+
+    return nwords;
+}
 
-        // enumerate given this new combination
-        EnumerateVertex(G, u, S, rem - k_i, i + 1, visited);
 
-        // return to previous recursion level
-        return;
-    }
 
-    // there are no more elements to add to the combination
-    if (vertex_index >= nvertices) return;
+short CertificateKeyWidth(short k)
+{
+    /*
+    Return the number of bytes for the packed certificate keys in binary certificate files
 
-    // vertex_index is included, put next combo_index at next location
-    combination[combo_index] = vertices[vertex_index];
-    Combination(G, u, S, rem, k_i, i, visited, vertices, nvertices, r, combo_index + 1, combination, vertex_index + 1);
+    @param k: motif size
+    */
+    // one byte of adjacency per vertex
+    short nbytes = k;
 
-    // current is excluded, replace it with the next vertex
-    // we do not increment the combo_index, but the vertex_index
-    Combination(G, u, S, rem, k_i, i, visited, vertices, nvertices, r, combo_index, combination, vertex_index + 1);
+    // vertex colors use two bytes per vertex and edge colors four bits per (directed) edge as in the cache keys
+    if (VERTEX_COLORED) nbytes += 2 * k;
+    else if (EDGE_COLORED) nbytes += (k * (k - 1) + 1) / 2;
 
+    return nbytes;
 }
 
 
 
-void Combinations(Graph *G,
-                 long u,
-                 std::map<long, std::unordered_set<long> > &S,
-                 short rem,
-                 short k_i,
-                 short i,
-                 std::unordered_set<long> &visited,
-                 std::vector<long> &vertices,
-                 long r)
+void PackCertificateKey(const uint64_t *certificate, short k, unsigned char *key)
 {
     /*
-    Create a vector of combinations of length r from vertices
+    Pack a certificate into the key of a binary certificate record
 
-    @param vertices: a vector of vertex indices from which to generate combinations
-    @param r: the size of the combinations to generate
+    @param certificate: the certificate
+    @param k: motif size
+    @param key: the CertificateKeyWidth(k) bytes to populate
     */
+    const unsigned char *certificate_bytes = (const unsigned char *) certificate;
+    short key_width = CertificateKeyWidth(k);
 
-    // get the number of elements in the vector
-    long nvertices = vertices.size();
-    // a temporary array to store combinations as they form
-    long combination[r];
+    memset(key, 0, key_width);
 
-    // begin population all combinations
-    Combination(G, u, S, rem, k_i, i, visited, vertices, nvertices, r, 0, combination, 0);
+    if (EDGE_COLORED) {
+        // the adjacency bytes followed by four bits per edge color (there are at most seven edge types)
+        memcpy(key, certificate_bytes, k);
+
+        short nedges = CertificateLength(certificate, k) - k;
+        for (short ie = 0; ie < nedges; ++ie) {
+            key[k + ie / 2] |= (certificate_bytes[k + ie] & 15) << (4 * (ie % 2));
+        }
+    }
+    else {
+        // colorless and vertex colored certificates are already as short as possible
+        memcpy(key, certificate_bytes, key_width);
+    }
 }
 
 
 
-void EnumerateVertex(Graph *G,
-                     long u,
-                     std::map<long, std::unordered_set<long> > &S,
-                     short rem,
-                     short i,
-                     std::unordered_set<long> &visited)
+CertificateFileHeader CertificateHeader(short k)
 {
     /*
-    Enumerate all subgraphs of size rem that contain vertices in S[0] ... S[i - 1]
+    Return the header of binary certificate files for motifs of size k in the current mode
+
+    @param k: motif size
+    */
+    CertificateFileHeader header;
+    memset(&header, 0, sizeof(CertificateFileHeader));
+    memcpy(header.magic, CERTIFICATE_FILE_MAGIC, 8);
+
+    header.version = CERTIFICATE_FILE_VERSION;
+    header.k = k;
+    header.mode = 0;
+    if (VERTEX_COLORED) header.mode |= CERTIFICATE_MODE_VERTEX_COLORED;
+    if (EDGE_COLORED) header.mode |= CERTIFICATE_MODE_EDGE_COLORED;
+    if (COMMUNITY_BASED) header.mode |= CERTIFICATE_MODE_COMMUNITY_BASED;
+    header.key_width = CertificateKeyWidth(k);
+
+    return header;
+}
+
+
+
+void CacheKey(CSRGraph *G, long k, short i, uint64_t *key)
+{
+    /*
+    Construct the cache key for the subgraph S[0] ... S[i - 1] from its adjacency and colors
 
     @param G: graph
-    @param u: root vertex
-    @param S: selection (S = {S_0, S_i, ... S_{k - 1}}) is an array of the set of all S_i
-    @param rem: number of remaining vertices to be selected
+    @param k: motif size
     @param i: current depth of the tree
-    @param visited: a list of vertices already visited
+    @param key: the key to populate
+    */
+    memset(key, 0, cache->nkey_words * sizeof(uint64_t));
 
-    Returns a generator that continually gives the next subgraph that contains S[0] ... S[i - 1] of
-    the appropriate size (k)
+    // the adjacency to the (at most 8) subgraph vertices are the highest bits of every row
+    for (long iv = 0; iv < k; ++iv) {
+        key[0] |= (adjacency[i][iv] >> (WORDSIZE - 8)) << (8 * iv);
+    }
+
+    if (VERTEX_COLORED) {
+        // two bytes per vertex color
+        for (long iv = 0; iv < k; ++iv) {
+            uint64_t color = (uint16_t) G->colors[subgraph[iv]];
+            key[1 + iv / 4] |= color << (16 * (iv % 4));
+        }
+    }
+    else if (EDGE_COLORED) {
+        // four bits per edge color in the order of the adjacency bits
+        long edge_index = 0;
+        for (long out_index = 0; out_index < k; ++out_index) {
+            for (long in_index = 0; in_index < k; ++in_index) {
+                if (!ISELEMENT(&(adjacency[i][out_index]), in_index)) continue;
+
+                uint64_t color = edge_colors[out_index][in_index];
+                key[1 + edge_index / 16] |= color << (4 * (edge_index % 16));
+
+                edge_index += 1;
+            }
+        }
+    }
+}
+
+
+
+void UpdateAdjacency(CSRGraph *G, short i)
+{
+    /*
+    Construct the adjacency bitmask for depth i + 1 from the bitmask at depth i by adding the
+    rows and columns of the vertices selected in S[i]
+
+    @param G: graph
+    @param i: current depth of the tree
     */
 
-    // if there are no remaining vertices to add, subgraph size limit reached
-    if (!rem) {
-        // the set of vertices in S[0] to S[i - 1] contain the subgraph
-        // note that the sets in S[i] ... S[k] do not belong to the subgraph but a previous iteration
-
-        // create a mapping from vertices to linear indices
-        std::map<long, long> index_to_vertex = std::map<long, long>();
-        // initialize a colorind mapping regardless of if vertex coloring exists,
-        // will not be populated for uncolored graphs
-        // maps vertex color -> list of subgraph indices with that color
-        std::map<long, std::vector<long> > coloring = std::map<long, std::vector<long> >();
-        std::map<long, int16_t> index_to_coloring = std::map<long, int16_t>();
-        // create an empty vector for edge colors
-        std::vector<int8_t> edge_colors = std::vector<int8_t>();
-
-        short index = 0;
-        for (short level = 0; level <= i - 1; ++level) {
-            for (std::unordered_set<long>::iterator it = S[level].begin(); it != S[level].end(); ++it, ++index) {
-                // map this vertex to an index between 0 and k - 1
-                index_to_vertex[index] = *it;
-
-
-                if (VERTEX_COLORED) {
-                    // get the color for this vertex
-                    int16_t color = G->vertices[*it]->color;
-
-                    // if this color is not yet seen, create a new vector for these colors
-                    if (coloring.find(color) == coloring.end()) {
-                        coloring[color] = std::vector<long>();
-                    }
+    short first = level_offsets[i];
+    short last = level_offsets[i + 1];
+
+    // the rows for the previously selected vertices are unchanged except for the new columns
+    memcpy(adjacency[i + 1], adjacency[i], first * sizeof(setword));
+
+    for (short ip = first; ip < last; ++ip) {
+        adjacency[i + 1][ip] = 0;
+    }
 
-                    // add this index to the coloring
-                    coloring[color].push_back(index);
+    // only pairs with at least one vertex from S[i] need a look up
+    for (short ip = first; ip < last; ++ip) {
+        long v = subgraph[ip];
 
-                    // create a mapping from the indices to the coloring
-                    index_to_coloring[index] = color;
+        for (short iq = 0; iq < ip; ++iq) {
+            long w = subgraph[iq];
+
+            // resolve the edge colors with the same look up that finds the edge
+            if (EDGE_COLORED) {
+                int8_t color = G->EdgeColor(v, w);
+                if (color != -1) {
+                    ADDELEMENT(&(adjacency[i + 1][ip]), iq);
+                    edge_colors[ip][iq] = color;
+                }
+
+                color = G->EdgeColor(w, v);
+                if (color != -1) {
+                    ADDELEMENT(&(adjacency[i + 1][iq]), ip);
+                    edge_colors[iq][ip] = color;
                 }
             }
+            else {
+                if (G->HasEdge(v, w)) ADDELEMENT(&(adjacency[i + 1][ip]), iq);
+                if (G->HasEdge(w, v)) ADDELEMENT(&(adjacency[i + 1][iq]), ip);
+            }
         }
+    }
+}
 
-        // the size of the motif
-        long k = index;
-
-        // create the paths that link together all layers
-        // note this is skipped when there is only one layer
-        if (EDGE_COLORED) {
-            // create a cycle
-            for (int8_t il = 0; il < nvertex_layers; ++il) {
-                // iterate over all nodes in the subgraph
-                for (long iv = 0; iv < k; ++iv) {
-                    // the graph goes 0, k, 2 * k ... correspond to the same node
-                    long current_vertex_layer_index = iv + il * k;
 
-                    // create a cycle between the nodes in the same grouping
-                    long next_vertex_layer_index;
-                    if (il == nvertex_layers - 1) next_vertex_layer_index = iv;
-                    else next_vertex_layer_index = iv + (il + 1) * k;
 
-                    // connect these two vertices in the graph
-                    // do not believe these have to be bidirectional edges
-                    ADDELEMENT((GRAPHROW(nauty_graph->matrix, current_vertex_layer_index, nauty_graph->no_setwords)), next_vertex_layer_index);
-                }
+long Validate(CSRGraph *G, long threshold, short i)
+{
+    /*
+    Find the valid vertices for the next recursive level. Excludes elements with indices smaller
+    than the root vertex and those already visited at a previous recursive level
+
+    @param G: graph
+    @param threshold: the enumeration threshold of the root vertex
+    @param i: current depth of the tree (parents are the selected vertices S[i - 1])
+
+    Writes the valid vertices for this level into the frontier starting at frontier_offsets[i]
+    and returns the number of valid vertices
+    */
+
+    // the valid vertices for this level are stacked after those of the previous level
+    long *valid_vertices = frontier + frontier_offsets[i];
+    long nvalid_vertices = 0;
+
+    // iterate over all the parents of this layer
+    for (short ip = level_offsets[i - 1]; ip < level_offsets[i]; ++ip) {
+        long v = subgraph[ip];
+
+        // neighbors are sorted by enumeration order so only the tail of the list is valid
+        // the threshold uses <= rather than < since u is always in visited as the S[0] entry
+        // By using <=, we can enumerate all subgraphs with duplication by setting the enumeration indices to be non unique
+        long *last = G->neighbors + G->neighbor_offsets[v + 1];
+        long *first = std::lower_bound(G->neighbors + G->neighbor_offsets[v], last, threshold);
+
+        // iterate over all the higher ordered neighbors of this parent
+        for (long *it = first; it != last; ++it) {
+            long w = *it;
+
+            // only consider neighbors that are in the same community if community based
+            if (COMMUNITY_BASED && G->communities[v] != G->communities[w]) continue;
+
+            // add the neighbor if it has not been visited
+            if (!visited[w]) {
+                valid_vertices[nvalid_vertices] = w;
+                visited[w] = true;
+                nvalid_vertices += 1;
             }
         }
+    }
+
+    // the next level begins after these valid vertices
+    frontier_offsets[i + 1] = frontier_offsets[i] + nvalid_vertices;
+
+    return nvalid_vertices;
+}
+
+
+
+void Canonize(CSRGraph *G, long k, short i, uint64_t *certificate)
+{
+    /*
+    Canonically label the subgraph S[0] ... S[i - 1] with nauty and construct its certificate.
+    Afterwards nauty_graph->lab[iv] gives the subgraph index that maps to the iv'th location.
+
+    @param G: graph
+    @param k: motif size
+    @param i: current depth of the tree
+    @param certificate: the packed certificate to populate (must be zeroed)
+    */
+    unsigned char *certificate_bytes = (unsigned char *) certificate;
+    short ncertificate_bytes = 0;
+
+    // set when every vertex of a vertex colored subgraph has a different color
+    bool discrete_partition = false;
 
+    // the paths that link together all layers are the same for every subgraph
+    if (EDGE_COLORED) {
+        memcpy(nauty_graph->matrix, layered_cycles, nauty_graph->no_vertices * nauty_graph->no_setwords * sizeof(setword));
+    }
 
+    // the adjacency of the subgraph and its edge colors were built while descending
+    if (EDGE_COLORED && nvertex_layers > 1) {
         for (long out_index = 0; out_index < k; ++out_index) {
-            long out_vertex = index_to_vertex[out_index];
             for (long in_index = 0; in_index < k; ++in_index) {
-                long in_vertex = index_to_vertex[in_index];
-
-                // there is an edge from out_vertex to in_vertex
-                if (G->vertices[out_vertex]->outgoing_neighbors.find(in_vertex) != G->vertices[out_vertex]->outgoing_neighbors.end()) {
-                    // if the graph is edge colored, we need to add edges between the correct layers
-                    if (EDGE_COLORED && nvertex_layers > 1) {
-                        // get the color for this edge
-                        Edge *edge = G->edges[std::pair<long, long>(out_vertex, in_vertex)];
-                        // add one to the edge color here since the colors are 0-indexed
-                        int8_t color = edge->color + 1;
-                        long current_layer = 0;
-                        while (color) {
-                            // the bit is one at the rightmost location
-                            if (color % 2) {
-                                long layered_out_index = out_index + current_layer * k;
-                                long layered_in_index = in_index + current_layer * k;
-
-                                // add this edge to this particular layer
-                                ADDELEMENT((GRAPHROW(nauty_graph->matrix, layered_out_index, nauty_graph->no_setwords)), layered_in_index);
-                            }
-
-                            // shift the bits over by one and continue to the next layer
-                            color = color / 2;
-                            current_layer += 1;
-                        }
-                    }
-                    else {
-                        // ther are no layers to worry about in this scenario
-                        ADDELEMENT((GRAPHROW(nauty_graph->matrix, out_index, nauty_graph->no_setwords)), in_index);
+                // skip over pairs without an edge from out_vertex to in_vertex
+                if (!ISELEMENT(&(adjacency[i][out_index]), in_index)) continue;
+
+                // if the graph is edge colored, we need to add edges between the correct layers
+                // get the color for this edge
+                // add one to the edge color here since the colors are 0-indexed
+                int8_t color = edge_colors[out_index][in_index] + 1;
+                long current_layer = 0;
+                while (color) {
+                    // the bit is one at the rightmost location
+                    if (color % 2) {
+                        long layered_out_index = out_index + current_layer * k;
+                        long layered_in_index = in_index + current_layer * k;
+
+                        // add this edge to this particular layer
+                        ADDELEMENT((GRAPHROW(nauty_graph->matrix, layered_out_index, nauty_graph->no_setwords)), layered_in_index);
                     }
+
+                    // shift the bits over by one and continue to the next layer
+                    color = color / 2;
+                    current_layer += 1;
                 }
             }
         }
+    }
+    else {
+        // ther are no layers to worry about in this scenario, copy the k rows (one setword each)
+        for (long out_index = 0; out_index < k; ++out_index) {
+            *GRAPHROW(nauty_graph->matrix, out_index, nauty_graph->no_setwords) |= adjacency[i][out_index];
+        }
+    }
 
-        /*
-        If nauty_graph->options->defaultptn = FALSE the vertices have colors. The colors are determined by the
-        arrays int *lab and int *ptn. If nauty_graph->options->getcanon = TRUE, nauty_graph->lab will list the vertices in g
-        in the otder in which they need to be relabelled..
-        */
-
-        // set *ptn and *lab for graph coloring
-        if (EDGE_COLORED) {
-            // keep a linear index for the permuation arrays (lab, ptn)
-            long permuation_index = 0;
+    /*
+    If nauty_graph->options->defaultptn = FALSE the vertices have colors. The colors are determined by the
+    arrays int *lab and int *ptn. If nauty_graph->options->getcanon = TRUE, nauty_graph->lab will list the vertices in g
+    in the otder in which they need to be relabelled..
+    */
 
-            // each layer receives a unique coloring
-            for (int8_t il = 0; il < nvertex_layers; ++il) {
-                // go through all vertices in this layer
-                for (long iv = 0; iv < k; ++iv) {
-                    // set the labeling for this permutation index to this vertex
-                    nauty_graph->lab[permuation_index] = iv + il * k;
+    // set *ptn and *lab for graph coloring
+    if (EDGE_COLORED) {
+        // keep a linear index for the permuation arrays (lab, ptn)
+        long permuation_index = 0;
 
-                    // all values of ptn should be one except for the end of the coloring (which happens at the last layer)
-                    // set all to one here and after this loop set the previous index to 0
-                    nauty_graph->ptn[permuation_index] = 1;
+        // each layer receives a unique coloring
+        for (int8_t il = 0; il < nvertex_layers; ++il) {
+            // go through all vertices in this layer
+            for (long iv = 0; iv < k; ++iv) {
+                // set the labeling for this permutation index to this vertex
+                nauty_graph->lab[permuation_index] = iv + il * k;
 
-                    permuation_index += 1;
-                }
+                // all values of ptn should be one except for the end of the coloring (which happens at the last layer)
+                // set all to one here and after this loop set the previous index to 0
+                nauty_graph->ptn[permuation_index] = 1;
 
-                nauty_graph->ptn[permuation_index - 1] = 0;
+                permuation_index += 1;
             }
+
+            nauty_graph->ptn[permuation_index - 1] = 0;
         }
-        else if (VERTEX_COLORED) {
-            // keep a linear index for the permutation arrays (lab, ptn)
-            long permutation_index = 0;
+    }
+    else if (VERTEX_COLORED) {
+        // order the (color, index) pairs by color (ties by index) with an insertion sort over the k vertices
+        int16_t sorted_colors[MAX_MOTIF_SIZE];
+        for (long iv = 0; iv < k; ++iv) {
+            int16_t color = G->colors[subgraph[iv]];
+
+            long permutation_index = iv;
+            while (permutation_index > 0 && sorted_colors[permutation_index - 1] > color) {
+                sorted_colors[permutation_index] = sorted_colors[permutation_index - 1];
+                nauty_graph->lab[permutation_index] = nauty_graph->lab[permutation_index - 1];
+                permutation_index -= 1;
+            }
 
-            // go through the colors in order
-            for (std::map<long, std::vector<long> >::iterator it = coloring.begin(); it != coloring.end(); ++it) {
-                for (unsigned long iv = 0; iv < it->second.size(); ++iv) {
-                    long vertex_index = it->second[iv];
+            // set the labeling for this permutation index to this vertex between (0, k - 1)
+            sorted_colors[permutation_index] = color;
+            nauty_graph->lab[permutation_index] = iv;
+        }
 
-                    // set the labeling for this permutation index to this vertex between (0, k - 1)
-                    nauty_graph->lab[permutation_index] = vertex_index;
-                    // all values of ptn should be one except for the end of the coloring
-                    // set all to one here, and after this loop set the previous index to 0
-                    nauty_graph->ptn[permutation_index] = 1;
+        // all values of ptn should be one except for the end of each coloring which is 0
+        discrete_partition = true;
+        for (long iv = 0; iv < k; ++iv) {
+            if (iv == k - 1 || sorted_colors[iv] != sorted_colors[iv + 1]) nauty_graph->ptn[iv] = 0;
+            else { nauty_graph->ptn[iv] = 1; discrete_partition = false; }
+        }
+    }
 
-                    permutation_index += 1;
-                }
+    // with all colors distinct the partition is discrete and already the canonical labeling, so
+    // the canonical graph is the adjacency permuted into color order (no nauty call is needed)
+    if (discrete_partition) {
+        for (long iv1 = 0; iv1 < k; ++iv1) {
+            setword *row = GRAPHROW(nauty_graph->cmatrix, iv1, nauty_graph->no_setwords);
+            *row = 0;
 
-                // the last element input should have a value of 0 since it ended the coloring
-                nauty_graph->ptn[permutation_index - 1] = 0;
+            for (long iv2 = 0; iv2 < k; ++iv2) {
+                if (ISELEMENT(&(adjacency[i][nauty_graph->lab[iv1]]), nauty_graph->lab[iv2])) ADDELEMENT(row, iv2);
             }
         }
-
+    }
+    else {
         // call the dense version of nauty
         densenauty(
                     nauty_graph->matrix,
@@ -359,129 +550,158 @@ void EnumerateVertex(Graph *G,
                     nauty_graph->no_vertices,
                     nauty_graph->cmatrix
                 );
+    }
 
-        // get the certificate
-        std::string certificate = std::string();
+    // the edge colors in canonical order
+    int8_t canonical_edge_colors[MAX_MOTIF_SIZE * MAX_MOTIF_SIZE];
+    short ncanonical_edge_colors = 0;
 
-        if (EDGE_COLORED) {
-            // go through all vertices in the small subgraph
-            // we only need to consider the first set
-            std::vector<long> vertex_ordering = std::vector<long>();
-            for (long iv = 0; iv < k; ++iv) {
-                // nauty_graph->lab[iv] gives the original index that maps to the iv'th location
-                vertex_ordering.push_back(index_to_vertex[nauty_graph->lab[iv]]);
-            }
+    // get the certificate
+    if (EDGE_COLORED) {
+        // condensed graph with the vertices of the first layer in their canonical ordering
+        // nauty_graph->lab[iv] gives the subgraph index that maps to the iv'th location
+        setword condensed_matrix[MAX_MOTIF_SIZE];
 
-            // create a temporary nauty graph so that we can add vertices in their
-            // canonical ordering and copy the adjacency matrix
-            NyGraph *condensed_nauty_graph = new NyGraph(k, false);
+        // iterate over all vertices
+        for (long iv1 = 0; iv1 < k; ++iv1) {
+            long index_one = nauty_graph->lab[iv1];
+            condensed_matrix[iv1] = 0;
 
-            // iterate over all vertices
-            for (long iv1 = 0; iv1 < k; ++iv1) {
-                long vertex_one = vertex_ordering[iv1];
+            for (long iv2 = 0; iv2 < k; ++iv2) {
+                long index_two = nauty_graph->lab[iv2];
 
-                for (long iv2 = 0; iv2 < k; ++iv2) {
-                    long vertex_two = vertex_ordering[iv2];
+                // skip over edges that are missing
+                if (!ISELEMENT(&(adjacency[i][index_one]), index_two)) continue;
 
-                    // skip over edges that are missing
-                    if (G->edges.find(std::pair<long, long>(vertex_one, vertex_two)) == G->edges.end()) continue;
+                canonical_edge_colors[ncanonical_edge_colors] = edge_colors[index_one][index_two];
+                ncanonical_edge_colors += 1;
 
-                    // get the color for this edge
-                    Edge *edge = G->edges[std::pair<long, long>(vertex_one, vertex_two)];
-                    int8_t color = edge->color;
+                ADDELEMENT(&(condensed_matrix[iv1]), iv2);
+            }
+        }
 
-                    edge_colors.push_back(color);
+        // we really only need to write the last byte (in memory) for every vertex since
+        // there is one setword per vertex and motifs have at most 8 vertices
+        // to reduce memory consumption this is better for large number of certificates (reduces the memory needed for certificates by a factor of 8x)
+        for (long iv = 0; iv < k; ++iv) {
+            certificate_bytes[ncertificate_bytes] = ((unsigned char *) &(condensed_matrix[iv]))[7];
+            ncertificate_bytes += 1;
+        }
+    }
+    else {
+        // we really only need to write the last byte (in memory) for every vertex since
+        // there is one setword per vertex and motifs have at most 8 vertices
+        // to reduce memory consumption this is better for large number of certificates (reduces the memory needed for certificates by a factor of 8x)
+        for (long iv = 0; iv < k; ++iv) {
+            certificate_bytes[ncertificate_bytes] = ((unsigned char *) GRAPHROW(nauty_graph->cmatrix, iv, nauty_graph->no_setwords))[7];
+            ncertificate_bytes += 1;
+        }
+    }
 
-                    ADDELEMENT((GRAPHROW(condensed_nauty_graph->matrix, iv1, condensed_nauty_graph->no_setwords)), iv2);
-                }
+    // add the edge coloring to the certificate
+    if (EDGE_COLORED) {
+        // go through all of the found edges
+        for (short ie = 0; ie < ncanonical_edge_colors; ++ie) {
+            certificate_bytes[ncertificate_bytes] = canonical_edge_colors[ie];
+            ncertificate_bytes += 1;
+        }
+    }
+    // add the vertex coloring to the certificate
+    else if (VERTEX_COLORED) {
+        // go through all vertices in the small subgraph
+        for (long iv = 0; iv < k; ++iv) {
+            // the value of int *lab after the call to nauty returns the vertices of
+            // g in order in which they need to be relabelled to give the canonical graph
+            // so lab[iv] gives the original index that maps to this location in the
+            // canonical labeling, and the color of subgraph[lab[iv]] gives the color of that vertex
+            int16_t color = G->colors[subgraph[nauty_graph->lab[iv]]];
+
+            // convert the long into bytes
+            short nbytes_per_short = 2;
+            for (long ib = 0; ib < nbytes_per_short; ++ib) {
+                // first remove the bits in the previous bytes
+                // then remove the bits lower order than this
+                unsigned char byte = (color << 8 * ib) >> 8;
+                certificate_bytes[ncertificate_bytes] = byte;
+                ncertificate_bytes += 1;
             }
+        }
+    }
 
-            // get the canonical labeling from the certificate
-            long nbytes = condensed_nauty_graph->no_vertices * condensed_nauty_graph->no_setwords * sizeof(setword);
-            unsigned char certificate_bytes[nbytes];
+    // clear the graph
+    EMPTYGRAPH(nauty_graph->matrix, nauty_graph->no_setwords, nauty_graph->no_vertices);
+}
 
-            // get the canonical labeling from the certificate
-            memcpy(&(certificate_bytes[0]), &(condensed_nauty_graph->matrix[0]), nbytes);
 
-            // construct a string certificate - need to iteratively add chars to the string
-            // to allow for null characters which are common in the cmatrix
-            for (long iv = 0; iv < nbytes; ++iv) {
-                // we really only need to write the last two bytes for every vertex
-                // to reduce memory consumption this is better for large number of certificates (reduces the memory needed for certificates by a factor of 8x)
-                // this still allows for motifs of size 8 for colored edges
-                long byte_index = iv % 8;
-                if (byte_index != 7) continue;
 
-                certificate.push_back(certificate_bytes[iv]);
-            }
+void EnumerateVertex(CSRGraph *G,
+                     long threshold,
+                     short rem,
+                     short i)
+{
+    /*
+    Enumerate all subgraphs of size rem that contain vertices in S[0] ... S[i - 1]
 
-            delete condensed_nauty_graph;
-        }
-        else {
-            // get the canonical labeling from the certificate
-            long nbytes = nauty_graph->no_vertices * nauty_graph->no_setwords * sizeof(setword);
-            unsigned char certificate_bytes[nbytes];
-
-            memcpy(&(certificate_bytes[0]), &(nauty_graph->cmatrix[0]), nbytes);
-
-            // construct a string certificate - need to iteratively add chars to the string
-            // to allow for null characters which are common in the cmatrix
-            for (long iv = 0; iv < nbytes; ++iv) {
-                // we really only need to write the last two bytes for every vertex
-                // to reduce memory consumption this is better for large number of certificates (reduces the memory needed for certificates by a factor of 8x)
-                // this still allows for motifs of size 8 for non-colored edges
-                long byte_index = iv % 8;
-                if (byte_index != 7) continue;
-
-                certificate.push_back(certificate_bytes[iv]);
-            }
-        }
+    @param G: graph
+    @param threshold: the enumeration threshold of the root vertex
+    @param rem: number of remaining vertices to be selected
+    @param i: current depth of the tree
 
-        // add the edge coloring to the certificate
-        if (EDGE_COLORED) {
-            // go through all of the found edges
-            for (unsigned long ie = 0; ie < edge_colors.size(); ++ie) {
-                int8_t color = edge_colors[ie];
-                certificate.push_back(color);
-            }
-        }
-        // add the vertex coloring to the certificate
-        else if (VERTEX_COLORED) {
-            // go through all vertices in the small subgraph
-            for (long iv = 0; iv < k; ++iv) {
-                // the value of int *lab after the call to nauty returns the vertices of
-                // g in order in which they need to be relabelled to give the canonical graph
-                // so lab[iv] gives the original index that maps to this location in the
-                // canonical labeling, and index_to_coloring[labl[iv]] gives the color of that vertex
-                int16_t color = index_to_coloring[nauty_graph->lab[iv]];
-
-                // convert the long into bytes
-                short nbytes_per_short = 2;
-                for (long ib = 0; ib < nbytes_per_short; ++ib) {
-                    // first remove the bits in the previous bytes
-                    // then remove the bits lower order than this
-                    unsigned char byte = (color << 8 * ib) >> 8;
-                    certificate.push_back(byte);
+    Returns a generator that continually gives the next subgraph that contains S[0] ... S[i - 1] of
+    the appropriate size (k)
+    */
+
+    // if there are no remaining vertices to add, subgraph size limit reached
+    if (!rem) {
+        // the vertices in S[0] to S[i - 1] contain the subgraph and subgraph[iv] maps
+        // the linear index iv between 0 and k - 1 to its vertex
+        // note that the entries after S[i - 1] do not belong to the subgraph but a previous iteration
+
+        // the size of the motif
+        long k = level_offsets[i];
+
+        // the certificate is packed into fixed width words, unused bytes remain zero
+        uint64_t certificate[MAX_CERTIFICATE_WORDS];
+        memset(certificate, 0, certificates->nwords * sizeof(uint64_t));
+
+        // small colorless motifs have an exhaustive table of certificates
+        if (table) {
+            long index = table->Index(adjacency[i]);
+            certificate[0] = table->certificates[index];
+
+            // the canonical labeling is only needed to write the subgraph
+            if (WRITE_SUBGRAPHS) {
+                for (long iv = 0; iv < k; ++iv) {
+                    nauty_graph->lab[iv] = (table->labs[index] >> (8 * iv)) & 255;
                 }
             }
         }
-
-        // add this enumerated subgraph to the grouping of certificates
-        if (certificates.find(certificate) == certificates.end()) {
-            certificates[certificate] = 1;
+        // subgraphs with the same adjacency and colors (before canonization) share certificates
+        else if (cache) {
+            uint64_t key[MAX_CACHE_KEY_WORDS];
+            CacheKey(G, k, i, key);
+
+            // run nauty only when this subgraph is not yet in the cache
+            if (!cache->Lookup(key, certificate, nauty_graph->lab)) {
+                Canonize(G, k, i, certificate);
+                cache->Insert(key, certificate, nauty_graph->lab);
+            }
         }
         else {
-            certificates[certificate] += 1;
+            Canonize(G, k, i, certificate);
         }
 
+        // add this enumerated subgraph to the grouping of certificates
+        certificates->Add(certificate);
+
         // write the subgraph and labeling to disk if required
         if (WRITE_SUBGRAPHS) {
+            // other workers cannot interleave within this line
+            flockfile(subgraph_fp);
+
             // write the certificate for this subgraph
-            const char *certificate_chars = certificate.c_str();
+            WriteCertificate(subgraph_fp, certificate, CertificateLength(certificate, k));
 
-            for (unsigned long iv = 0; iv < certificate.length(); ++iv) {
-                fprintf(subgraph_fp, "%02x", (unsigned char) certificate_chars[iv]);
-            }
             // create separation for certificate to vertices
             fprintf(subgraph_fp, ": ");
 
@@ -490,18 +710,17 @@ void EnumerateVertex(Graph *G,
                 // as above, the value of int *lab after the call to nauty returns the vertices of
                 // g in order in which they need to be relablled to give the canonical graph
                 // so lab[iv] gives the original index that maps to this location in the canonical
-                // labeling, and index_to_vertex[lab[iv]] gives the original vertex value
-                long vertex = index_to_vertex[nauty_graph->lab[iv]];
+                // labeling, and subgraph[lab[iv]] gives the original vertex value
+                long vertex = subgraph[nauty_graph->lab[iv]];
 
-                fprintf(subgraph_fp, "%ld ", vertex);
+                fprintf(subgraph_fp, "%ld ", G->indices[vertex]);
             }
 
             // create a new line between this and the next subgraph
             fprintf(subgraph_fp, "\n");
-        }
 
-        // clear the graph
-        EMPTYGRAPH(nauty_graph->matrix, nauty_graph->no_setwords, nauty_graph->no_vertices);
+            funlockfile(subgraph_fp);
+        }
 
         // update the total enumerated subgraphs
         enumerated_subgraphs += 1;
@@ -511,96 +730,632 @@ void EnumerateVertex(Graph *G,
     }
 
     // get the valid vertices
-    std::vector<long> valid_vertices = Validate(G, S[i - 1], u, visited);
+    long nvalid_vertices = Validate(G, threshold, i);
+    long *valid_vertices = frontier + frontier_offsets[i];
 
     // the max number of vertices for this layer is the minimum of the number of children or the remaining
-    short n_i = std::min(valid_vertices.size(), (unsigned long)rem);
+    short n_i = std::min(nvalid_vertices, (long)rem);
 
     for (short k_i = 1; k_i <= n_i; ++k_i) {
-        // get all combinations of size k_i for the valid vertices and recurse from there
-        Combinations(G, u, S, rem, k_i, i, visited, valid_vertices, k_i);
+        // generate all combinations of size k_i for the valid vertices iteratively in lexicographic
+        // order, combination holds the indices into the valid vertices
+        long combination[MAX_MOTIF_SIZE];
+        for (short ic = 0; ic < k_i; ++ic) {
+            combination[ic] = ic;
+        }
+
+        // S[i] contains the k_i vertices of the current combination
+        level_offsets[i + 1] = level_offsets[i] + k_i;
+
+        while (true) {
+            // a split root only enumerates every root_nparts'th combination of S[1] starting at root_part
+            bool skip = false;
+            if (i == 1 && root_nparts > 1) {
+                skip = (root_combinations % root_nparts != root_part);
+                root_combinations += 1;
+            }
+
+            if (!skip) {
+                // update the selection at this level with this combination
+                for (short ic = 0; ic < k_i; ++ic) {
+                    subgraph[level_offsets[i] + ic] = valid_vertices[combination[ic]];
+                }
+
+                // add the new rows and columns to the adjacency bitmask
+                UpdateAdjacency(G, i);
+
+                // enumerate given this new combination
+                EnumerateVertex(G, threshold, rem - k_i, i + 1);
+            }
+
+            // find the rightmost index that can still be incremented
+            short ic = k_i - 1;
+            while (ic >= 0 && combination[ic] == nvalid_vertices - k_i + ic) ic -= 1;
+
+            // all combinations of size k_i are complete
+            if (ic < 0) break;
+
+            // increment this index and reset all indices to its right
+            combination[ic] += 1;
+            for (short jc = ic + 1; jc < k_i; ++jc) {
+                combination[jc] = combination[jc - 1] + 1;
+            }
+        }
     }
 
     // remove all the valid vertices from the list of visited
     // finished all subgraphs for this level and proceed back to level above (closer to root)
-    for (unsigned long it = 0; it < valid_vertices.size(); ++it) {
-        visited.erase(valid_vertices[it]);
+    for (long iv = 0; iv < nvalid_vertices; ++iv) {
+        visited[valid_vertices[iv]] = false;
     }
 
 }
 
 
 
-void EnumerateSubgraphsFromNode(Graph *G, short k, long u)
+float EnumerateSubgraphsFromNode(CSRGraph *G, short k, long index, short part, short nparts)
 {
     /*
-    Enumerate all subgraphs of a given motif size rooted at a given vertex
+    Enumerate all subgraphs of a given motif size rooted at a given vertex into the certificates
 
     @param G: graph
     @param k: motif size
-    @param u: root vertex index
+    @param index: root vertex index
+    @param part: the part of the root to enumerate (between 0 and nparts - 1)
+    @param nparts: the number of parts, every part enumerates a stride of the combinations for S[1]
 
-    Returns a generator that continually gives the next subgraph in the graph rooted as this vertex
+    Returns the processor time in seconds
     */
     // start statistics
-    clock_t start_time = clock();
+    double start_time = ThreadTime();
     enumerated_subgraphs = 0;
 
-    // get the number of layers (duplicate nodes) for edge colored graphs
-    if (EDGE_COLORED) {
-        nvertex_layers = (long) ceil(log2(G->nedge_types + 1));
-        nauty_graph = new NyGraph(nvertex_layers * k, true);
-    }
-    else if (VERTEX_COLORED) {
-        nauty_graph = new NyGraph(k, true);
-    }
-    else {
-        nauty_graph = new NyGraph(k, false);
-    }
+    // the part of the search tree below the root for this call
+    root_part = part;
+    root_nparts = nparts;
+    root_combinations = 0;
 
-    // create an empty certificates dictionary
-    certificates = std::map<std::string, long>();
+    // the certificates table is empty for every new root
+    assert (!certificates->NEntries());
 
     // make sure this vertex appears in the graph
-    assert (G->vertices.find(u) != G->vertices.end());
-    // can only handle setwords less than 64 bits (motifs smaller than that size)
-    assert (nauty_graph->no_setwords == 1);
-
-    // keep track globally (through parameter passing) the vertices visited at higher enumeration steps
-    std::unordered_set<long> visited = std::unordered_set<long>();
+    long u = G->DenseIndex(index);
+    assert (u != -1);
 
-    // add the root vertex to the visited set
-    visited.insert(u);
+    // mark the root vertex as visited
+    visited[u] = true;
 
     // create the selection (first layer only ever has the root vertex)
-    std::map<long, std::unordered_set<long> > S = std::map<long, std::unordered_set<long> >();
-    S[0] = std::unordered_set<long>();
-    S[0].insert(u);
+    subgraph[0] = u;
+    level_offsets[0] = 0;
+    level_offsets[1] = 1;
+    frontier_offsets[1] = 0;
+
+    // the root vertex has no adjacent vertices in the subgraph (no self loops)
+    adjacency[1][0] = 0;
 
     // enumerate all subgraphs of size k - 1 that contain the root u
-    EnumerateVertex(G, u, S, k - 1, 1, visited);
+    EnumerateVertex(G, G->EnumerationThreshold(u), k - 1, 1);
+
+    // the root is no longer visited
+    visited[u] = false;
 
     // don't include any I/O time in the total time
-    float total_time = (float) (clock() - start_time) / CLOCKS_PER_SEC;
+    return (float) (ThreadTime() - start_time);
+}
 
-    for (std::map<std::string, long>::iterator it = certificates.begin(); it != certificates.end(); ++it) {
-        const char *certificate = it->first.c_str();
 
-        for (unsigned long iv = 0; iv < it->first.length(); ++iv) {
-            fprintf(certificate_fp, "%02x", (unsigned char) certificate[iv]);
-        }
-        fprintf(certificate_fp, ": %ld\n", it->second);
+
+void WriteRoot(long position, char *buffer, size_t size)
+{
+    /*
+    Write the certificates of a finished root to the certificate file. Roots are written in
+    queue order so the file matches single threaded enumeration, and roots that finish
+    before an earlier root wait in memory.
+
+    @param position: the position of the root in the queue
+    @param buffer: the certificates and statistics for this root (freed after writing)
+    @param size: the number of characters in the buffer
+    */
+    std::lock_guard<std::mutex> lock(output_mutex);
+
+    finished_roots[position] = std::pair<char *, size_t>(buffer, size);
+
+    // write all consecutive roots that are ready
+    std::map<long, std::pair<char *, size_t> >::iterator it;
+    while ((it = finished_roots.find(next_output)) != finished_roots.end()) {
+        fwrite(it->second.first, sizeof(char), it->second.second, certificate_fp);
+        free(it->second.first);
+
+        finished_roots.erase(it);
+        next_output += 1;
     }
 
-    // clear the certificates
-    certificates.clear();
+    fflush(certificate_fp);
+}
+
+
+
+void WriteRootCertificates(CertificateTable *root_certificates, short k, long position, long index, long nsubgraphs, float time)
+{
+    /*
+    Write the certificates of a finished root and its statistics
+
+    @param root_certificates: the histogram of certificates for this root
+    @param k: motif size
+    @param position: the position of the root in the queue
+    @param index: root vertex index
+    @param nsubgraphs: the number of subgraphs enumerated from this root
+    @param time: the processor time in seconds for this root
+    */
+    // the certificates for this root are collected in memory
+    char *buffer;
+    size_t size;
+    FILE *root_fp = open_memstream(&buffer, &size);
+    if (!root_fp) exit(-1);
+
+    root_certificates->Sort();
+
+    if (BINARY_OUTPUT) {
+        short key_width = CertificateKeyWidth(k);
+        assert (key_width <= 8 * MAX_CERTIFICATE_WORDS);
+
+        // counts that do not fit in 32 bits span several records
+        CertificateRootSummary summary;
+        summary.index = index;
+        summary.nsubgraphs = nsubgraphs;
+        summary.time = time;
+        summary.nrecords = 0;
+        for (long ie = 0; ie < root_certificates->NEntries(); ++ie) {
+            summary.nrecords += (root_certificates->Count(ie) + UINT32_MAX - 1) / UINT32_MAX;
+        }
+
+        // the summary precedes the certificate records of this root
+        fwrite(&summary, sizeof(CertificateRootSummary), 1, root_fp);
+
+        // write the certificates in sorted order as fixed width records
+        unsigned char key[8 * MAX_CERTIFICATE_WORDS];
+        for (long ie = 0; ie < root_certificates->NEntries(); ++ie) {
+            PackCertificateKey(root_certificates->Certificate(ie), k, key);
+
+            long remaining = root_certificates->Count(ie);
+            while (remaining > 0) {
+                uint32_t count = (uint32_t) std::min(remaining, (long) UINT32_MAX);
+                fwrite(key, sizeof(unsigned char), key_width, root_fp);
+                fwrite(&count, sizeof(uint32_t), 1, root_fp);
+
+                remaining -= count;
+            }
+        }
+    }
+    else {
+        // write the certificates in sorted order, only converting to hexadecimal here
+        for (long ie = 0; ie < root_certificates->NEntries(); ++ie) {
+            const uint64_t *certificate = root_certificates->Certificate(ie);
+
+            WriteCertificate(root_fp, certificate, CertificateLength(certificate, k));
+            fprintf(root_fp, ": %ld\n", root_certificates->Count(ie));
+        }
+
+        // print statistics
+        fprintf(root_fp, "Enumerated %ld subgraphs for node %ld in %0.6f seconds.\n", nsubgraphs, index, time);
+    }
+
+    fclose(root_fp);
+    WriteRoot(position, buffer, size);
+
+    nroots_finished += 1;
+}
+
+
+
+void MergeRootPart(short k, const WorkItem &item, long index, float time)
+{
+    /*
+    Merge the certificates of one part of a split root, the last part to finish writes the root
+
+    @param k: motif size
+    @param item: the work item for this part
+    @param index: root vertex index
+    @param time: the processor time in seconds for this part
+    */
+    SplitRoot root;
+    {
+        std::lock_guard<std::mutex> lock(split_mutex);
+
+        // the first part to finish creates the merged histogram
+        if (!split_roots.count(item.position)) {
+            SplitRoot empty_root;
+            empty_root.certificates = new CertificateTable(certificates->nwords);
+            empty_root.enumerated_subgraphs = 0;
+            empty_root.time = 0;
+            empty_root.nfinished = 0;
+
+            split_roots[item.position] = empty_root;
+        }
+
+        SplitRoot &merged_root = split_roots[item.position];
+        for (long ie = 0; ie < certificates->NEntries(); ++ie) {
+            merged_root.certificates->Add(certificates->Certificate(ie), certificates->Count(ie));
+        }
+        merged_root.enumerated_subgraphs += enumerated_subgraphs;
+        merged_root.time += time;
+        merged_root.nfinished += 1;
+
+        // other parts are still running
+        if (merged_root.nfinished < item.nparts) return;
+
+        root = merged_root;
+        split_roots.erase(item.position);
+    }
+
+    WriteRootCertificates(root.certificates, k, item.position, index, root.enumerated_subgraphs, root.time);
+
+    delete root.certificates;
+}
+
+
+
+void EnumerateRoots(CSRGraph *G, short k, const long *roots, const WorkItem *items, long nitems)
+{
+    /*
+    Worker that enumerates the roots (or parts of roots) claimed from the shared queue until it is empty
+
+    @param G: graph (shared and read only)
+    @param k: motif size
+    @param roots: the root vertex indices in queue order
+    @param items: the work items in queue order
+    @param nitems: the number of work items
+    */
+    // allocate the recursion state, every vertex appears at most once in the frontiers
+    visited = (bool *)calloc(G->NVertices(), sizeof(bool));
+    if (!visited && G->NVertices()) exit(-1);
+    frontier = (long *)malloc(G->NVertices() * sizeof(long));
+    if (!frontier && G->NVertices()) exit(-1);
+
+    // create the histogram of certificates
+    certificates = new CertificateTable(CertificateWords(k));
+    if (use_cache) cache = new CanonicalCache(CANONICAL_CACHE_SIZE, CacheKeyWords(k), CertificateWords(k), k);
+
+    // create the nauty graph for canonical labeling
+    if (EDGE_COLORED) nauty_graph = new NyGraph(nvertex_layers * k, true);
+    else if (VERTEX_COLORED) nauty_graph = new NyGraph(k, true);
+    else nauty_graph = new NyGraph(k, false);
+
+    // can only handle setwords less than 64 bits (motifs smaller than that size)
+    assert (nauty_graph->no_setwords == 1);
+
+    // create the paths that link together all layers for edge colored graphs
+    if (EDGE_COLORED) {
+        // create a cycle
+        for (int8_t il = 0; il < nvertex_layers; ++il) {
+            // iterate over all nodes in the subgraph
+            for (long iv = 0; iv < k; ++iv) {
+                // the graph goes 0, k, 2 * k ... correspond to the same node
+                long current_vertex_layer_index = iv + il * k;
+
+                // create a cycle between the nodes in the same grouping
+                long next_vertex_layer_index;
+                if (il == nvertex_layers - 1) next_vertex_layer_index = iv;
+                else next_vertex_layer_index = iv + (il + 1) * k;
+
+                // connect these two vertices in the graph
+                // do not believe these have to be bidirectional edges
+                layered_cycles[current_vertex_layer_index] = 0;
+                ADDELEMENT(&(layered_cycles[current_vertex_layer_index]), next_vertex_layer_index);
+            }
+        }
+    }
+
+    while (true) {
+        // a cancelled enumeration does not start new work items
+        if (cancelled) break;
+
+        // claim the next work item from the queue
+        long claim = next_item.fetch_add(1);
+        if (claim >= nitems) break;
+
+        const WorkItem &item = items[claim];
+        long index = roots[item.position];
+
+        float time = EnumerateSubgraphsFromNode(G, k, index, item.part, item.nparts);
+        nsubgraphs_finished += enumerated_subgraphs;
+
+        // parts of split roots are merged before writing
+        if (item.nparts == 1) WriteRootCertificates(certificates, k, item.position, index, enumerated_subgraphs, time);
+        else MergeRootPart(k, item, index, time);
+
+        // clear the certificates
+        certificates->Clear();
+    }
+
+    // add the cache statistics for this worker
+    if (cache) {
+        std::lock_guard<std::mutex> lock(output_mutex);
+        cache_hits += cache->hits;
+        cache_misses += cache->misses;
+    }
 
     // free memory
+    free(visited);
+    free(frontier);
+    delete certificates;
+    delete cache;
     delete nauty_graph;
 
-    // print statistics
-    fprintf(certificate_fp, "Enumerated %ld subgraphs for node %ld in %0.6f seconds.\n", enumerated_subgraphs, u, total_time);
-    fflush(certificate_fp);
+    visited = NULL;
+    frontier = NULL;
+    certificates = NULL;
+    cache = NULL;
+    nauty_graph = NULL;
+}
+
+
+
+std::vector<WorkItem> SplitRoots(CSRGraph *G, short k, const long *roots, long nroots)
+{
+    /*
+    Create the work items for the roots. With multiple threads, roots whose estimated cost is a large
+    fraction of the work per thread are split into parts by the combinations for S[1], so hub vertices
+    do not leave the other workers idle at the end.
+
+    @param G: graph
+    @param k: motif size
+    @param roots: the root vertex indices in queue order
+    @param nroots: the number of roots
+    */
+    // estimate the cost of every root from its higher ordered neighbors (the first level of the tree)
+    std::vector<double> costs = std::vector<double>(nroots, 0);
+    std::vector<long> degrees = std::vector<long>(nroots, 0);
+    double total_cost = 0;
+
+    for (long ir = 0; ir < nroots; ++ir) {
+        long u = G->DenseIndex(roots[ir]);
+        assert (u != -1);
+
+        long *first = G->neighbors + G->neighbor_offsets[u];
+        long *last = G->neighbors + G->neighbor_offsets[u + 1];
+        degrees[ir] = last - std::lower_bound(first, last, G->EnumerationThreshold(u));
+
+        costs[ir] = pow((double) degrees[ir], k - 1);
+        total_cost += costs[ir];
+    }
+
+    // the cost above which roots are split
+    double split_cost = SPLIT_FRACTION * total_cost / THREADS;
+
+    std::vector<WorkItem> items = std::vector<WorkItem>();
+    for (long ir = 0; ir < nroots; ++ir) {
+        short nparts = 1;
+        // single vertex motifs have no S[1], and a root with one higher ordered neighbor has one combination
+        if (THREADS > 1 && k > 1 && degrees[ir] > 1 && costs[ir] > split_cost) {
+            // there are never more parts than combinations for S[1] (and every root has at least one part)
+            nparts = (short) std::max(std::min(std::min((double) MAX_ROOT_PARTS_PER_THREAD * THREADS, ceil(costs[ir] / split_cost)), (double) degrees[ir]), 1.0);
+        }
+
+        for (short ip = 0; ip < nparts; ++ip) {
+            WorkItem item;
+            item.position = ir;
+            item.part = ip;
+            item.nparts = nparts;
+
+            items.push_back(item);
+        }
+    }
+
+    return items;
+}
+
+
+
+bool ReadCompletedRoots(const char *certificate_filename, std::unordered_set<long> &completed_roots)
+{
+    /*
+    Find the roots with complete results in an existing certificate file and truncate the file after
+    the last complete root (removing a partially written root). Returns false if there is no file.
+
+    @param certificate_filename: the certificate file of an interrupted enumeration
+    @param completed_roots: the set to populate with the complete root vertex indices
+    */
+    FILE *fp = fopen(certificate_filename, "r");
+    if (!fp) return false;
+
+    // the offset after the last "Enumerated" line
+    long complete_offset = 0;
+
+    char *line = NULL;
+    size_t line_capacity = 0;
+    while (getline(&line, &line_capacity, fp) != -1) {
+        // lines without a newline were interrupted while writing
+        if (strncmp(line, "Enumerated ", 11) || !strchr(line, '\n')) continue;
+
+        long nsubgraphs, index;
+        if (sscanf(line, "Enumerated %ld subgraphs for node %ld", &nsubgraphs, &index) != 2) continue;
+
+        completed_roots.insert(index);
+        complete_offset = ftell(fp);
+    }
+
+    free(line);
+    fclose(fp);
+
+    // drop everything after the last complete root
+    if (truncate(certificate_filename, complete_offset)) { fprintf(stderr, "Failed to truncate %s\n", certificate_filename); exit(-1); }
+
+    return true;
+}
+
+
+
+bool ReadCompletedBinaryRoots(const char *certificate_filename, short k, std::unordered_set<long> &completed_roots)
+{
+    /*
+    Find the roots with complete results in an existing binary certificate file and truncate the
+    file after the last complete root. Returns false if there is no file (or not even a complete
+    header).
+
+    @param certificate_filename: the binary certificate file of an interrupted enumeration
+    @param k: motif size
+    @param completed_roots: the set to populate with the complete root vertex indices
+    */
+    FILE *fp = fopen(certificate_filename, "rb");
+    if (!fp) return false;
+
+    CertificateFileHeader header;
+    if (fread(&header, sizeof(CertificateFileHeader), 1, fp) != 1) { fclose(fp); return false; }
+
+    // the file must come from an enumeration of the same motif size and mode
+    CertificateFileHeader expected_header = CertificateHeader(k);
+    if (memcmp(&header, &expected_header, sizeof(CertificateFileHeader))) { fprintf(stderr, "Mismatched certificate file %s\n", certificate_filename); exit(-1); }
+
+    struct stat status;
+    if (fstat(fileno(fp), &status)) { fprintf(stderr, "Failed to read %s\n", certificate_filename); exit(-1); }
+
+    // the offset after the last complete root
+    long complete_offset = sizeof(CertificateFileHeader);
+    long record_size = header.key_width + sizeof(uint32_t);
+
+    // every root is complete if all of the records after its summary are in the file
+    CertificateRootSummary summary;
+    while (!fseek(fp, complete_offset, SEEK_SET) && fread(&summary, sizeof(CertificateRootSummary), 1, fp) == 1) {
+        long root_end = complete_offset + sizeof(CertificateRootSummary) + summary.nrecords * record_size;
+        if (summary.nrecords < 0 || root_end > status.st_size) break;
+
+        completed_roots.insert(summary.index);
+        complete_offset = root_end;
+    }
+
+    fclose(fp);
+
+    // drop everything after the last complete root
+    if (truncate(certificate_filename, complete_offset)) { fprintf(stderr, "Failed to truncate %s\n", certificate_filename); exit(-1); }
+
+    return true;
+}
+
+
+
+void EnumerateSubgraphsFromRoots(CSRGraph *G, const char *certificate_filename, const char *subgraph_filename, short k, const long *nodes, long nnodes)
+{
+    /*
+    Enumerate all subgraphs rooted at the given nodes (or all vertices) with THREADS workers
+    that share one copy of the graph
+
+    @param G: graph (read only)
+    @param certificate_filename: the file to write the certificates to
+    @param subgraph_filename: the file to write the subgraphs to (if required)
+    @param k: motif size
+    @param nodes: the root vertex indices (NULL for all vertices by index)
+    @param nnodes: the number of roots
+    */
+    // the largest motif size supported by the preallocated recursion state (checked in release builds too)
+    if (k < 1 || k > MAX_MOTIF_SIZE) { fprintf(stderr, "Motif size %d is not between 1 and %d\n", k, MAX_MOTIF_SIZE); exit(-1); }
+
+    // enumerate every vertex by its original index if no nodes are given
+    std::vector<long> roots = std::vector<long>();
+    if (!nodes) {
+        for (long iv = 0; iv < G->NVertices(); ++iv) {
+            roots.push_back(G->indices[G->index_order[iv]]);
+        }
+    }
+    else {
+        roots.assign(nodes, nodes + nnodes);
+    }
+
+    // when resuming, skip the roots that are complete in the certificate file
+    bool resumed = false;
+    if (RESUME) {
+        std::unordered_set<long> completed_roots = std::unordered_set<long>();
+        if (BINARY_OUTPUT) resumed = ReadCompletedBinaryRoots(certificate_filename, k, completed_roots);
+        else resumed = ReadCompletedRoots(certificate_filename, completed_roots);
+
+        std::vector<long> remaining_roots = std::vector<long>();
+        for (unsigned long ir = 0; ir < roots.size(); ++ir) {
+            if (!completed_roots.count(roots[ir])) remaining_roots.push_back(roots[ir]);
+        }
+
+        // the python wrapper reports the roots that were complete
+        nroots_resumed = roots.size() - remaining_roots.size();
+
+        roots = remaining_roots;
+    }
+
+    // get the number of layers (duplicate nodes) for edge colored graphs
+    if (EDGE_COLORED) nvertex_layers = (short) ceil(log2(G->nedge_types + 1));
+    else nvertex_layers = 1;
+
+    // small colorless motifs use an exhaustive table, otherwise cache the certificates for subgraphs before canonization
+    // (unless every vertex has a different color since these subgraphs never need nauty)
+    if (!VERTEX_COLORED && !EDGE_COLORED && CanonicalTable::Supported(k, G->directed)) table = new CanonicalTable(k, G->directed);
+    else use_cache = !(VERTEX_COLORED && !EDGE_COLORED && G->DistinctColors());
+
+    // open the file (append after the complete roots when resuming)
+    certificate_fp = fopen(certificate_filename, resumed ? "a" : "w");
+    if (!certificate_fp) { fprintf(stderr, "Failed to open %s\n", certificate_filename); exit(-1); }
+
+    // new binary files start with the header
+    if (BINARY_OUTPUT && !resumed) {
+        CertificateFileHeader header = CertificateHeader(k);
+        fwrite(&header, sizeof(CertificateFileHeader), 1, certificate_fp);
+    }
+
+    // create a new file for writing subgraphs if needed
+    if (WRITE_SUBGRAPHS) {
+        // open the file
+        subgraph_fp = fopen(subgraph_filename, "w");
+        if (!subgraph_fp) { fprintf(stderr, "Failed to open %s\n", subgraph_filename); exit(-1); }
+    }
+
+    // split the expensive roots into parts that different workers enumerate
+    std::vector<WorkItem> items = SplitRoots(G, k, roots.data(), roots.size());
+    nroots_total = roots.size();
+
+    // reset the queue of work items and the output state
+    next_item = 0;
+    next_output = 0;
+    cache_hits = 0;
+    cache_misses = 0;
+
+    // a single worker runs in the calling thread
+    if (THREADS <= 1) {
+        EnumerateRoots(G, k, roots.data(), items.data(), items.size());
+    }
+    else {
+        std::vector<std::thread> workers;
+        for (short it = 0; it < THREADS; ++it) {
+            workers.push_back(std::thread(EnumerateRoots, G, k, (const long *) roots.data(), (const WorkItem *) items.data(), (long) items.size()));
+        }
+        for (short it = 0; it < THREADS; ++it) {
+            workers[it].join();
+        }
+    }
+
+    // a cancelled enumeration discards the roots that finished after an unfinished root, so the
+    // certificate file ends with complete roots in order (and can be resumed)
+    if (cancelled) {
+        for (std::map<long, std::pair<char *, size_t> >::iterator it = finished_roots.begin(); it != finished_roots.end(); ++it) {
+            free(it->second.first);
+        }
+        finished_roots.clear();
+
+        for (std::map<long, SplitRoot>::iterator it = split_roots.begin(); it != split_roots.end(); ++it) {
+            delete it->second.certificates;
+        }
+        split_roots.clear();
+    }
+
+    // every root has been written (checked in release builds too since missing roots silently drop the later ones)
+    if (!finished_roots.empty() || !split_roots.empty()) { fprintf(stderr, "Failed to write %ld roots to %s\n", (long) (finished_roots.size() + split_roots.size()), certificate_filename); exit(-1); }
+
+    // close the files
+    fclose(certificate_fp);
+    if (WRITE_SUBGRAPHS) fclose(subgraph_fp);
+
+    // free memory
+    delete table;
+
+    table = NULL;
+    use_cache = false;
 }
 
 
@@ -633,78 +1388,230 @@ void CppSetWriteSubgraphs(bool input_write_subgraphs) {
 
 
 
-void CppEnumerateSubgraphsSequentially(const char *input_filename, const char *temp_directory, short k)
+void CppSetThreads(short input_threads) {
+    // set the number of worker threads
+    THREADS = input_threads;
+}
+
+
+
+void CppSetResume(bool input_resume) {
+    // set the resume flag
+    RESUME = input_resume;
+}
+
+
+
+void CppSetBinaryOutput(bool input_binary_output) {
+    // set the binary output flag
+    BINARY_OUTPUT = input_binary_output;
+}
+
+
+
+void CppResetProgress(bool input_cancelled) {
+    // reset the progress counters and set whether the next enumeration is cancelled
+    cancelled = input_cancelled;
+    nroots_total = 0;
+    nroots_finished = 0;
+    nroots_resumed = 0;
+    nsubgraphs_finished = 0;
+}
+
+
+
+void CppCancelEnumeration(void) {
+    // stop the running enumeration after the roots in progress (safe to call from any thread)
+    cancelled = true;
+}
+
+
+
+bool CppEnumerationCancelled(void) {
+    // return if the enumeration was cancelled
+    return cancelled;
+}
+
+
+
+long CppRootsTotal(void) {
+    // return the number of roots in the running enumeration
+    return nroots_total;
+}
+
+
+
+long CppRootsFinished(void) {
+    // return the number of roots written by the running enumeration
+    return nroots_finished;
+}
+
+
+
+long CppRootsResumed(void) {
+    // return the number of roots that the running enumeration skipped since they were complete in the certificate file
+    return nroots_resumed;
+}
+
+
+
+long CppSubgraphsFinished(void) {
+    // return the number of subgraphs enumerated by the running enumeration (in finished roots and parts)
+    return nsubgraphs_finished;
+}
+
+
+
+long CppCacheHits(void) {
+    // return the number of canonical cache hits of the last enumeration (added as its workers finish)
+    return cache_hits;
+}
+
+
+
+long CppCacheMisses(void) {
+    // return the number of canonical cache misses of the last enumeration (added as its workers finish)
+    return cache_misses;
+}
+
+
+
+bool SidecarFilename(const char *input_filename, char *sidecar_filename)
 {
-    // read the input file
-    Graph *G = ReadBZ2Graph(input_filename);
-    if (!G) exit(-1);
+    /*
+    Get the location of the sidecar image next to a graph (.graph.csr for .graph.bz2). Returns
+    false if the graph does not end with .graph.bz2.
 
-    // create a new file for writing the certificates
-    char output_filename[4096];
-    snprintf(output_filename, 4096, "%s/certificates/motif-size-%03d-certificates.txt", temp_directory, k);
+    @param input_filename: location for the graph
+    @param sidecar_filename: the location of the sidecar (4096 characters)
+    */
+    size_t length = strlen(input_filename);
+    if (length < 4 || length >= 4096 || strcmp(input_filename + length - 4, ".bz2")) return false;
 
-    // open the file
-    certificate_fp = fopen(output_filename, "w");
-    if (!certificate_fp) { fprintf(stderr, "Failed to open %s\n", output_filename); exit(-1); }
+    strcpy(sidecar_filename, input_filename);
+    strcpy(sidecar_filename + length - 4, ".csr");
 
-    // create a new file for writing subgraphs if needed
-    if (WRITE_SUBGRAPHS) {
-        char subgraph_filename[4096];
-        snprintf(subgraph_filename, 4096, "%s/subgraphs/motif-size-%03d-subgraphs.txt", temp_directory, k);
+    return true;
+}
 
-        // open the file
-        subgraph_fp = fopen(subgraph_filename, "w");
-        if (!subgraph_fp) { fprintf(stderr, "Failed to open %s\n", subgraph_filename); exit(-1); }
-    }
 
-    // iterate over all vertices in the graph
-    for (std::map<long, Vertex *>::iterator it = G->vertices.begin(); it != G->vertices.end(); ++it) {
-        long u = it->first;
-        EnumerateSubgraphsFromNode(G, k, u);
+
+CSRGraph *CppLoadGraph(const char *input_filename)
+{
+    /*
+    Read the graph and compress it for enumeration. Returns NULL if the graph cannot be read.
+    A sidecar image that is at least as new as the graph is mapped instead.
+
+    @param input_filename: location for the graph to enumerate
+    */
+    // map the sidecar rather than decompressing the graph
+    char sidecar_filename[4096];
+    struct stat graph_status, sidecar_status;
+    if (SidecarFilename(input_filename, sidecar_filename) && !stat(input_filename, &graph_status) && !stat(sidecar_filename, &sidecar_status)) {
+        bool up_to_date = sidecar_status.st_mtim.tv_sec > graph_status.st_mtim.tv_sec ||
+            (sidecar_status.st_mtim.tv_sec == graph_status.st_mtim.tv_sec && sidecar_status.st_mtim.tv_nsec >= graph_status.st_mtim.tv_nsec);
+
+        if (up_to_date) {
+            CSRGraph *G = CSRGraph::MapImage(sidecar_filename);
+            if (G) return G;
+        }
     }
 
-    // close the files
-    fclose(certificate_fp);
-    if (WRITE_SUBGRAPHS) fclose(subgraph_fp);
+    // read the input file
+    Graph *graph = ReadBZ2Graph(input_filename);
+    if (!graph) return NULL;
+
+    // compress the graph for enumeration and free the original
+    CSRGraph *G = new CSRGraph(graph);
+    delete graph;
+
+    return G;
+}
+
+
+
+CSRGraph *CppMapGraphImage(const char *image_filename)
+{
+    /*
+    Attach to a graph image shared between processes. Returns NULL if the image cannot be mapped.
+
+    @param image_filename: location for the image written by CppWriteGraphImage
+    */
+    return CSRGraph::MapImage(image_filename);
+}
+
 
+
+bool CppWriteGraphImage(CSRGraph *G, const char *image_filename)
+{
+    /*
+    Write a compressed graph as an image that other processes can attach to without copies
+
+    @param G: the compressed graph
+    @param image_filename: location for the image (e.g., in /dev/shm)
+    */
+    return G->WriteImage(image_filename);
+}
+
+
+
+void CppFreeGraph(CSRGraph *G)
+{
     // free memory
     delete G;
 }
 
 
 
-void CppEnumerateSubgraphsFromNodes(const char *input_filename, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix)
+void CppEnumerateSubgraphsSequentiallyInGraph(CSRGraph *G, const char *temp_directory, short k)
 {
-    // read the input file
-    Graph *G = ReadBZ2Graph(input_filename);
-    if (!G) exit(-1);
-
     // create a new file for writing the certificates
     char output_filename[4096];
-    snprintf(output_filename, 4096, "%s/certificates/motif-size-%03d-output-%08ld-certificates.txt", temp_directory, k, output_suffix);
+    snprintf(output_filename, 4096, "%s/certificates/motif-size-%03d-certificates.%s", temp_directory, k, BINARY_OUTPUT ? "bin" : "txt");
+
+    // create a new file for writing subgraphs if needed
+    char subgraph_filename[4096];
+    snprintf(subgraph_filename, 4096, "%s/subgraphs/motif-size-%03d-subgraphs.txt", temp_directory, k);
+
+    // iterate over all vertices in the graph
+    EnumerateSubgraphsFromRoots(G, output_filename, subgraph_filename, k, NULL, 0);
+}
+
 
-    // open the file
-    certificate_fp = fopen(output_filename, "w");
-    if (!certificate_fp) { fprintf(stderr, "Failed to open %s\n", output_filename); exit(-1); }
+
+void CppEnumerateSubgraphsFromNodesInGraph(CSRGraph *G, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix)
+{
+    // create a new file for writing the certificates
+    char output_filename[4096];
+    snprintf(output_filename, 4096, "%s/certificates/motif-size-%03d-output-%08ld-certificates.%s", temp_directory, k, output_suffix, BINARY_OUTPUT ? "bin" : "txt");
 
     // create a new file for writing subgraphs if needed
-    if (WRITE_SUBGRAPHS) {
-        char subgraph_filename[4096];
-        snprintf(subgraph_filename, 4096, "%s/subgraphs/motif-size-%03d-output-%08ld-subgraphs.txt", temp_directory, k, output_suffix);
+    char subgraph_filename[4096];
+    snprintf(subgraph_filename, 4096, "%s/subgraphs/motif-size-%03d-output-%08ld-subgraphs.txt", temp_directory, k, output_suffix);
 
-        // open the file
-        subgraph_fp = fopen(subgraph_filename, "w");
-        if (!subgraph_fp) { fprintf(stderr, "Failed to open %s\n", subgraph_filename); exit(-1); }
-    }
+    EnumerateSubgraphsFromRoots(G, output_filename, subgraph_filename, k, nodes, nnodes);
+}
 
-    for (long iv = 0; iv < nnodes; ++iv) {
-        EnumerateSubgraphsFromNode(G, k, nodes[iv]);
-    }
 
-    // close the files
-    fclose(certificate_fp);
-    if (WRITE_SUBGRAPHS) fclose(subgraph_fp);
 
-    // free memory
-    delete G;
+void CppEnumerateSubgraphsSequentially(const char *input_filename, const char *temp_directory, short k)
+{
+    CSRGraph *G = CppLoadGraph(input_filename);
+    if (!G) exit(-1);
+
+    CppEnumerateSubgraphsSequentiallyInGraph(G, temp_directory, k);
+
+    CppFreeGraph(G);
+}
+
+
+
+void CppEnumerateSubgraphsFromNodes(const char *input_filename, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix)
+{
+    CSRGraph *G = CppLoadGraph(input_filename);
+    if (!G) exit(-1);
+
+    CppEnumerateSubgraphsFromNodesInGraph(G, temp_directory, k, nodes, nnodes, output_suffix);
+
+    CppFreeGraph(G);
 }
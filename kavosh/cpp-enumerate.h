@@ -1,17 +1,43 @@
 #ifndef __CPP_ENUMERATE_H__
 #define __CPP_ENUMERATE_H__
 
+#include "cpp-graph.h"
+
 
 // set global flags
 void CppSetVertexColored(bool input_vertex_colored);
 void CppSetEdgeColored(bool input_edge_colored);
 void CppSetCommunityBased(bool input_community_based);
 void CppSetWriteSubgraphs(bool input_write_subgraphs);
+void CppSetThreads(short input_threads);
+void CppSetResume(bool input_resume);
+void CppSetBinaryOutput(bool input_binary_output);
+
+// progress and cancellation of the running enumeration
+void CppResetProgress(bool input_cancelled);
+void CppCancelEnumeration(void);
+bool CppEnumerationCancelled(void);
+long CppRootsTotal(void);
+long CppRootsFinished(void);
+long CppRootsResumed(void);
+long CppSubgraphsFinished(void);
+
+// canonical cache statistics of the last enumeration
+long CppCacheHits(void);
+long CppCacheMisses(void);
 
 // enumeration functions
 void CppEnumerateSubgraphsSequentially(const char *input_filename, const char *temp_directory, short k);
 void CppEnumerateSubgraphsFromNodes(const char *input_filename, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix);
 
+// enumeration functions for a graph that stays loaded across calls
+CSRGraph *CppLoadGraph(const char *input_filename);
+void CppFreeGraph(CSRGraph *G);
+CSRGraph *CppMapGraphImage(const char *image_filename);
+bool CppWriteGraphImage(CSRGraph *G, const char *image_filename);
+void CppEnumerateSubgraphsSequentiallyInGraph(CSRGraph *G, const char *temp_directory, short k);
+void CppEnumerateSubgraphsFromNodesInGraph(CSRGraph *G, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix);
+
 
 
 #endif
@@ -1,3 +1,12 @@
+#include <algorithm>
+#include <atomic>
+#include <thread>
+#include <fcntl.h>
+#include <unistd.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <zlib.h>
+#include <lzma.h>
 #include "cpp-graph.h"
 
 
@@ -131,6 +140,7 @@ Graph::Graph(const char input_prefix[128], bool input_directed, bool input_verte
 
     vertices = std::map<long, Vertex *>();
     edges = std::map<std::pair<long, long>, Edge *>();
+    nedge_types = 0;
 }
 
 Graph::~Graph(void)
@@ -143,6 +153,8 @@ Graph::~Graph(void)
     }
 
     for (std::map<std::pair<long, long>, Edge *>::iterator it = edges.begin(); it != edges.end(); ++it) {
+        // undirected edges appear twice in the mapping but are only allocated once
+        if (!directed && it->first.second < it->first.first) continue;
         delete it->second;
     }
 }
@@ -221,6 +233,412 @@ long Graph::NEdges(void)
 }
 
 
+static bool CompareEnumerationIndices(Vertex *one, Vertex *two)
+{
+    /*
+    Order vertices by their enumeration index
+    */
+    return one->enumeration_index < two->enumeration_index;
+}
+
+
+
+CSRGraph::CSRGraph(Graph *graph)
+{
+    /*
+    Compact graph structure for enumeration. Vertices receive dense indices between 0 and nvertices - 1
+    in enumeration order and neighbors are stored as compressed sparse rows sorted by dense index.
+
+    @param graph: the graph to compress (unchanged and can be freed afterwards)
+    */
+    strncpy(prefix, graph->prefix, 127);
+    prefix[127] = '\0';
+    mapping = NULL;
+    mapping_size = 0;
+    directed = graph->directed;
+    vertex_colored = graph->vertex_colored;
+    edge_colored = graph->edge_colored;
+    nedge_types = graph->nedge_types;
+    nvertices = graph->NVertices();
+
+    // order the vertices by enumeration index, the vertices map is ordered by index so
+    // a stable sort breaks ties between identical enumeration indices with the original index
+    std::vector<Vertex *> ordering = std::vector<Vertex *>();
+    for (std::map<long, Vertex *>::iterator it = graph->vertices.begin(); it != graph->vertices.end(); ++it) {
+        ordering.push_back(it->second);
+    }
+    std::stable_sort(ordering.begin(), ordering.end(), CompareEnumerationIndices);
+
+    // allocate the per vertex attributes
+    indices = (long *)malloc(nvertices * sizeof(long));
+    if (indices == NULL) exit(-1);
+    enumeration_indices = (long *)malloc(nvertices * sizeof(long));
+    if (enumeration_indices == NULL) exit(-1);
+    communities = (long *)malloc(nvertices * sizeof(long));
+    if (communities == NULL) exit(-1);
+    colors = (int16_t *)malloc(nvertices * sizeof(int16_t));
+    if (colors == NULL) exit(-1);
+    index_order = (long *)malloc(nvertices * sizeof(long));
+    if (index_order == NULL) exit(-1);
+
+    // create a mapping from the original indices to the dense indices
+    std::map<long, long> dense_indices = std::map<long, long>();
+    for (long iv = 0; iv < nvertices; ++iv) {
+        indices[iv] = ordering[iv]->index;
+        enumeration_indices[iv] = ordering[iv]->enumeration_index;
+        communities[iv] = ordering[iv]->community;
+        colors[iv] = ordering[iv]->color;
+
+        dense_indices[ordering[iv]->index] = iv;
+    }
+
+    // the map is ordered by the original index
+    long order_index = 0;
+    for (std::map<long, long>::iterator it = dense_indices.begin(); it != dense_indices.end(); ++it, ++order_index) {
+        index_order[order_index] = it->second;
+    }
+
+    // count the number of neighbors for every vertex
+    outgoing_offsets = (long *)malloc((nvertices + 1) * sizeof(long));
+    if (outgoing_offsets == NULL) exit(-1);
+    incoming_offsets = (long *)malloc((nvertices + 1) * sizeof(long));
+    if (incoming_offsets == NULL) exit(-1);
+    neighbor_offsets = (long *)malloc((nvertices + 1) * sizeof(long));
+    if (neighbor_offsets == NULL) exit(-1);
+
+    outgoing_offsets[0] = 0;
+    incoming_offsets[0] = 0;
+    neighbor_offsets[0] = 0;
+    for (long iv = 0; iv < nvertices; ++iv) {
+        outgoing_offsets[iv + 1] = outgoing_offsets[iv] + ordering[iv]->outgoing_neighbors.size();
+        incoming_offsets[iv + 1] = incoming_offsets[iv] + ordering[iv]->incoming_neighbors.size();
+        neighbor_offsets[iv + 1] = neighbor_offsets[iv] + ordering[iv]->neighbors.size();
+    }
+
+    outgoing_neighbors = (long *)malloc(outgoing_offsets[nvertices] * sizeof(long));
+    if (outgoing_neighbors == NULL && outgoing_offsets[nvertices]) exit(-1);
+    outgoing_colors = (int8_t *)malloc(outgoing_offsets[nvertices] * sizeof(int8_t));
+    if (outgoing_colors == NULL && outgoing_offsets[nvertices]) exit(-1);
+    incoming_neighbors = (long *)malloc(incoming_offsets[nvertices] * sizeof(long));
+    if (incoming_neighbors == NULL && incoming_offsets[nvertices]) exit(-1);
+    neighbors = (long *)malloc(neighbor_offsets[nvertices] * sizeof(long));
+    if (neighbors == NULL && neighbor_offsets[nvertices]) exit(-1);
+
+    // populate the neighbors with dense indices and sort each list
+    for (long iv = 0; iv < nvertices; ++iv) {
+        Vertex *vertex = ordering[iv];
+
+        long outgoing_index = outgoing_offsets[iv];
+        for (std::unordered_set<long>::iterator it = vertex->outgoing_neighbors.begin(); it != vertex->outgoing_neighbors.end(); ++it, ++outgoing_index) {
+            outgoing_neighbors[outgoing_index] = dense_indices[*it];
+        }
+        std::sort(outgoing_neighbors + outgoing_offsets[iv], outgoing_neighbors + outgoing_offsets[iv + 1]);
+
+        // the edge colors are aligned with the sorted outgoing neighbors
+        for (long ie = outgoing_offsets[iv]; ie < outgoing_offsets[iv + 1]; ++ie) {
+            outgoing_colors[ie] = graph->edges[std::pair<long, long>(vertex->index, indices[outgoing_neighbors[ie]])]->color;
+        }
+
+        long incoming_index = incoming_offsets[iv];
+        for (std::unordered_set<long>::iterator it = vertex->incoming_neighbors.begin(); it != vertex->incoming_neighbors.end(); ++it, ++incoming_index) {
+            incoming_neighbors[incoming_index] = dense_indices[*it];
+        }
+        std::sort(incoming_neighbors + incoming_offsets[iv], incoming_neighbors + incoming_offsets[iv + 1]);
+
+        long neighbor_index = neighbor_offsets[iv];
+        for (std::unordered_set<long>::iterator it = vertex->neighbors.begin(); it != vertex->neighbors.end(); ++it, ++neighbor_index) {
+            neighbors[neighbor_index] = dense_indices[*it];
+        }
+        std::sort(neighbors + neighbor_offsets[iv], neighbors + neighbor_offsets[iv + 1]);
+    }
+}
+
+CSRGraph::CSRGraph(void)
+{
+    /*
+    Empty compact graph whose arrays are set from a graph image
+    */
+    prefix[0] = '\0';
+    directed = false;
+    vertex_colored = false;
+    edge_colored = false;
+    nvertices = 0;
+    nedge_types = 0;
+    mapping = NULL;
+    mapping_size = 0;
+}
+
+CSRGraph::~CSRGraph(void)
+{
+    /*
+    Destructor for eliminating compact graph object
+    */
+    // the arrays of a mapped image belong to the mapping
+    if (mapping) {
+        munmap(mapping, mapping_size);
+        return;
+    }
+
+    free(indices);
+    free(enumeration_indices);
+    free(communities);
+    free(colors);
+    free(index_order);
+    free(outgoing_offsets);
+    free(outgoing_neighbors);
+    free(outgoing_colors);
+    free(incoming_offsets);
+    free(incoming_neighbors);
+    free(neighbor_offsets);
+    free(neighbors);
+}
+
+static const size_t image_element_sizes[GRAPH_IMAGE_NARRAYS] = {
+    sizeof(long), sizeof(long), sizeof(long), sizeof(int16_t), sizeof(long),
+    sizeof(long), sizeof(long), sizeof(int8_t),
+    sizeof(long), sizeof(long),
+    sizeof(long), sizeof(long)
+};
+
+void CSRGraph::ImageArrays(void **arrays[GRAPH_IMAGE_NARRAYS])
+{
+    /*
+    Populate the addresses of the array pointers in the order of the graph image
+
+    @param arrays: the addresses to populate
+    */
+    arrays[0] = (void **) &indices;
+    arrays[1] = (void **) &enumeration_indices;
+    arrays[2] = (void **) &communities;
+    arrays[3] = (void **) &colors;
+    arrays[4] = (void **) &index_order;
+    arrays[5] = (void **) &outgoing_offsets;
+    arrays[6] = (void **) &outgoing_neighbors;
+    arrays[7] = (void **) &outgoing_colors;
+    arrays[8] = (void **) &incoming_offsets;
+    arrays[9] = (void **) &incoming_neighbors;
+    arrays[10] = (void **) &neighbor_offsets;
+    arrays[11] = (void **) &neighbors;
+}
+
+bool CSRGraph::WriteImage(const char *image_filename)
+{
+    /*
+    Write the compact graph as a flat read only image that other processes can memory map. The
+    image is written to a temporary file and renamed so readers never see a partial image.
+
+    @param image_filename: the location of the image (e.g., in /dev/shm)
+    */
+    // the number of elements in every array
+    int64_t lengths[GRAPH_IMAGE_NARRAYS] = {
+        nvertices, nvertices, nvertices, nvertices, nvertices,
+        nvertices + 1, outgoing_offsets[nvertices], outgoing_offsets[nvertices],
+        nvertices + 1, incoming_offsets[nvertices],
+        nvertices + 1, neighbor_offsets[nvertices]
+    };
+
+    GraphImageHeader header;
+    memset(&header, 0, sizeof(GraphImageHeader));
+    memcpy(header.magic, GRAPH_IMAGE_MAGIC, 8);
+    header.version = GRAPH_IMAGE_VERSION;
+    strncpy(header.prefix, prefix, 127);
+    header.directed = directed;
+    header.vertex_colored = vertex_colored;
+    header.edge_colored = edge_colored;
+    header.nvertices = nvertices;
+    header.nedge_types = nedge_types;
+
+    // every array begins at a multiple of 8 bytes after the header
+    int64_t offset = sizeof(GraphImageHeader);
+    for (short ia = 0; ia < GRAPH_IMAGE_NARRAYS; ++ia) {
+        header.offsets[ia] = offset;
+        header.lengths[ia] = lengths[ia];
+        offset += (lengths[ia] * image_element_sizes[ia] + 7) / 8 * 8;
+    }
+    header.nbytes = offset;
+
+    char temporary_filename[4096];
+    snprintf(temporary_filename, 4096, "%s.%d.tmp", image_filename, (int) getpid());
+
+    FILE *fp = fopen(temporary_filename, "wb");
+    if (!fp) { fprintf(stderr, "Failed to open %s\n", temporary_filename); return false; }
+
+    bool written = fwrite(&header, sizeof(GraphImageHeader), 1, fp) == 1;
+
+    void **arrays[GRAPH_IMAGE_NARRAYS];
+    ImageArrays(arrays);
+    static const char padding[8] = {0, 0, 0, 0, 0, 0, 0, 0};
+    for (short ia = 0; ia < GRAPH_IMAGE_NARRAYS; ++ia) {
+        size_t nbytes = lengths[ia] * image_element_sizes[ia];
+
+        if (nbytes) written = written && fwrite(*arrays[ia], 1, nbytes, fp) == nbytes;
+        if (nbytes % 8) written = written && fwrite(padding, 1, 8 - nbytes % 8, fp) == 8 - nbytes % 8;
+    }
+
+    written = !fclose(fp) && written;
+    if (!written || rename(temporary_filename, image_filename)) {
+        fprintf(stderr, "Failed to write %s\n", image_filename);
+        unlink(temporary_filename);
+        return false;
+    }
+
+    return true;
+}
+
+CSRGraph *CSRGraph::MapImage(const char *image_filename)
+{
+    /*
+    Memory map a graph image read only. The arrays point into the mapping without copies so all
+    processes that map the same image share its memory. Returns NULL if the image is invalid.
+
+    @param image_filename: the location of the image
+    */
+    int fd = open(image_filename, O_RDONLY);
+    if (fd == -1) { fprintf(stderr, "Failed to open %s\n", image_filename); return NULL; }
+
+    struct stat status;
+    if (fstat(fd, &status) || status.st_size < (off_t) sizeof(GraphImageHeader)) {
+        fprintf(stderr, "Failed to read %s\n", image_filename);
+        close(fd);
+        return NULL;
+    }
+
+    void *mapping = mmap(NULL, status.st_size, PROT_READ, MAP_SHARED, fd, 0);
+    close(fd);
+    if (mapping == MAP_FAILED) { fprintf(stderr, "Failed to map %s\n", image_filename); return NULL; }
+
+    const GraphImageHeader *header = (const GraphImageHeader *) mapping;
+
+    // verify the header and that every array lies within the image
+    bool valid = !memcmp(header->magic, GRAPH_IMAGE_MAGIC, 8) && header->version == GRAPH_IMAGE_VERSION && header->nbytes == status.st_size;
+    for (short ia = 0; valid && ia < GRAPH_IMAGE_NARRAYS; ++ia) {
+        valid = header->offsets[ia] % 8 == 0 && header->lengths[ia] >= 0 && header->offsets[ia] + header->lengths[ia] * (int64_t) image_element_sizes[ia] <= header->nbytes;
+    }
+    if (!valid) {
+        fprintf(stderr, "Invalid graph image %s\n", image_filename);
+        munmap(mapping, status.st_size);
+        return NULL;
+    }
+
+    CSRGraph *G = new CSRGraph();
+    strncpy(G->prefix, header->prefix, 127);
+    G->prefix[127] = '\0';
+    G->directed = header->directed;
+    G->vertex_colored = header->vertex_colored;
+    G->edge_colored = header->edge_colored;
+    G->nvertices = header->nvertices;
+    G->nedge_types = header->nedge_types;
+    G->mapping = mapping;
+    G->mapping_size = status.st_size;
+
+    void **arrays[GRAPH_IMAGE_NARRAYS];
+    G->ImageArrays(arrays);
+    for (short ia = 0; ia < GRAPH_IMAGE_NARRAYS; ++ia) {
+        *arrays[ia] = (char *) mapping + header->offsets[ia];
+    }
+
+    return G;
+}
+
+long CSRGraph::NVertices(void)
+{
+    /*
+    Return the number of vertices in this graph
+    */
+    return nvertices;
+}
+
+long CSRGraph::NEdges(void)
+{
+    /*
+    Return the number of edges in this graph
+    */
+    return outgoing_offsets[nvertices];
+}
+
+long CSRGraph::DenseIndex(long index)
+{
+    /*
+    Return the dense index for the vertex with this original index (-1 if it does not exist)
+
+    @param index: the original index for the vertex
+    */
+    long low = 0;
+    long high = nvertices;
+
+    // binary search over the dense indices ordered by original index
+    while (low < high) {
+        long middle = (low + high) / 2;
+        if (indices[index_order[middle]] < index) low = middle + 1;
+        else high = middle;
+    }
+
+    if (low == nvertices || indices[index_order[low]] != index) return -1;
+
+    return index_order[low];
+}
+
+long CSRGraph::EnumerationThreshold(long u)
+{
+    /*
+    Return the smallest dense index whose enumeration index is at least that of u. Since
+    dense indices follow the enumeration order, every vertex at or above the threshold can
+    belong to a subgraph rooted at u.
+
+    @param u: the dense index for the root vertex
+    */
+    return std::lower_bound(enumeration_indices, enumeration_indices + nvertices, enumeration_indices[u]) - enumeration_indices;
+}
+
+bool CSRGraph::DistinctColors(void)
+{
+    /*
+    Return if every vertex in the graph has a different color. Every subgraph then has a
+    discrete coloring (e.g., the C. elegans graphs with one color per neuron).
+    */
+    int16_t *sorted_colors = (int16_t *)malloc(nvertices * sizeof(int16_t));
+    if (sorted_colors == NULL && nvertices) exit(-1);
+
+    memcpy(sorted_colors, colors, nvertices * sizeof(int16_t));
+    std::sort(sorted_colors, sorted_colors + nvertices);
+
+    bool distinct = std::adjacent_find(sorted_colors, sorted_colors + nvertices) == sorted_colors + nvertices;
+
+    free(sorted_colors);
+
+    return distinct;
+}
+
+bool CSRGraph::HasEdge(long source, long destination)
+{
+    /*
+    Return if there is an edge from source to destination
+
+    @param source: the dense index of the source vertex
+    @param destination: the dense index of the destination vertex
+    */
+    return std::binary_search(outgoing_neighbors + outgoing_offsets[source], outgoing_neighbors + outgoing_offsets[source + 1], destination);
+}
+
+int8_t CSRGraph::EdgeColor(long source, long destination)
+{
+    /*
+    Return the color of the edge from source to destination (-1 if the edge does not exist)
+
+    @param source: the dense index of the source vertex
+    @param destination: the dense index of the destination vertex
+    */
+    long *first = outgoing_neighbors + outgoing_offsets[source];
+    long *last = outgoing_neighbors + outgoing_offsets[source + 1];
+    long *it = std::lower_bound(first, last, destination);
+
+    if (it == last || *it != destination) return -1;
+
+    return outgoing_colors[it - outgoing_neighbors];
+}
+
+
+
 Graph *ReadGraph(const char input_filename[4096])
 {
     // open file
@@ -274,39 +692,220 @@ Graph *ReadGraph(const char input_filename[4096])
 
 
 
-Graph *ReadBZ2Graph(const char input_filename[4096])
+static bool DecompressBlock(int64_t codec, const char *compressed, size_t compressed_size, char *data, size_t data_size)
 {
-    // open file
+    /*
+    Decompress one block of a graph file into a buffer of the exact size. Returns false on failure.
+
+    @param codec: the codec of the block (GRAPH_CODEC_BZ2, GRAPH_CODEC_ZLIB or GRAPH_CODEC_LZMA)
+    @param compressed: the compressed block
+    @param compressed_size: the number of bytes in the compressed block
+    @param data: the buffer for the decompressed block
+    @param data_size: the number of bytes in the decompressed block
+    */
+    if (codec == GRAPH_CODEC_BZ2) {
+        unsigned int size = data_size;
+        if (BZ2_bzBuffToBuffDecompress(data, &size, (char *) compressed, compressed_size, 0, 0) != BZ_OK) return false;
+        return size == data_size;
+    }
+    else if (codec == GRAPH_CODEC_ZLIB) {
+        uLongf size = data_size;
+        if (uncompress((Bytef *) data, &size, (const Bytef *) compressed, compressed_size) != Z_OK) return false;
+        return size == data_size;
+    }
+    else if (codec == GRAPH_CODEC_LZMA) {
+        uint64_t memory_limit = UINT64_MAX;
+        size_t compressed_position = 0;
+        size_t data_position = 0;
+        if (lzma_stream_buffer_decode(&memory_limit, 0, NULL, (const uint8_t *) compressed, &compressed_position, compressed_size, (uint8_t *) data, &data_position, data_size) != LZMA_OK) return false;
+        return data_position == data_size;
+    }
+
+    return false;
+}
+
+
+
+static bool DecompressBZ2Stream(const std::vector<char> &compressed, std::vector<char> &data)
+{
+    /*
+    Decompress a graph file that is a single bz2 stream (the original layout)
+
+    @param compressed: the contents of the file
+    @param data: the decompressed graph
+    */
+    bz_stream stream;
+    memset(&stream, 0, sizeof(bz_stream));
+    if (BZ2_bzDecompressInit(&stream, 0, 0) != BZ_OK) return false;
+
+    stream.next_in = (char *) compressed.data();
+    stream.avail_in = compressed.size();
+
+    // grow the output until the end of the stream
+    data.resize(std::max((size_t) 4096, 4 * compressed.size()));
+    size_t size = 0;
+
+    int bzerror = BZ_OK;
+    while (bzerror == BZ_OK) {
+        if (size == data.size()) data.resize(2 * data.size());
+
+        stream.next_out = data.data() + size;
+        stream.avail_out = data.size() - size;
+
+        bzerror = BZ2_bzDecompress(&stream);
+        size = data.size() - stream.avail_out;
+
+        // the stream ended early
+        if (bzerror == BZ_OK && !stream.avail_in && stream.avail_out) bzerror = BZ_UNEXPECTED_EOF;
+    }
+
+    BZ2_bzDecompressEnd(&stream);
+    data.resize(size);
+
+    return bzerror == BZ_STREAM_END;
+}
+
+
+
+static bool DecompressGraphBlocks(const std::vector<char> &compressed, std::vector<char> &data)
+{
+    /*
+    Decompress a graph file of independently compressed blocks with one thread per core
+
+    @param compressed: the contents of the file
+    @param data: the decompressed graph
+    */
+    GraphBlocksHeader header;
+    if (compressed.size() < sizeof(GraphBlocksHeader)) return false;
+    memcpy(&header, compressed.data(), sizeof(GraphBlocksHeader));
+
+    if (header.version != GRAPH_BLOCKS_VERSION || header.nblocks < 0 || header.nbytes < 0) return false;
+
+    // the table of compressed and decompressed sizes follows the header
+    size_t table_offset = sizeof(GraphBlocksHeader);
+    if ((compressed.size() - table_offset) / (2 * sizeof(int64_t)) < (size_t) header.nblocks) return false;
+
+    std::vector<int64_t> table = std::vector<int64_t>(2 * header.nblocks);
+    if (header.nblocks) memcpy(table.data(), compressed.data() + table_offset, 2 * header.nblocks * sizeof(int64_t));
+
+    // the blocks are consecutive after the table
+    std::vector<size_t> compressed_offsets = std::vector<size_t>(header.nblocks);
+    std::vector<size_t> data_offsets = std::vector<size_t>(header.nblocks);
+    size_t compressed_offset = table_offset + 2 * header.nblocks * sizeof(int64_t);
+    size_t data_offset = 0;
+    for (long ib = 0; ib < header.nblocks; ++ib) {
+        if (table[2 * ib] < 0 || table[2 * ib + 1] < 0) return false;
+
+        compressed_offsets[ib] = compressed_offset;
+        data_offsets[ib] = data_offset;
+        compressed_offset += table[2 * ib];
+        data_offset += table[2 * ib + 1];
+    }
+    if (compressed_offset != compressed.size() || data_offset != (size_t) header.nbytes) return false;
+
+    data.resize(header.nbytes);
+
+    // every thread decompresses the next block that no other thread claimed
+    std::atomic<long> next_block(0);
+    std::atomic<bool> failed(false);
+    auto worker = [&]() {
+        long ib;
+        while ((ib = next_block.fetch_add(1)) < header.nblocks) {
+            if (!DecompressBlock(header.codec, compressed.data() + compressed_offsets[ib], table[2 * ib], data.data() + data_offsets[ib], table[2 * ib + 1])) failed = true;
+        }
+    };
+
+    long nthreads = std::min((long) std::max(std::thread::hardware_concurrency(), 1u), (long) header.nblocks);
+    std::vector<std::thread> threads;
+    for (long it = 1; it < nthreads; ++it) threads.push_back(std::thread(worker));
+    worker();
+    for (unsigned long it = 0; it < threads.size(); ++it) threads[it].join();
+
+    return !failed;
+}
+
+
+
+static bool DecompressGraphFile(const char *input_filename, std::vector<char> &data)
+{
+    /*
+    Read and decompress a graph file in either layout
+
+    @param input_filename: the location of the graph
+    @param data: the decompressed graph
+    */
     FILE *fp = fopen(input_filename, "rb");
-    if (!fp) { fprintf(stderr, "Failed to open %s\n", input_filename); return NULL; }
+    if (!fp) return false;
 
-    // valuable local variables
-    int bzerror;
+    std::vector<char> compressed = std::vector<char>();
+    char buffer[65536];
+    size_t nread;
+    while ((nread = fread(buffer, 1, sizeof(buffer), fp))) compressed.insert(compressed.end(), buffer, buffer + nread);
 
-    // open the BZ2 file
-    BZFILE *bzfd = BZ2_bzReadOpen(&bzerror, fp, 0, 0, NULL, 0);
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+    bool error = ferror(fp);
+    fclose(fp);
+    if (error) return false;
+
+    // files of blocks start with a magic string, otherwise the file is a single bz2 stream
+    if (compressed.size() >= 8 && !memcmp(compressed.data(), GRAPH_BLOCKS_MAGIC, 8)) return DecompressGraphBlocks(compressed, data);
+    else return DecompressBZ2Stream(compressed, data);
+}
+
+
+
+static bool ReadBytes(const std::vector<char> &data, size_t &offset, void *value, size_t size)
+{
+    /*
+    Copy the next bytes of the decompressed graph. Returns false at the end of the data.
+
+    @param data: the decompressed graph
+    @param offset: the position of the next byte (advanced by size)
+    @param value: the destination
+    @param size: the number of bytes
+    */
+    if (data.size() - offset < size) return false;
+
+    memcpy(value, data.data() + offset, size);
+    offset += size;
+
+    return true;
+}
+
+
+
+static Graph *ReadFailure(const char *input_filename, Graph *graph)
+{
+    // report the failure and free the partial graph
+    fprintf(stderr, "Failed to read %s\n", input_filename);
+    delete graph;
+
+    return NULL;
+}
+
+
+
+Graph *ReadBZ2Graph(const char input_filename[4096])
+{
+    // decompress the entire file (either a single bz2 stream or blocks in any codec)
+    std::vector<char> data = std::vector<char>();
+    if (!DecompressGraphFile(input_filename, data)) return ReadFailure(input_filename, NULL);
+
+    size_t offset = 0;
 
     // read the number of vertices and edges
     long nvertices, nedges;
-    BZ2_bzRead(&bzerror, bzfd, &nvertices, sizeof(long));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-    BZ2_bzRead(&bzerror, bzfd, &nedges, sizeof(long));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+    if (!ReadBytes(data, offset, &nvertices, sizeof(long))) return ReadFailure(input_filename, NULL);
+    if (!ReadBytes(data, offset, &nedges, sizeof(long))) return ReadFailure(input_filename, NULL);
 
     // read the graph attributes
     bool directed, vertex_colored, edge_colored;
-    BZ2_bzRead(&bzerror, bzfd, &directed, sizeof(bool));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-    BZ2_bzRead(&bzerror, bzfd, &vertex_colored, sizeof(bool));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-    BZ2_bzRead(&bzerror, bzfd, &edge_colored, sizeof(bool));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+    if (!ReadBytes(data, offset, &directed, sizeof(bool))) return ReadFailure(input_filename, NULL);
+    if (!ReadBytes(data, offset, &vertex_colored, sizeof(bool))) return ReadFailure(input_filename, NULL);
+    if (!ReadBytes(data, offset, &edge_colored, sizeof(bool))) return ReadFailure(input_filename, NULL);
 
     // read the prefix
     char prefix[128];
-    BZ2_bzRead(&bzerror, bzfd, &prefix, sizeof(prefix));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+    if (!ReadBytes(data, offset, &prefix, sizeof(prefix))) return ReadFailure(input_filename, NULL);
 
     // construct an empty graph
     Graph *graph = new Graph(prefix, directed, vertex_colored, edge_colored);
@@ -315,14 +914,10 @@ Graph *ReadBZ2Graph(const char input_filename[4096])
     for (long iv = 0; iv < nvertices; ++iv) {
         long index, enumeration_index, community;
         int16_t color;
-        BZ2_bzRead(&bzerror, bzfd, &index, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &enumeration_index, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &community, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &color, sizeof(int16_t));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+        if (!ReadBytes(data, offset, &index, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &enumeration_index, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &community, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &color, sizeof(int16_t))) return ReadFailure(input_filename, graph);
 
         graph->AddVertex(index, enumeration_index, community, color);
     }
@@ -332,36 +927,27 @@ Graph *ReadBZ2Graph(const char input_filename[4096])
         long source_index, destination_index;
         double weight;
         int8_t color;
-        BZ2_bzRead(&bzerror, bzfd, &source_index, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &destination_index, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &weight, sizeof(double));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &color, sizeof(int8_t));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+        if (!ReadBytes(data, offset, &source_index, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &destination_index, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &weight, sizeof(double))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &color, sizeof(int8_t))) return ReadFailure(input_filename, graph);
 
         graph->AddEdge(source_index, destination_index, weight, color);
     }
 
     // read the neuron and edge types for file verification
     long nvertex_types;
-    BZ2_bzRead(&bzerror, bzfd, &nvertex_types, sizeof(long));
-    if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+    if (!ReadBytes(data, offset, &nvertex_types, sizeof(long))) return ReadFailure(input_filename, graph);
     assert (nvertex_types <= 65536);
     for (long iv = 0; iv < nvertex_types; ++iv) {
         long index;
         char dummy[128];
-        BZ2_bzRead(&bzerror, bzfd, &index, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &dummy, sizeof(dummy));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+        if (!ReadBytes(data, offset, &index, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &dummy, sizeof(dummy))) return ReadFailure(input_filename, graph);
     }
 
     long nedge_types;
-    BZ2_bzRead(&bzerror, bzfd, &nedge_types, sizeof(long));
-    // if there are no edge types this is the end 
-    if (bzerror != BZ_OK && bzerror != BZ_STREAM_END) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+    if (!ReadBytes(data, offset, &nedge_types, sizeof(long))) return ReadFailure(input_filename, graph);
     assert (nedge_types <= 7);
 
     // update the graph with the number of edge types
@@ -370,18 +956,12 @@ Graph *ReadBZ2Graph(const char input_filename[4096])
     for (long ie = 0; ie < nedge_types; ++ie) {
         long index;
         char dummy[128];
-        BZ2_bzRead(&bzerror, bzfd, &index, sizeof(long));
-        if (bzerror != BZ_OK) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-        BZ2_bzRead(&bzerror, bzfd, &dummy, sizeof(dummy));
-        if (bzerror != BZ_OK && bzerror != BZ_STREAM_END) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
+        if (!ReadBytes(data, offset, &index, sizeof(long))) return ReadFailure(input_filename, graph);
+        if (!ReadBytes(data, offset, &dummy, sizeof(dummy))) return ReadFailure(input_filename, graph);
     }
 
     // make sure the end is reached
-    if (bzerror != BZ_STREAM_END) { fprintf(stderr, "Failed to read %s\n", input_filename); return NULL; }
-
-    // close files
-    BZ2_bzReadClose(&bzerror, bzfd);
-    fclose(fp);
+    if (offset != data.size()) return ReadFailure(input_filename, graph);
 
     return graph;
 }
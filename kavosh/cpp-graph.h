@@ -1,7 +1,8 @@
 #ifndef __CPP_GRAPH_H__
-#define __cpp_graph_H__
+#define __CPP_GRAPH_H__
 
 #include <assert.h>
+#include <stdint.h>
 #include <vector>
 #include <stdlib.h>
 #include <cstring>
@@ -14,6 +15,7 @@
 class Vertex;
 class Edge;
 class Graph;
+class CSRGraph;
 
 
 
@@ -23,6 +25,28 @@ Graph *ReadBZ2Graph(const char input_filename[4096]);
 
 
 
+// graph files of independently compressed blocks begin with this header (the decompressed
+// blocks concatenate to the contents of the original single bz2 stream)
+#define GRAPH_BLOCKS_MAGIC "GRAPHBLK"
+#define GRAPH_BLOCKS_VERSION 1
+#define GRAPH_CODEC_BZ2 1
+#define GRAPH_CODEC_ZLIB 2
+#define GRAPH_CODEC_LZMA 3
+
+
+
+class GraphBlocksHeader {
+public:
+    // followed by the compressed and decompressed size of every block and then the blocks
+    char magic[8];
+    int64_t version;
+    int64_t codec;
+    int64_t nblocks;
+    int64_t nbytes;
+};
+
+
+
 class Vertex {
 public:
     // constructors/destructors
@@ -94,4 +118,89 @@ public:
 
 
 
+// the first bytes and the version of every graph image
+#define GRAPH_IMAGE_MAGIC "CSRGRAPH"
+#define GRAPH_IMAGE_VERSION 1
+// the number of arrays in a graph image (in the order of the CSRGraph instance variables)
+#define GRAPH_IMAGE_NARRAYS 12
+
+
+
+class GraphImageHeader {
+public:
+    // flat header of a graph image (384 bytes), every array starts at a multiple of 8 bytes
+    char magic[8];
+    int64_t version;
+    char prefix[128];
+    int64_t directed;
+    int64_t vertex_colored;
+    int64_t edge_colored;
+    int64_t nvertices;
+    int64_t nedge_types;
+    int64_t nbytes;
+    // the byte offset and number of elements for every array
+    int64_t offsets[GRAPH_IMAGE_NARRAYS];
+    int64_t lengths[GRAPH_IMAGE_NARRAYS];
+};
+
+
+
+class CSRGraph {
+public:
+    // constructors/destructors
+    CSRGraph(Graph *graph);
+    ~CSRGraph();
+
+    // graph image functions
+    bool WriteImage(const char *image_filename);
+    static CSRGraph *MapImage(const char *image_filename);
+
+    // attribute functions
+    long NVertices(void);
+    long NEdges(void);
+    long DenseIndex(long index);
+    long EnumerationThreshold(long u);
+    bool DistinctColors(void);
+
+    // adjacency functions (all vertices are dense indices)
+    bool HasEdge(long source, long destination);
+    int8_t EdgeColor(long source, long destination);
+
+    // instance variables
+    char prefix[128];
+    bool directed;
+    bool vertex_colored;
+    bool edge_colored;
+    long nvertices;
+    long nedge_types;
+
+    // per vertex attributes indexed by the dense index (0 ... nvertices - 1)
+    // dense indices are ordered by enumeration index, ties broken by the original index
+    long *indices;
+    long *enumeration_indices;
+    long *communities;
+    int16_t *colors;
+    // dense indices sorted by the original index for look ups
+    long *index_order;
+
+    // compressed sparse row neighbors, each list is sorted by dense index (i.e., enumeration order)
+    long *outgoing_offsets;
+    long *outgoing_neighbors;
+    int8_t *outgoing_colors;
+    long *incoming_offsets;
+    long *incoming_neighbors;
+    long *neighbor_offsets;
+    long *neighbors;
+
+    // the memory mapped image that holds the arrays (NULL if the arrays were allocated)
+    void *mapping;
+    size_t mapping_size;
+
+private:
+    CSRGraph(void);
+    void ImageArrays(void **arrays[GRAPH_IMAGE_NARRAYS]);
+};
+
+
+
 #endif
@@ -0,0 +1,133 @@
+#include <stdlib.h>
+#include <string.h>
+#include "cpp-nauty.h"
+#include "cpp-table.h"
+
+
+
+CanonicalTable::CanonicalTable(short input_k, bool input_directed)
+{
+    /*
+    Exhaustive table from every adjacency bitmask of a colorless motif to its certificate and
+    canonical labeling. The table is generated with the linked nauty library so that its
+    certificates match those computed by calling nauty directly.
+
+    @param k: motif size
+    @param directed: indicates if the graph is directed or undirected
+    */
+    k = input_k;
+    directed = input_directed;
+
+    // one bit per vertex pair (ordered pairs for directed graphs)
+    long nbits = directed ? k * (k - 1) : k * (k - 1) / 2;
+    nentries = 1L << nbits;
+
+    certificates = (uint64_t *)malloc(nentries * sizeof(uint64_t));
+    if (certificates == NULL) exit(-1);
+    labs = (uint64_t *)malloc(nentries * sizeof(uint64_t));
+    if (labs == NULL) exit(-1);
+
+    // use the same nauty options as colorless enumeration
+    NyGraph *nauty_graph = new NyGraph(k, false);
+
+    for (long pattern = 0; pattern < nentries; ++pattern) {
+        // create the adjacency matrix with one bit of the pattern per vertex pair
+        long bit_index = 0;
+        for (long out_index = 0; out_index < k; ++out_index) {
+            for (long in_index = 0; in_index < k; ++in_index) {
+                if (out_index == in_index) continue;
+                if (!directed && in_index < out_index) continue;
+
+                if ((pattern >> bit_index) & 1) {
+                    ADDELEMENT((GRAPHROW(nauty_graph->matrix, out_index, nauty_graph->no_setwords)), in_index);
+                    if (!directed) ADDELEMENT((GRAPHROW(nauty_graph->matrix, in_index, nauty_graph->no_setwords)), out_index);
+                }
+
+                bit_index += 1;
+            }
+        }
+
+        // every pattern maps to a unique index
+        long index = Index(nauty_graph->matrix);
+
+        // call the dense version of nauty
+        densenauty(
+                    nauty_graph->matrix,
+                    nauty_graph->lab,
+                    nauty_graph->ptn,
+                    nauty_graph->orbits,
+                    nauty_graph->options,
+                    nauty_graph->stats,
+                    nauty_graph->no_setwords,
+                    nauty_graph->no_vertices,
+                    nauty_graph->cmatrix
+                );
+
+        // the certificate is the last byte (in memory) for every vertex as in enumeration
+        certificates[index] = 0;
+        labs[index] = 0;
+
+        unsigned char *certificate_bytes = (unsigned char *) &(certificates[index]);
+        for (long iv = 0; iv < k; ++iv) {
+            certificate_bytes[iv] = ((unsigned char *) GRAPHROW(nauty_graph->cmatrix, iv, nauty_graph->no_setwords))[7];
+            labs[index] |= ((uint64_t) nauty_graph->lab[iv]) << (8 * iv);
+        }
+
+        // clear the graph
+        EMPTYGRAPH(nauty_graph->matrix, nauty_graph->no_setwords, nauty_graph->no_vertices);
+    }
+
+    delete nauty_graph;
+}
+
+CanonicalTable::~CanonicalTable(void)
+{
+    /*
+    Destructor for eliminating canonical table object
+    */
+    free(certificates);
+    free(labs);
+}
+
+long CanonicalTable::Index(const setword *adjacency)
+{
+    /*
+    Return the table index for the adjacency matrix (one setword per vertex)
+
+    @param adjacency: the adjacency matrix of the subgraph
+    */
+    long index = 0;
+    long bit_index = 0;
+
+    for (long iv = 0; iv < k; ++iv) {
+        // the k adjacency bits of this row with column 0 as the highest bit
+        long row = (long) (adjacency[iv] >> (WORDSIZE - k));
+
+        if (directed) {
+            // remove the diagonal (column iv is bit k - 1 - iv)
+            row = ((row >> (k - iv)) << (k - 1 - iv)) | (row & ((1L << (k - 1 - iv)) - 1));
+            index |= row << bit_index;
+            bit_index += k - 1;
+        }
+        else {
+            // only keep the columns after the diagonal
+            row &= (1L << (k - 1 - iv)) - 1;
+            index |= row << bit_index;
+            bit_index += k - 1 - iv;
+        }
+    }
+
+    return index;
+}
+
+bool CanonicalTable::Supported(short k, bool directed)
+{
+    /*
+    Return if there is an exhaustive table for colorless motifs of this size
+
+    @param k: motif size
+    @param directed: indicates if the graph is directed or undirected
+    */
+    if (directed) return k <= MAX_DIRECTED_TABLE_SIZE;
+    else return k <= MAX_UNDIRECTED_TABLE_SIZE;
+}
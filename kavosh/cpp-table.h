@@ -0,0 +1,40 @@
+#ifndef __CPP_TABLE_H__
+#define __CPP_TABLE_H__
+
+#include <stdint.h>
+#include <nauty.h>
+
+
+
+// the largest motifs with exhaustive tables (directed motifs have k * (k - 1) adjacency bits and
+// undirected motifs have k * (k - 1) / 2 adjacency bits)
+#define MAX_DIRECTED_TABLE_SIZE 4
+#define MAX_UNDIRECTED_TABLE_SIZE 5
+
+
+
+class CanonicalTable {
+public:
+    // constructors/destructors
+    CanonicalTable(short k, bool directed);
+    ~CanonicalTable();
+
+    // access functions
+    long Index(const setword *adjacency);
+
+    // attribute functions
+    static bool Supported(short k, bool directed);
+
+    // instance variables
+    short k;
+    bool directed;
+    long nentries;
+    // the certificate (one byte per vertex) for every adjacency bitmask
+    uint64_t *certificates;
+    // the canonical labeling (one byte per vertex) for every adjacency bitmask
+    uint64_t *labs;
+};
+
+
+
+#endif
@@ -2,6 +2,12 @@ import os
 import sys
 import glob
 import time
+import asyncio
+import functools
+import threading
+import multiprocessing
+import multiprocessing.connection
+import concurrent.futures
 
 
 
@@ -16,7 +22,18 @@ from libcpp cimport bool
 
 
 
-from subgraph_enumeration.utilities.dataIO import ReadGraph, ReadPrefix
+from subgraph_enumeration.utilities.dataIO import ReadGraph, ReadPrefix, GraphSidecarFilename, ReadCertificateRecords, CertificateHexStrings
+
+
+
+cdef extern from 'cpp-graph.h':
+    cdef cppclass CSRGraph:
+        char prefix[128]
+        bool directed
+        bool vertex_colored
+        bool edge_colored
+        long NVertices()
+        long NEdges()
 
 
 
@@ -25,12 +42,99 @@ cdef extern from 'cpp-enumerate.h':
     void CppSetEdgeColored(bool edge_colored)
     void CppSetCommunityBased(bool community_based)
     void CppSetWriteSubgraphs(bool write_subgraphs)
-    void CppEnumerateSubgraphsSequentially(const char *input_filename, const char *temp_directory, short k)
-    void CppEnumerateSubgraphsFromNodes(const char *input_filename, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix)
+    void CppSetThreads(short threads)
+    void CppSetResume(bool resume)
+    void CppSetBinaryOutput(bool binary_output)
+    void CppResetProgress(bool cancelled)
+    void CppCancelEnumeration()
+    bool CppEnumerationCancelled()
+    long CppRootsTotal()
+    long CppRootsFinished()
+    long CppRootsResumed()
+    long CppSubgraphsFinished()
+    long CppCacheHits()
+    long CppCacheMisses()
+    void CppEnumerateSubgraphsSequentially(const char *input_filename, const char *temp_directory, short k) nogil
+    void CppEnumerateSubgraphsFromNodes(const char *input_filename, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix) nogil
+    CSRGraph *CppLoadGraph(const char *input_filename) nogil
+    void CppFreeGraph(CSRGraph *G)
+    CSRGraph *CppMapGraphImage(const char *image_filename)
+    bool CppWriteGraphImage(CSRGraph *G, const char *image_filename)
+    void CppEnumerateSubgraphsSequentiallyInGraph(CSRGraph *G, const char *temp_directory, short k) nogil
+    void CppEnumerateSubgraphsFromNodesInGraph(CSRGraph *G, const char *temp_directory, short k, long *nodes, long nnodes, long output_suffix) nogil
+
+
+
+# the largest motif size that the enumeration supports (MAX_MOTIF_SIZE in cpp-enumerate.cpp)
+MAX_MOTIF_SIZE = 8
+
+# the asynchronous enumeration that is running (enumerations share the global flags so at most one runs at a time)
+running_future = None
+# guards running_future so that a cancellation never misses the enumeration that is starting
+running_future_lock = threading.Lock()
+# held by the enumeration that owns the global flags and progress counters (reentrant since asynchronous
+# enumerations call the blocking functions)
+enumeration_lock = threading.RLock()
+# the thread that runs the asynchronous enumerations in order
+async_executor = None
+
+
+
+def ResetProgress():
+    """
+    Reset the progress counters before an enumeration, keeping a cancellation that the running
+    asynchronous enumeration requested before it reached the C++ code
+    """
+    CppResetProgress(running_future is not None and running_future.cancel_requested)
+
+
+
+def ReportResumedRoots():
+    """
+    Report the roots that the last enumeration skipped since they were complete in its certificate file
+    """
+    sys.stdout.write('Resumed {} of {} roots complete in the certificate file\n'.format(CppRootsResumed(), CppRootsResumed() + CppRootsTotal()))
+    sys.stdout.flush()
+
+
+
+def CacheStatistics():
+    """
+    Return the number of hits and misses of the canonical cache in the last enumeration of this
+    process (both zero if the enumeration did not use the cache)
+    """
+    return CppCacheHits(), CppCacheMisses()
+
+
+
+def SerializeEnumeration(function):
+    """
+    Return the blocking enumeration function that waits for any other enumeration in this process
+    (e.g., a running asynchronous enumeration) before it sets the global flags
+
+    @param function: the blocking enumeration function
+    """
+    @functools.wraps(function)
+    def SerializedEnumeration(*args, **kwargs):
+        with enumeration_lock:
+            return function(*args, **kwargs)
+
+    return SerializedEnumeration
+
+
+
+def CheckMotifSize(k):
+    """
+    Raise a ValueError for motif sizes that the enumeration does not support
+
+    @parak k: the motif subgraph size
+    """
+    if k < 1 or k > MAX_MOTIF_SIZE:
+        raise ValueError('Motif size {} is not between 1 and {}'.format(k, MAX_MOTIF_SIZE))
 
 
 
-def CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, write_subgraphs):
+def CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, write_subgraphs, prefix = None):
     """
     Create the directory structure for enumeration. Return the tmp directory name.
 
@@ -39,6 +143,7 @@ def CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, commu
     @param edge_colored: a boolean flag to allow for edge colors
     @param community_based: a boolean flag to only enumerate subgraphs in the same community
     @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param prefix: the prefix of the graph if already known (otherwise read from input_filename)
     """
     # make sure that both vertex and edge colors are not both on
     assert (not vertex_colored or not edge_colored)
@@ -53,7 +158,7 @@ def CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, commu
     else: color_suffix = 'colorless'
 
     # get the prefix for the dataset
-    prefix = ReadPrefix(input_filename)
+    if prefix is None: prefix = ReadPrefix(input_filename)
 
     temp_directory = 'temp/{}-{}-{}'.format(prefix, community_suffix, color_suffix)
 
@@ -71,7 +176,34 @@ def CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, commu
 
 
 
-def EnumerateSubgraphsSequentially(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False):
+def CertificateExtension(binary_output):
+    """
+    Return the extension of the certificate files written with or without binary output
+
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+    """
+    if binary_output: return 'bin'
+    else: return 'txt'
+
+
+
+def CertificateFilenames(temp_directory, k):
+    """
+    Return the sorted text (.txt) and binary (.bin) certificate files in the temp directory
+
+    @param temp_directory: the temp directory from CreateDirectoryStructure
+    @parak k: the motif subgraph size
+    """
+    filenames = []
+    for binary_output in [False, True]:
+        filenames += glob.glob('{}/certificates/motif-size-{:03d}-*.{}'.format(temp_directory, k, CertificateExtension(binary_output)))
+
+    return sorted(filenames)
+
+
+
+@SerializeEnumeration
+def EnumerateSubgraphsSequentially(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, resume = False, binary_output = False):
     """
     Enumerate all subgraphs in the graph specified by input_filename
 
@@ -81,7 +213,12 @@ def EnumerateSubgraphsSequentially(input_filename, k, vertex_colored = False, ed
     @param edge_colored: a boolean flag to allow for edge colors
     @param community_based: a boolean flag to only enumerate subgraphs in the same community
     @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param threads: the number of threads that enumerate roots in parallel (sharing one copy of the graph)
+    @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
     """
+    CheckMotifSize(k)
+
     # make sure that if coloring is request, the graph is colored
     graph = ReadGraph(input_filename, header_only = True)
 
@@ -102,13 +239,34 @@ def EnumerateSubgraphsSequentially(input_filename, k, vertex_colored = False, ed
     CppSetCommunityBased(community_based)
     # set the write subgraphs flag
     CppSetWriteSubgraphs(write_subgraphs)
+    # set the number of threads
+    assert (threads >= 1)
+    CppSetThreads(threads)
+    # set the resume flag, the subgraphs of an interrupted root cannot be identified
+    assert (not resume or not write_subgraphs)
+    CppSetResume(resume)
+    # set the binary output flag
+    CppSetBinaryOutput(binary_output)
+
+    # cast the strings into character arrays that stay alive without the global interpreter lock
+    encoded_input_filename = input_filename.encode('utf-8')
+    encoded_temp_directory = temp_directory.encode('utf-8')
+    cdef const char *cpp_input_filename = encoded_input_filename
+    cdef const char *cpp_temp_directory = encoded_temp_directory
+    cdef short cpp_k = k
+
+    ResetProgress()
+
+    # enumerate the subgraph, other python threads run in the meantime
+    with nogil:
+        CppEnumerateSubgraphsSequentially(cpp_input_filename, cpp_temp_directory, cpp_k)
 
-    # enumerate the subgraph, cast the string into a character array
-    CppEnumerateSubgraphsSequentially(input_filename.encode('utf-8'), temp_directory.encode('utf-8'), k)
+    if resume: ReportResumedRoots()
 
 
 
-def EnumerateSubgraphsFromNodes(input_filename, k, nodes, output_suffix, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False):
+@SerializeEnumeration
+def EnumerateSubgraphsFromNodes(input_filename, k, nodes, output_suffix, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, resume = False, binary_output = False, image_filename = None):
     """
     Enumerate all subgraphs in the graph starting at the nodes array
 
@@ -120,7 +278,19 @@ def EnumerateSubgraphsFromNodes(input_filename, k, nodes, output_suffix, vertex_
     @param edge_colored: a boolean flag to allow for edge colors
     @param community_based: a boolean flag to only enumerate subgraphs in the same community
     @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param threads: the number of threads that enumerate roots in parallel (sharing one copy of the graph)
+    @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+    @param image_filename: attach to this graph image (from CreateGraphImage) instead of reading input_filename
     """
+    CheckMotifSize(k)
+
+    # attach to the shared image without decompressing the graph
+    if image_filename is not None:
+        session = EnumerationSession(input_filename, image_filename = image_filename)
+        session.EnumerateSubgraphsFromNodes(k, nodes, output_suffix, vertex_colored, edge_colored, community_based, write_subgraphs, threads, resume, binary_output)
+        return
+
     # make sure that if coloring is request, the graph is colored
     graph = ReadGraph(input_filename, header_only = True)
 
@@ -141,17 +311,555 @@ def EnumerateSubgraphsFromNodes(input_filename, k, nodes, output_suffix, vertex_
     CppSetCommunityBased(community_based)
     # set the write subgraphs flag
     CppSetWriteSubgraphs(write_subgraphs)
+    # set the number of threads
+    assert (threads >= 1)
+    CppSetThreads(threads)
+    # set the resume flag, the subgraphs of an interrupted root cannot be identified
+    assert (not resume or not write_subgraphs)
+    CppSetResume(resume)
+    # set the binary output flag
+    CppSetBinaryOutput(binary_output)
 
     # convert the array of nodes into a c array
-    nnodes = len(nodes)
+    cdef long nnodes = len(nodes)
     cdef np.ndarray[long, ndim=1, mode='c'] cpp_nodes = np.ascontiguousarray(nodes, dtype=ctypes.c_int64)
+    cdef long *cpp_nodes_data = <long *> cpp_nodes.data
+
+    # cast the strings into character arrays that stay alive without the global interpreter lock
+    encoded_input_filename = input_filename.encode('utf-8')
+    encoded_temp_directory = temp_directory.encode('utf-8')
+    cdef const char *cpp_input_filename = encoded_input_filename
+    cdef const char *cpp_temp_directory = encoded_temp_directory
+    cdef short cpp_k = k
+    cdef long cpp_output_suffix = output_suffix
 
-    # enumerate the subgraph, cast the string into a character array
-    CppEnumerateSubgraphsFromNodes(input_filename.encode('utf-8'), temp_directory.encode('utf-8'), k, &(cpp_nodes[0]), nnodes, output_suffix)
+    ResetProgress()
+
+    # enumerate the subgraph, other python threads run in the meantime
+    with nogil:
+        CppEnumerateSubgraphsFromNodes(cpp_input_filename, cpp_temp_directory, cpp_k, cpp_nodes_data, nnodes, cpp_output_suffix)
 
     # free memory
     del cpp_nodes
 
+    if resume: ReportResumedRoots()
+
+
+
+def CreateGraphImage(input_filename, image_filename):
+    """
+    Write the compressed graph as a flat read only image that processes attach to without copies
+
+    @param input_filename: location for the graph to enumerate
+    @param image_filename: location for the image (e.g., in /dev/shm)
+    """
+    session = EnumerationSession(input_filename)
+    session.WriteImage(image_filename)
+
+
+
+def CreateGraphSidecar(input_filename):
+    """
+    Write the uncompressed sidecar (.graph.csr) next to the graph. Every later enumeration of
+    input_filename maps the sidecar instead of decompressing the graph until the graph changes.
+
+    @param input_filename: location for the graph to enumerate
+    """
+    sidecar_filename = GraphSidecarFilename(input_filename)
+
+    # read the graph itself rather than a stale sidecar
+    if os.path.exists(sidecar_filename): os.remove(sidecar_filename)
+
+    CreateGraphImage(input_filename, sidecar_filename)
+
+
+
+def EnumerateSubgraphsParallel(input_filename, k, nworkers, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, chunks_per_worker = 4, retries = 2, resume = False, shared_image = False, binary_output = False):
+    """
+    Enumerate all subgraphs in the graph specified by input_filename with a pool of processes and
+    combine the results. The combined certificates match those of the sequential enumeration.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param nworkers: the number of processes that enumerate in parallel
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param chunks_per_worker: the number of chunks of roots per process (more chunks balance better)
+    @param retries: the number of times to rerun a chunk whose process fails
+    @param resume: continue an interrupted run with the same nworkers and chunks_per_worker
+    @param shared_image: read the graph once into an image in /dev/shm that all processes attach to
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+    """
+    CheckMotifSize(k)
+    # the graph cannot be both vertex and edge colored
+    assert (not vertex_colored or not edge_colored)
+    assert (nworkers >= 1)
+
+    # read the graph (only vertices as an array)
+    graph, vertices, _ = ReadGraph(input_filename, vertices_only = True, arrays = True)
+
+    # create the temp directory if it does not exist
+    temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, write_subgraphs)
+
+    # remove the output of previous runs for this motif size since all files are combined
+    if not resume:
+        for filename in CertificateFilenames(temp_directory, k):
+            os.remove(filename)
+
+    # the chunks are consecutive roots in the order of the sequential enumeration so that the
+    # combined files list the certificates in the same order
+    nodes = np.sort(vertices['index'])
+    nchunks = max(min(nworkers * chunks_per_worker, len(nodes)), 1)
+    chunks = [chunk for chunk in np.array_split(nodes, nchunks) if len(chunk)]
+    nchunks = len(chunks)
+
+    # the keyword arguments shared by all chunks
+    kwargs = {
+        'vertex_colored': vertex_colored,
+        'edge_colored': edge_colored,
+        'community_based': community_based,
+        'write_subgraphs': write_subgraphs,
+        'resume': resume,
+        'binary_output': binary_output,
+    }
+
+    # the processes attach to one image of the graph rather than each reading their own copy
+    image_filename = None
+    if shared_image:
+        if os.path.isdir('/dev/shm'): image_directory = '/dev/shm'
+        else: image_directory = temp_directory
+        image_filename = '{}/{}-{}.graph.csr'.format(image_directory, graph.prefix, os.getpid())
+
+        CreateGraphImage(input_filename, image_filename)
+        kwargs['image_filename'] = image_filename
+
+    try:
+        RunChunks([((input_filename, k, chunks[chunk], chunk), kwargs) for chunk in range(nchunks)], nworkers, retries)
+    finally:
+        if image_filename is not None: os.remove(image_filename)
+
+    # combine the certificates from all of the chunks
+    CombineEnumeratedSubgraphs(input_filename, k, vertex_colored, edge_colored, community_based)
+
+
+
+def RunChunks(chunks, nworkers, retries):
+    """
+    Run EnumerateSubgraphsFromNodes for every chunk with at most nworkers processes at a time.
+    The chunks start in order as processes become idle.
+
+    @param chunks: the positional and keyword arguments to EnumerateSubgraphsFromNodes for every chunk
+    @param nworkers: the number of processes that enumerate in parallel
+    @param retries: the number of times to rerun a chunk whose process fails
+    """
+    nchunks = len(chunks)
+    pending = list(range(nchunks))
+    running = {}
+    failures = [0 for _ in range(nchunks)]
+
+    while len(pending) or len(running):
+        # start a process for the next chunks if there are idle workers
+        while len(pending) and len(running) < nworkers:
+            chunk = pending.pop(0)
+
+            args, kwargs = chunks[chunk]
+
+            # retries continue after the roots that the failed process completed
+            chunk_kwargs = dict(kwargs)
+            if failures[chunk] and not kwargs.get('write_subgraphs', False): chunk_kwargs['resume'] = True
+
+            process = multiprocessing.Process(target = EnumerateSubgraphsFromNodes, args = args, kwargs = chunk_kwargs)
+            process.start()
+
+            running[chunk] = process
+
+        # wait for at least one process to finish
+        multiprocessing.connection.wait([process.sentinel for process in running.values()])
+
+        for chunk, process in list(running.items()):
+            if process.is_alive(): continue
+
+            process.join()
+            del running[chunk]
+
+            # rerun the chunks that fail
+            if process.exitcode:
+                failures[chunk] += 1
+                if failures[chunk] > retries:
+                    for remaining_process in running.values():
+                        remaining_process.terminate()
+                    raise Exception('Chunk {} failed with exit code {} after {} attempts'.format(chunk, process.exitcode, failures[chunk]))
+
+                sys.stdout.write('Chunk {} failed with exit code {}, retrying...\n'.format(chunk, process.exitcode))
+                sys.stdout.flush()
+
+                pending.append(chunk)
+
+
+
+class EnumerationFuture(concurrent.futures.Future):
+    """
+    Future for an asynchronous enumeration that is also awaitable in an asyncio event loop.
+    Cancelling a running enumeration stops it after the roots in progress, the certificate file
+    keeps the finished roots (so the enumeration can resume), and the future raises CancelledError.
+    """
+    def __init__(self):
+        super(EnumerationFuture, self).__init__()
+
+        self.cancel_requested = False
+        self.progress = (0, 0, 0)
+
+
+
+    def cancel(self):
+        """
+        Cancel the enumeration. Returns True if the enumeration never started, and otherwise asks
+        a running enumeration to stop after the roots in progress and returns False.
+        """
+        with running_future_lock:
+            # pending enumerations never start
+            if super(EnumerationFuture, self).cancel(): return True
+
+            if self is running_future:
+                self.cancel_requested = True
+                CppCancelEnumeration()
+
+        return False
+
+
+
+    def Progress(self):
+        """
+        Return the number of finished roots, the number of roots and the number of subgraphs
+        enumerated so far (in finished roots and parts of roots)
+        """
+        if self is running_future: return (CppRootsFinished(), CppRootsTotal(), CppSubgraphsFinished())
+
+        return self.progress
+
+
+
+    def __await__(self):
+        """
+        Wait for the enumeration in the running asyncio event loop
+        """
+        return asyncio.wrap_future(self).__await__()
+
+
+
+def RunEnumerationFuture(future, function, args, kwargs):
+    """
+    Run the enumeration for a future in the thread of the asynchronous executor
+
+    @param future: the EnumerationFuture for this enumeration
+    @param function: the blocking enumeration function
+    @param args: the positional arguments to the function
+    @param kwargs: the keyword arguments to the function
+    """
+    global running_future
+
+    # blocking enumerations in other threads finish first
+    with enumeration_lock:
+        # a cancellation either stops the future from starting or finds it running
+        with running_future_lock:
+            if not future.set_running_or_notify_cancel(): return
+
+            running_future = future
+
+        try:
+            function(*args, **kwargs)
+        except BaseException as exception:
+            with running_future_lock:
+                running_future = None
+            future.set_exception(exception)
+            return
+
+        future.progress = (CppRootsFinished(), CppRootsTotal(), CppSubgraphsFinished())
+        cancelled = CppEnumerationCancelled()
+        with running_future_lock:
+            running_future = None
+
+    # a cancellation that arrives after the last root does not discard the results
+    roots_finished, nroots, _ = future.progress
+    if cancelled and roots_finished < nroots:
+        future.set_exception(concurrent.futures.CancelledError('Enumeration cancelled after {} of {} roots'.format(roots_finished, nroots)))
+    else:
+        future.set_result(future.progress)
+
+
+
+def SubmitEnumeration(function, args, kwargs):
+    """
+    Queue a blocking enumeration function in the asynchronous executor and return its future
+
+    @param function: the blocking enumeration function
+    @param args: the positional arguments to the function
+    @param kwargs: the keyword arguments to the function
+    """
+    global async_executor
+
+    # enumerations run one at a time in one thread since they share the global flags
+    if async_executor is None:
+        async_executor = concurrent.futures.ThreadPoolExecutor(max_workers = 1)
+
+    future = EnumerationFuture()
+    async_executor.submit(RunEnumerationFuture, future, function, args, kwargs)
+
+    return future
+
+
+
+def EnumerateSubgraphsAsync(input_filename, k, nodes = None, output_suffix = 0, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, resume = False, binary_output = False):
+    """
+    Start enumerating the subgraphs in the graph (or from the nodes) in a background thread without
+    holding the global interpreter lock. Returns an EnumerationFuture whose result is the progress
+    (roots finished, roots, subgraphs) once done. Enumerations queue behind each other, and the
+    blocking functions wait for a running asynchronous enumeration.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param nodes: an array of nodes to enumerate starting at (None for EnumerateSubgraphsSequentially)
+    @param output_suffix: a integer identifying a unique file to which to save the results (with nodes)
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param threads: the number of threads that enumerate roots in parallel (sharing one copy of the graph)
+    @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+    """
+    CheckMotifSize(k)
+
+    kwargs = {
+        'vertex_colored': vertex_colored,
+        'edge_colored': edge_colored,
+        'community_based': community_based,
+        'write_subgraphs': write_subgraphs,
+        'threads': threads,
+        'resume': resume,
+        'binary_output': binary_output,
+    }
+
+    if nodes is None: return SubmitEnumeration(EnumerateSubgraphsSequentially, (input_filename, k), kwargs)
+    else: return SubmitEnumeration(EnumerateSubgraphsFromNodes, (input_filename, k, nodes, output_suffix), kwargs)
+
+
+
+cdef class EnumerationSession:
+    """
+    Enumeration against a graph that is read once and kept in memory across calls. The methods
+    write the same files as the module level functions of the same name.
+    """
+    cdef CSRGraph *graph
+    cdef public object input_filename
+    cdef public object prefix
+    cdef public bool directed
+    cdef public bool vertex_colored
+    cdef public bool edge_colored
+
+
+
+    def __cinit__(self, input_filename, image_filename = None):
+        """
+        Read the graph and compress it for enumeration, or attach to an image of the compressed graph
+
+        @param input_filename: location for the graph to enumerate (names the output directories)
+        @param image_filename: location for an image from WriteImage or CreateGraphImage
+        """
+        encoded_input_filename = input_filename.encode('utf-8')
+        cdef const char *cpp_input_filename = encoded_input_filename
+
+        if image_filename is None:
+            with nogil:
+                self.graph = CppLoadGraph(cpp_input_filename)
+            if self.graph == NULL:
+                raise Exception('Failed to read graph: {}'.format(input_filename))
+        else:
+            self.graph = CppMapGraphImage(image_filename.encode('utf-8'))
+            if self.graph == NULL:
+                raise Exception('Failed to map graph image: {}'.format(image_filename))
+
+        self.input_filename = input_filename
+        self.prefix = self.graph.prefix.decode('utf-8')
+        self.directed = self.graph.directed
+        self.vertex_colored = self.graph.vertex_colored
+        self.edge_colored = self.graph.edge_colored
+
+
+
+    def __dealloc__(self):
+        """
+        Free the graph
+        """
+        if self.graph != NULL:
+            CppFreeGraph(self.graph)
+            self.graph = NULL
+
+
+
+    def NVertices(self):
+        """
+        Return the number of vertices in the graph
+        """
+        return self.graph.NVertices()
+
+
+
+    def NEdges(self):
+        """
+        Return the number of edges in the graph
+        """
+        return self.graph.NEdges()
+
+
+
+    def WriteImage(self, image_filename):
+        """
+        Write the compressed graph as an image that other sessions attach to without copies
+
+        @param image_filename: location for the image (e.g., in /dev/shm)
+        """
+        if not CppWriteGraphImage(self.graph, image_filename.encode('utf-8')):
+            raise Exception('Failed to write graph image: {}'.format(image_filename))
+
+
+
+    def SetFlags(self, vertex_colored, edge_colored, community_based, write_subgraphs, threads, resume, binary_output):
+        """
+        Verify the mode against the graph, set the global flags and return the temp directory
+
+        @param vertex_colored: a boolean flag to allow for vertex colors
+        @param edge_colored: a boolean flag to allow for edge colors
+        @param community_based: a boolean flag to only enumerate subgraphs in the same community
+        @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+        @param threads: the number of threads that enumerate roots in parallel
+        @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+        @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+        """
+        # make sure that if coloring is request, the graph is colored
+        if vertex_colored: assert (self.vertex_colored)
+        if edge_colored: assert (self.edge_colored)
+
+        # the graph cannot be both vertex and edge colored
+        assert (not vertex_colored or not edge_colored)
+
+        # create the temp directory if it does not exist
+        temp_directory = CreateDirectoryStructure(self.input_filename, vertex_colored, edge_colored, community_based, write_subgraphs, prefix = self.prefix)
+
+        CppSetVertexColored(vertex_colored)
+        CppSetEdgeColored(edge_colored)
+        CppSetCommunityBased(community_based)
+        CppSetWriteSubgraphs(write_subgraphs)
+        assert (threads >= 1)
+        CppSetThreads(threads)
+        assert (not resume or not write_subgraphs)
+        CppSetResume(resume)
+        CppSetBinaryOutput(binary_output)
+
+        return temp_directory
+
+
+
+    @SerializeEnumeration
+    def EnumerateSubgraphsSequentially(self, k, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, resume = False, binary_output = False):
+        """
+        Enumerate all subgraphs in the graph
+
+        @parak k: the motif subgraph size to find
+        @param vertex_colored: a boolean flag to allow for vertex colors
+        @param edge_colored: a boolean flag to allow for edge colors
+        @param community_based: a boolean flag to only enumerate subgraphs in the same community
+        @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+        @param threads: the number of threads that enumerate roots in parallel
+        @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+        @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+        """
+        CheckMotifSize(k)
+
+        temp_directory = self.SetFlags(vertex_colored, edge_colored, community_based, write_subgraphs, threads, resume, binary_output)
+
+        encoded_temp_directory = temp_directory.encode('utf-8')
+        cdef const char *cpp_temp_directory = encoded_temp_directory
+        cdef CSRGraph *graph = self.graph
+        cdef short cpp_k = k
+
+        ResetProgress()
+
+        with nogil:
+            CppEnumerateSubgraphsSequentiallyInGraph(graph, cpp_temp_directory, cpp_k)
+
+        if resume: ReportResumedRoots()
+
+
+
+    def EnumerateSubgraphsAsync(self, k, nodes = None, output_suffix = 0, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, resume = False, binary_output = False):
+        """
+        Start enumerating the subgraphs in the graph (or from the nodes) in a background thread and
+        return an EnumerationFuture (see the module function EnumerateSubgraphsAsync)
+
+        @parak k: the motif subgraph size to find
+        @param nodes: an array of nodes to enumerate starting at (None for EnumerateSubgraphsSequentially)
+        @param output_suffix: a integer identifying a unique file to which to save the results (with nodes)
+        @param vertex_colored: a boolean flag to allow for vertex colors
+        @param edge_colored: a boolean flag to allow for edge colors
+        @param community_based: a boolean flag to only enumerate subgraphs in the same community
+        @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+        @param threads: the number of threads that enumerate roots in parallel
+        @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+        @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+        """
+        CheckMotifSize(k)
+
+        args = (vertex_colored, edge_colored, community_based, write_subgraphs, threads, resume, binary_output)
+
+        if nodes is None: return SubmitEnumeration(self.EnumerateSubgraphsSequentially, (k,) + args, {})
+        else: return SubmitEnumeration(self.EnumerateSubgraphsFromNodes, (k, nodes, output_suffix) + args, {})
+
+
+
+    @SerializeEnumeration
+    def EnumerateSubgraphsFromNodes(self, k, nodes, output_suffix, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, resume = False, binary_output = False):
+        """
+        Enumerate all subgraphs in the graph starting at the nodes array
+
+        @parak k: the motif subgraph size to find
+        @param nodes: an array of nodes to enumerate starting at
+        @param output_suffix: a integer identifying a unique file to which to save the results
+        @param vertex_colored: a boolean flag to allow for vertex colors
+        @param edge_colored: a boolean flag to allow for edge colors
+        @param community_based: a boolean flag to only enumerate subgraphs in the same community
+        @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+        @param threads: the number of threads that enumerate roots in parallel
+        @param resume: skip the roots that are complete in the certificate file of an interrupted run and append the others
+        @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+        """
+        CheckMotifSize(k)
+
+        temp_directory = self.SetFlags(vertex_colored, edge_colored, community_based, write_subgraphs, threads, resume, binary_output)
+
+        # convert the array of nodes into a c array
+        cdef long nnodes = len(nodes)
+        cdef np.ndarray[long, ndim=1, mode='c'] cpp_nodes = np.ascontiguousarray(nodes, dtype=ctypes.c_int64)
+        cdef long *cpp_nodes_data = <long *> cpp_nodes.data
+
+        encoded_temp_directory = temp_directory.encode('utf-8')
+        cdef const char *cpp_temp_directory = encoded_temp_directory
+        cdef CSRGraph *graph = self.graph
+        cdef short cpp_k = k
+        cdef long cpp_output_suffix = output_suffix
+
+        ResetProgress()
+
+        with nogil:
+            CppEnumerateSubgraphsFromNodesInGraph(graph, cpp_temp_directory, cpp_k, cpp_nodes_data, nnodes, cpp_output_suffix)
+
+        # free memory
+        del cpp_nodes
+
+        if resume: ReportResumedRoots()
+
 
 
 def CombineEnumeratedSubgraphs(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False):
@@ -167,17 +875,17 @@ def CombineEnumeratedSubgraphs(input_filename, k, vertex_colored = False, edge_c
     # the graph cannot be both vertex and edge colored
     assert (not vertex_colored or not edge_colored)
 
-    # read the graph (only vertices)
-    graph = ReadGraph(input_filename, vertices_only = True)
+    # read the graph (only vertices as an array)
+    _, vertex_array, _ = ReadGraph(input_filename, vertices_only = True, arrays = True)
 
     # create the list of vertices
-    vertices = set(list(graph.vertices.keys()))
+    vertices = set(vertex_array['index'].tolist())
 
     # get the temp directory
     temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, False)
 
     # get a list of all the input filenames for this motif size
-    input_filenames = sorted(glob.glob('{}/certificates/motif-size-{:03d}-*.txt'.format(temp_directory, k)))
+    input_filenames = CertificateFilenames(temp_directory, k)
 
     # create a dictionary of certificates
     certificates = {}
@@ -191,6 +899,36 @@ def CombineEnumeratedSubgraphs(input_filename, k, vertex_colored = False, edge_c
         sys.stdout.write('Reading {}...'.format(input_filename))
         sys.stdout.flush()
 
+        # binary files are read as arrays of records
+        if input_filename.endswith('.bin'):
+            header, summaries, certificate_records = ReadCertificateRecords(input_filename)
+            assert (header['k'] == k)
+
+            # update the counter variables that verify correctness
+            total_nsubgraphs += int(np.sum(summaries['nsubgraphs']))
+            total_time += float(np.sum(summaries['time']))
+            for vertex in summaries['index'].tolist():
+                vertices.remove(vertex)
+
+            # add the counts of every certificate in the order that the certificates first appear (the
+            # keys compare as fixed width byte strings, which is much faster than unique rows)
+            keys = np.ascontiguousarray(certificate_records['key'])
+            _, first_indices, inverse = np.unique(keys.view('S{}'.format(keys.shape[1])).reshape(-1), return_index=True, return_inverse=True)
+            counts = np.zeros(len(first_indices), dtype=np.int64)
+            np.add.at(counts, inverse.reshape(-1), certificate_records['count'])
+
+            order = np.argsort(first_indices)
+            hex_certificates = CertificateHexStrings(keys[first_indices[order]], k, int(header['mode']))
+
+            for certificate, nsubgraphs in zip(hex_certificates, counts[order].tolist()):
+                if not certificate in certificates: certificates[certificate] = nsubgraphs
+                else: certificates[certificate] += nsubgraphs
+
+            sys.stdout.write('done in {:0.2f} seconds\n'.format(time.time() - start_time))
+            sys.stdout.flush()
+
+            continue
+
         # open the output file
         with open(input_filename, 'r') as fd:
             for certificate_line in fd:
@@ -0,0 +1,196 @@
+import heapq
+
+
+
+import numpy as np
+
+
+
+from subgraph_enumeration.data_structures.enumeration import MapVerticesToNeighborhoodSizes
+from subgraph_enumeration.kavosh.enumerate import CreateDirectoryStructure, CertificateFilenames
+from subgraph_enumeration.utilities.dataIO import ReadCertificateRecords
+
+
+
+def ReadRunningTimes(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False):
+    """
+    Return a mapping from vertices to their running times in previous enumerations
+
+    @param input_filename: location for the graph that was enumerated
+    @parak k: the motif subgraph size
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    """
+    # get the temp directory
+    temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, False)
+
+    # get a list of all the input filenames for this motif size
+    filenames = CertificateFilenames(temp_directory, k)
+
+    running_times = {}
+
+    for filename in filenames:
+        # binary files hold the times in the summary records
+        if filename.endswith('.bin'):
+            _, summaries, _ = ReadCertificateRecords(filename)
+
+            for vertex_index, time in zip(summaries['index'].tolist(), summaries['time'].tolist()):
+                running_times[vertex_index] = time
+
+            continue
+
+        with open(filename, 'r') as fd:
+            # only worry about the lines with Enumerated summaries
+            for line in fd:
+                if not line.startswith('Enumerated'): continue
+
+                segments = line.split()
+                vertex_index, time = int(segments[5]), float(segments[7])
+
+                running_times[vertex_index] = time
+
+    return running_times
+
+
+
+def ModelVertices(neighborhood_sizes, running_times):
+    """
+    Return the vertices with a measurable running time that constrain the neighborhood model, or an
+    empty list if there is not enough history to fit the model (and predictions are relative costs)
+
+    @param neighborhood_sizes: a mapping from vertices to the number of higher enumerated neighbors
+    @param running_times: a mapping from vertices to their running times (possibly empty)
+    """
+    vertices = [vertex_index for vertex_index in running_times if running_times[vertex_index] > 0 and vertex_index in neighborhood_sizes]
+
+    # the model needs at least two different neighborhood sizes
+    if len(vertices) < 2 or len(set(neighborhood_sizes[vertex_index] for vertex_index in vertices)) < 2: return []
+
+    return vertices
+
+
+
+def FitNeighborhoodModel(neighborhood_sizes, running_times, k):
+    """
+    Fit the running time of a vertex as a power of its neighborhood size. Returns the coefficients
+    (a, b) for log(time) = a + b * log(1 + size).
+
+    @param neighborhood_sizes: a mapping from vertices to the number of higher enumerated neighbors
+    @param running_times: a mapping from vertices to their running times (possibly empty)
+    @param k: the motif subgraph size
+    """
+    # only vertices with a measurable running time constrain the model
+    vertices = ModelVertices(neighborhood_sizes, running_times)
+    sizes = [neighborhood_sizes[vertex_index] for vertex_index in vertices]
+
+    # without enough history, there are roughly size^(k - 1) combinations below every root
+    if not len(vertices):
+        return 0.0, float(k - 1)
+
+    x = np.log1p(np.array(sizes, dtype=np.float64))
+    y = np.log(np.array([running_times[vertex_index] for vertex_index in vertices], dtype=np.float64))
+
+    b, a = np.polyfit(x, y, 1)
+
+    return a, b
+
+
+
+def PredictRunningTimes(graph, input_filename, k, vertex_colored = False, edge_colored = False, community_based = False):
+    """
+    Predict the running time of every vertex from previous timings when available and otherwise
+    from a model of the neighborhood sizes fitted to the previous timings. Without any previous
+    timings the predictions are relative costs rather than seconds.
+
+    @param graph: the input graph (with edges)
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    """
+    running_times = ReadRunningTimes(input_filename, k, vertex_colored, edge_colored, community_based)
+    neighborhood_sizes = MapVerticesToNeighborhoodSizes(graph, enumerated = True)
+
+    a, b = FitNeighborhoodModel(neighborhood_sizes, running_times, k)
+
+    predicted_times = {}
+    for vertex_index in graph.vertices.keys():
+        if vertex_index in running_times:
+            predicted_times[vertex_index] = running_times[vertex_index]
+        else:
+            predicted_times[vertex_index] = np.exp(a + b * np.log1p(neighborhood_sizes[vertex_index]))
+
+    return predicted_times
+
+
+
+def PredictRelativeCosts(neighborhood_sizes, k):
+    """
+    Predict the relative cost of every vertex as the roughly size^(k - 1) combinations below it,
+    the prediction of PredictRunningTimes without previous timings
+
+    @param neighborhood_sizes: a mapping from vertices to the number of higher enumerated neighbors
+    @parak k: the motif subgraph size
+    """
+    return {vertex_index: np.exp((k - 1) * np.log1p(neighborhood_size)) for vertex_index, neighborhood_size in neighborhood_sizes.items()}
+
+
+
+def PartitionVertices(predicted_times, nworkers):
+    """
+    Assign vertices to workers with the longest processing time first rule. Returns the vertices for
+    every worker (sorted by index) and the predicted time for every worker.
+
+    @param predicted_times: a mapping from vertices to their predicted running times
+    @param nworkers: the number of workers
+    """
+    # every worker starts with no load
+    loads = [(0.0, worker) for worker in range(nworkers)]
+    partitions = [[] for _ in range(nworkers)]
+
+    # assign the most expensive remaining vertex to the least loaded worker (ties by index)
+    for vertex_index in sorted(predicted_times.keys(), key = lambda vertex_index: (-predicted_times[vertex_index], vertex_index)):
+        load, worker = heapq.heappop(loads)
+
+        partitions[worker].append(vertex_index)
+        heapq.heappush(loads, (load + predicted_times[vertex_index], worker))
+
+    worker_times = [0.0 for _ in range(nworkers)]
+    for load, worker in loads:
+        worker_times[worker] = load
+
+    return [sorted(partition) for partition in partitions], worker_times
+
+
+
+def ScheduleVertices(graph, input_filename, k, nworkers, vertex_colored = False, edge_colored = False, community_based = False):
+    """
+    Create balanced lists of vertices for nworkers calls to EnumerateSubgraphsFromNodes
+
+    @param graph: the input graph (with edges)
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size
+    @param nworkers: the number of workers
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    """
+    predicted_times = PredictRunningTimes(graph, input_filename, k, vertex_colored, edge_colored, community_based)
+
+    partitions, worker_times = PartitionVertices(predicted_times, nworkers)
+
+    # compare against consecutive chunks of vertices with the same number of vertices
+    vertices = sorted(predicted_times.keys())
+    chunk_times = [sum(predicted_times[vertex_index] for vertex_index in chunk) for chunk in np.array_split(vertices, nworkers)]
+
+    wall_time = max(worker_times)
+    idle_cpu_time = sum(wall_time - worker_time for worker_time in worker_times)
+
+    print ('Predicted Schedule for {} Motif Size {}'.format(graph.prefix, k))
+    print ('  Wall Time: {:0.2f} minutes'.format(wall_time / 60))
+    print ('  Idle CPU Time: {:0.2f} hours'.format(idle_cpu_time / 3600))
+    print ('  Speedup over Consecutive Chunks: {:0.2f}x'.format(max(chunk_times) / max(wall_time, 1e-12)))
+
+    return partitions
@@ -20,17 +20,16 @@ extensions = [
     Extension(
         name = 'enumerate',
         include_dirs = [np.get_include(), nauty_dir],
-        libraries = ['bz2'],
+        libraries = ['bz2', 'z', 'lzma'],
+        define_macros = [('USE_TLS', None)],
         library_dirs = [nauty_dir],
-        sources = ['enumerate.pyx', 'cpp-enumerate.cpp', 'cpp-nauty.cpp', 'cpp-graph.cpp'],
+        sources = ['enumerate.pyx', 'cpp-enumerate.cpp', 'cpp-nauty.cpp', 'cpp-graph.cpp', 'cpp-certificate.cpp', 'cpp-cache.cpp', 'cpp-table.cpp'],
+        # the thread safe nauty library (make nautyT.a) since every worker thread calls nauty
         extra_objects = [
-            nauty_dir + '/' + 'nauty.o',
-            nauty_dir + '/' + 'nautil.o',
-            nauty_dir + '/' + 'naugraph.o',
-            nauty_dir + '/' + 'schreier.o',
-            nauty_dir + '/' + 'naurng.o',
+            nauty_dir + '/' + 'nautyT.a',
         ],
-        extra_compile_args = ['-O4', '-fPIC', '-std=c++0x'],
+        extra_compile_args = ['-O4', '-fPIC', '-std=c++0x', '-pthread'],
+        extra_link_args = ['-pthread'],
         language = 'c++'
     )
 ]
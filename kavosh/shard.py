@@ -0,0 +1,142 @@
+import os
+
+
+
+import numpy as np
+
+
+
+from subgraph_enumeration.data_structures.graph import Graph
+from subgraph_enumeration.utilities.dataIO import ReadGraph, WriteGraphArrays, VERTEX_DTYPE, EDGE_DTYPE
+
+
+
+def ShardVertices(graph, roots, k):
+    """
+    Return the vertices that belong to at least one subgraph of size k rooted at the roots. Every
+    vertex of such a subgraph has an enumeration index at least that of the root and is within
+    k - 1 hops of the root through these vertices.
+
+    @param graph: the input graph (with edges)
+    @param roots: the vertices that the shard enumerates from
+    @parak k: the motif subgraph size
+    """
+    vertices = set()
+
+    for root_index in roots:
+        threshold = graph.vertices[root_index].enumeration_index
+
+        # breadth first search through the vertices that subgraphs rooted here can contain
+        visited = set([root_index])
+        frontier = [root_index]
+        for _ in range(k - 1):
+            next_frontier = []
+
+            for vertex_index in frontier:
+                for neighbor_index in graph.vertices[vertex_index].neighbors:
+                    if neighbor_index in visited: continue
+                    if graph.vertices[neighbor_index].enumeration_index < threshold: continue
+
+                    visited.add(neighbor_index)
+                    next_frontier.append(neighbor_index)
+
+            frontier = next_frontier
+
+        vertices.update(visited)
+
+    return vertices
+
+
+
+def CreateShard(graph, roots, k):
+    """
+    Return the subgraph induced by the (k - 1)-hop neighborhoods of the roots. The shard keeps the
+    prefix, original indices, enumeration indices, communities, colors and type mappings so that
+    enumerating the roots in the shard gives the same certificates as in the entire graph.
+
+    @param graph: the input graph (with edges)
+    @param roots: the vertices that the shard enumerates from
+    @parak k: the largest motif subgraph size to enumerate in the shard
+    """
+    vertices = ShardVertices(graph, roots, k)
+
+    shard = Graph(graph.prefix, graph.directed, graph.vertex_colored, graph.edge_colored)
+
+    for vertex_index in sorted(vertices):
+        vertex = graph.vertices[vertex_index]
+        shard.AddVertex(vertex_index, vertex.enumeration_index, vertex.community, vertex.color)
+
+    # add every edge between two vertices in the shard once
+    for vertex_index in sorted(vertices):
+        for neighbor_index in sorted(graph.vertices[vertex_index].outgoing_neighbors):
+            if not neighbor_index in vertices: continue
+            # undirected edges appear as outgoing neighbors of both vertices
+            if not graph.directed and neighbor_index < vertex_index: continue
+
+            edge = graph.edges[(vertex_index, neighbor_index)]
+            shard.AddEdge(edge.source_index, edge.destination_index, edge.weight, edge.color)
+
+    # the number of edge types determines the certificates for edge colored motifs
+    shard.vertex_type_mapping = dict(graph.vertex_type_mapping)
+    shard.edge_type_mapping = dict(graph.edge_type_mapping)
+
+    return shard
+
+
+
+def ShardArrays(shard):
+    """
+    Return the structured arrays of vertices and edges of a shard with one record per edge. Undirected
+    graphs keep every edge under both directions, so only the direction that the edge stores is kept.
+
+    @param shard: the shard from CreateShard
+    """
+    vertices = np.fromiter(((vertex.index, vertex.enumeration_index, vertex.community, vertex.color) for vertex in shard.vertices.values()), dtype=VERTEX_DTYPE, count=shard.NVertices())
+
+    edges = [edge for (source_index, destination_index), edge in shard.edges.items() if source_index == edge.source_index and destination_index == edge.destination_index]
+    edges = np.fromiter(((edge.source_index, edge.destination_index, edge.weight, edge.color) for edge in edges), dtype=EDGE_DTYPE, count=len(edges))
+
+    return vertices, edges
+
+
+
+def ShardFilename(prefix, k, shard_index):
+    """
+    Return the location of a shard
+
+    @param prefix: the prefix of the graph
+    @parak k: the motif subgraph size
+    @param shard_index: the index of the shard
+    """
+    return 'shards/{}/motif-size-{:03d}-shard-{:08d}.graph.bz2'.format(prefix, k, shard_index)
+
+
+
+def WriteShards(input_filename, k, node_lists):
+    """
+    Write one shard for every list of nodes. EnumerateSubgraphsFromNodes with a shard as the input
+    filename writes the same certificates as with input_filename for the nodes (and motif sizes
+    up to k) to the same temp directory, so CombineEnumeratedSubgraphs(input_filename, ...) works
+    unchanged. Both directed and undirected graphs can be sharded. Returns the shard filenames.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the largest motif subgraph size to enumerate in the shards
+    @param node_lists: the nodes that every shard enumerates from (e.g., from ScheduleVertices)
+    """
+    graph = ReadGraph(input_filename)
+
+    os.makedirs('shards/{}'.format(graph.prefix), exist_ok = True)
+
+    shard_filenames = []
+    for shard_index, nodes in enumerate(node_lists):
+        shard = CreateShard(graph, nodes, k)
+
+        shard_filename = ShardFilename(graph.prefix, k, shard_index)
+        vertices, edges = ShardArrays(shard)
+        WriteGraphArrays(shard, vertices, edges, shard_filename)
+
+        print ('Shard {}: {} vertices ({:0.2f}%), {} edges'.format(shard_index, shard.NVertices(), 100 * shard.NVertices() / max(graph.NVertices(), 1), shard.NEdges()))
+
+        shard_filenames.append(shard_filename)
+
+    return shard_filenames
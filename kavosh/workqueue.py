@@ -0,0 +1,340 @@
+import os
+import sys
+import time
+import socket
+import multiprocessing
+
+
+
+import numpy as np
+
+
+
+from subgraph_enumeration.kavosh.enumerate import CheckMotifSize, CreateDirectoryStructure, CertificateExtension, CertificateFilenames, EnumerateSubgraphsFromNodes, CombineEnumeratedSubgraphs
+from subgraph_enumeration.utilities.dataIO import ReadGraph
+
+
+
+def QueueDirectory(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False):
+    """
+    Return the directory of the work queue for this graph and motif size. The queue lives next to the
+    certificates in the temp directory so every node on the shared filesystem finds it.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    """
+    temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, write_subgraphs)
+
+    return '{}/queue/motif-size-{:03d}'.format(temp_directory, k)
+
+
+
+def OutputFilenames(input_filename, k, output_suffix, vertex_colored = False, edge_colored = False, community_based = False, binary_output = False):
+    """
+    Return the certificate and subgraph filenames that EnumerateSubgraphsFromNodes writes for this suffix
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param output_suffix: the integer identifying the output files
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param binary_output: a boolean flag for binary certificate records (.bin) instead of text
+    """
+    temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, False)
+
+    certificate_filename = '{}/certificates/motif-size-{:03d}-output-{:08d}-certificates.{}'.format(temp_directory, k, output_suffix, CertificateExtension(binary_output))
+    subgraph_filename = '{}/subgraphs/motif-size-{:03d}-output-{:08d}-subgraphs.txt'.format(temp_directory, k, output_suffix)
+
+    return certificate_filename, subgraph_filename
+
+
+
+def CreateWorkQueue(input_filename, k, nchunks, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, node_lists = None, binary_output = False):
+    """
+    Create the work queue with one pending file of root vertices per chunk. Only one node should
+    create the queue, afterwards any number of workers can call RunWorkQueueWorker.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param nchunks: the number of chunks of consecutive root vertices
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param node_lists: optional lists of root vertices per chunk (e.g., from ScheduleVertices)
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text
+    """
+    CheckMotifSize(k)
+
+    queue_directory = QueueDirectory(input_filename, k, vertex_colored, edge_colored, community_based, write_subgraphs)
+    temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, write_subgraphs)
+
+    # the queue cannot be created twice
+    assert (not os.path.exists(queue_directory))
+
+    # remove the output of previous runs for this motif size since all files are combined
+    for filename in CertificateFilenames(temp_directory, k):
+        os.remove(filename)
+
+    # the chunks are consecutive roots in the order of the sequential enumeration by default
+    if node_lists is None:
+        _, vertices, _ = ReadGraph(input_filename, vertices_only = True, arrays = True)
+        nodes = np.sort(vertices['index'])
+
+        nchunks = max(min(nchunks, len(nodes)), 1)
+        node_lists = [chunk for chunk in np.array_split(nodes, nchunks) if len(chunk)]
+
+    # write the chunks in a temporary directory and move the whole queue into place at once
+    staging_directory = '{}.{}-{}'.format(queue_directory, socket.gethostname(), os.getpid())
+    for subdirectory in ['pending', 'leases', 'done', 'failed']:
+        os.makedirs('{}/{}'.format(staging_directory, subdirectory))
+
+    for chunk, node_list in enumerate(node_lists):
+        with open('{}/pending/chunk-{:08d}.txt'.format(staging_directory, chunk), 'w') as fd:
+            for node in node_list:
+                fd.write('{}\n'.format(node))
+
+    with open('{}/nchunks.txt'.format(staging_directory), 'w') as fd:
+        fd.write('{}\n'.format(len(node_lists)))
+
+    # every worker must write certificates in the same format
+    with open('{}/extension.txt'.format(staging_directory), 'w') as fd:
+        fd.write('{}\n'.format(CertificateExtension(binary_output)))
+
+    os.rename(staging_directory, queue_directory)
+
+
+
+def ReadChunk(filename):
+    """
+    Return the root vertices in a chunk file
+
+    @param filename: the pending, leased or done file for the chunk
+    """
+    with open(filename, 'r') as fd:
+        return np.array([int(line) for line in fd if line.strip()], dtype=np.int64)
+
+
+
+def ParseLease(filename):
+    """
+    Return the chunk and attempt from a lease filename (chunk-XXXXXXXX-attempt-XXXX.txt)
+
+    @param filename: the lease filename
+    """
+    segments = os.path.basename(filename).split('.')[0].split('-')
+
+    return int(segments[1]), int(segments[3])
+
+
+
+def ClaimChunk(queue_directory, lease_duration, retries):
+    """
+    Claim a pending chunk, or reclaim a chunk whose lease expired. Claims are atomic renames so at
+    most one worker holds every lease. Returns the lease filename or None if nothing can be claimed.
+
+    @param queue_directory: the directory of the work queue
+    @param lease_duration: the number of seconds without a heartbeat after which a lease expires
+    @param retries: the number of times a chunk is reclaimed before it fails
+    """
+    # claim the first pending chunk that no other worker claimed in the meantime
+    for filename in sorted(os.listdir('{}/pending'.format(queue_directory))):
+        chunk = int(filename.split('.')[0].split('-')[1])
+        lease_filename = '{}/leases/chunk-{:08d}-attempt-{:04d}.txt'.format(queue_directory, chunk, 0)
+
+        try:
+            os.rename('{}/pending/{}'.format(queue_directory, filename), lease_filename)
+        except FileNotFoundError:
+            continue
+
+        os.utime(lease_filename)
+
+        return lease_filename
+
+    # reclaim chunks whose worker stopped sending heartbeats
+    for filename in sorted(os.listdir('{}/leases'.format(queue_directory))):
+        previous_lease_filename = '{}/leases/{}'.format(queue_directory, filename)
+
+        try:
+            if time.time() - os.path.getmtime(previous_lease_filename) < lease_duration: continue
+        except FileNotFoundError:
+            continue
+
+        chunk, attempt = ParseLease(filename)
+
+        # chunks that keep failing are set aside
+        if attempt >= retries:
+            try:
+                os.rename(previous_lease_filename, '{}/failed/chunk-{:08d}.txt'.format(queue_directory, chunk))
+            except FileNotFoundError:
+                pass
+            continue
+
+        lease_filename = '{}/leases/chunk-{:08d}-attempt-{:04d}.txt'.format(queue_directory, chunk, attempt + 1)
+
+        try:
+            os.rename(previous_lease_filename, lease_filename)
+        except FileNotFoundError:
+            continue
+
+        os.utime(lease_filename)
+
+        return lease_filename
+
+    return None
+
+
+
+def RunWorkQueueWorker(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False, write_subgraphs = False, threads = 1, lease_duration = 600, heartbeat = 60, retries = 3, combine = True, binary_output = False):
+    """
+    Enumerate chunks from the work queue until it drains. Every chunk runs in a child process while
+    this process renews the lease, so a chunk of a crashed worker is reclaimed after its lease
+    expires. Leases compare modification times, so the clocks of all nodes should roughly agree.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    @param write_subgraphs: a boolean flag to write all enumerated subgraphs to disk
+    @param threads: the number of threads for every chunk
+    @param lease_duration: the number of seconds without a heartbeat after which a lease expires
+    @param heartbeat: the number of seconds between heartbeats (much smaller than lease_duration)
+    @param retries: the number of times a chunk is reclaimed before it fails
+    @param combine: combine the results if this worker finds the queue drained first
+    @param binary_output: write fixed width binary certificate records (.bin) instead of hexadecimal text (as in CreateWorkQueue)
+    """
+    queue_directory = QueueDirectory(input_filename, k, vertex_colored, edge_colored, community_based, write_subgraphs)
+
+    with open('{}/nchunks.txt'.format(queue_directory), 'r') as fd:
+        nchunks = int(fd.readline())
+
+    # workers cannot mix text and binary certificates in one queue
+    with open('{}/extension.txt'.format(queue_directory), 'r') as fd:
+        extension = fd.readline().strip()
+    if not extension == CertificateExtension(binary_output):
+        raise Exception('Work queue {} writes .{} certificates but binary_output is {}'.format(queue_directory, extension, binary_output))
+
+    kwargs = {
+        'vertex_colored': vertex_colored,
+        'edge_colored': edge_colored,
+        'community_based': community_based,
+        'write_subgraphs': write_subgraphs,
+        'threads': threads,
+        'binary_output': binary_output,
+    }
+
+    while True:
+        lease_filename = ClaimChunk(queue_directory, lease_duration, retries)
+
+        if lease_filename is None:
+            # the queue drained when there are no pending chunks and no leases
+            if not len(os.listdir('{}/pending'.format(queue_directory))) and not len(os.listdir('{}/leases'.format(queue_directory))): break
+
+            # wait for the other workers to finish (or their leases to expire)
+            time.sleep(heartbeat)
+            continue
+
+        chunk, attempt = ParseLease(lease_filename)
+        nodes = ReadChunk(lease_filename)
+
+        # every attempt writes to its own files so that abandoned attempts never collide
+        output_suffix = nchunks * (attempt + 1) + chunk
+
+        sys.stdout.write('Enumerating chunk {} (attempt {})...\n'.format(chunk, attempt))
+        sys.stdout.flush()
+
+        process = multiprocessing.Process(target = EnumerateSubgraphsFromNodes, args = (input_filename, k, nodes, output_suffix), kwargs = kwargs)
+        process.start()
+
+        # renew the lease until the chunk finishes
+        lost_lease = False
+        while process.is_alive():
+            process.join(heartbeat)
+
+            try:
+                os.utime(lease_filename)
+            except FileNotFoundError:
+                lost_lease = True
+                break
+
+        if lost_lease:
+            process.terminate()
+            process.join()
+
+        attempt_filenames = OutputFilenames(input_filename, k, output_suffix, vertex_colored, edge_colored, community_based, binary_output)
+        chunk_filenames = OutputFilenames(input_filename, k, chunk, vertex_colored, edge_colored, community_based, binary_output)
+
+        # another worker reclaimed this chunk
+        if lost_lease:
+            for filename in attempt_filenames:
+                if os.path.exists(filename): os.remove(filename)
+            continue
+
+        # expire the lease immediately so any worker can retry this chunk
+        if process.exitcode:
+            sys.stdout.write('Chunk {} failed with exit code {}\n'.format(chunk, process.exitcode))
+            sys.stdout.flush()
+
+            try:
+                os.utime(lease_filename, (0, 0))
+            except FileNotFoundError:
+                pass
+            continue
+
+        # every complete attempt has the same certificates, so publish the output before marking the chunk done
+        os.replace(attempt_filenames[0], chunk_filenames[0])
+        if write_subgraphs: os.replace(attempt_filenames[1], chunk_filenames[1])
+
+        try:
+            os.rename(lease_filename, '{}/done/chunk-{:08d}.txt'.format(queue_directory, chunk))
+        except FileNotFoundError:
+            pass
+
+    if len(os.listdir('{}/failed'.format(queue_directory))):
+        raise Exception('Chunks failed after {} retries: {}'.format(retries, sorted(os.listdir('{}/failed'.format(queue_directory)))))
+
+    # only the first worker to find the queue drained combines the results
+    if combine:
+        try:
+            os.close(os.open('{}/combined.txt'.format(queue_directory), os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+        except FileExistsError:
+            return
+
+        CombineWorkQueue(input_filename, k, vertex_colored, edge_colored, community_based)
+
+
+
+def CombineWorkQueue(input_filename, k, vertex_colored = False, edge_colored = False, community_based = False):
+    """
+    Combine the results of a drained work queue. Outputs of abandoned attempts are removed first.
+
+    @param input_filename: location for the graph to enumerate
+    @parak k: the motif subgraph size to find
+    @param vertex_colored: a boolean flag to allow for vertex colors
+    @param edge_colored: a boolean flag to allow for edge colors
+    @param community_based: a boolean flag to only enumerate subgraphs in the same community
+    """
+    queue_directory = QueueDirectory(input_filename, k, vertex_colored, edge_colored, community_based, False)
+    temp_directory = CreateDirectoryStructure(input_filename, vertex_colored, edge_colored, community_based, False)
+
+    with open('{}/nchunks.txt'.format(queue_directory), 'r') as fd:
+        nchunks = int(fd.readline())
+
+    # every chunk must be done
+    assert (len(os.listdir('{}/done'.format(queue_directory))) == nchunks)
+
+    # attempts have suffixes of at least nchunks and only remain if their worker crashed
+    for filename in CertificateFilenames(temp_directory, k):
+        segments = os.path.basename(filename).split('-')
+        if not segments[3] == 'output': continue
+
+        output_suffix = int(segments[4])
+        if output_suffix >= nchunks: os.remove(filename)
+
+    CombineEnumeratedSubgraphs(input_filename, k, vertex_colored, edge_colored, community_based)
@@ -1,6 +1,14 @@
+import os
 import bz2
+import lzma
+import zlib
 import pickle
 import struct
+import concurrent.futures
+
+
+
+import numpy as np
 
 
 
@@ -8,16 +16,209 @@ from subgraph_enumeration.data_structures.graph import Graph
 
 
 
-def ReadGraph(input_filename, header_only = False, vertices_only = False):
+# the records of the vertex (qqqh) and edge (qqdb) sections without padding
+VERTEX_DTYPE = np.dtype([('index', np.int64), ('enumeration_index', np.int64), ('community', np.int64), ('color', np.int16)])
+EDGE_DTYPE = np.dtype([('source_index', np.int64), ('destination_index', np.int64), ('weight', np.float64), ('color', np.int8)])
+
+# graph files of independently compressed blocks (see kavosh/cpp-graph.h) begin with the magic,
+# version, codec, number of blocks and decompressed size, followed by the compressed and decompressed
+# size of every block; files without the magic are a single bz2 stream
+GRAPH_BLOCKS_MAGIC = b'GRAPHBLK'
+GRAPH_BLOCKS_VERSION = 1
+GRAPH_BLOCKS_HEADER = '8sqqqq'
+GRAPH_CODECS = {
+    'bz2': (1, bz2.compress, bz2.decompress),
+    'zlib': (2, zlib.compress, zlib.decompress),
+    'lzma': (3, lzma.compress, lzma.decompress),
+}
+GRAPH_BLOCK_SIZE = 4 * 1024 * 1024
+
+# the number of bytes for the counts, flags and prefix at the start of every graph
+GRAPH_HEADER_SIZE = struct.calcsize('qq???128s')
+
+# the metadata sidecar (.graph.meta) holds the magic and version, the header and the type mappings
+GRAPH_METADATA_MAGIC = b'GRAPHMTA'
+GRAPH_METADATA_VERSION = 1
+
+# binary certificate files (see kavosh/cpp-certificate.h) begin with this header followed by one block
+# per root: a summary record and then the fixed width records of its packed certificates and counts
+CERTIFICATE_FILE_MAGIC = b'CERTRECS'
+CERTIFICATE_FILE_VERSION = 2
+CERTIFICATE_FILE_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', np.int64),
+    ('k', np.int64),
+    ('mode', np.int64),
+    ('key_width', np.int64),
+])
+CERTIFICATE_MODE_VERTEX_COLORED = 1
+CERTIFICATE_MODE_EDGE_COLORED = 2
+CERTIFICATE_MODE_COMMUNITY_BASED = 4
+CERTIFICATE_SUMMARY_DTYPE = np.dtype([('index', np.int64), ('nsubgraphs', np.int64), ('time', np.float64), ('nrecords', np.int64)])
+
+# the header of the uncompressed graph images that the enumeration maps (see kavosh/cpp-graph.h)
+GRAPH_IMAGE_MAGIC = b'CSRGRAPH'
+GRAPH_IMAGE_VERSION = 1
+GRAPH_IMAGE_ARRAYS = [
+    ('indices', np.int64),
+    ('enumeration_indices', np.int64),
+    ('communities', np.int64),
+    ('colors', np.int16),
+    ('index_order', np.int64),
+    ('outgoing_offsets', np.int64),
+    ('outgoing_neighbors', np.int64),
+    ('outgoing_colors', np.int8),
+    ('incoming_offsets', np.int64),
+    ('incoming_neighbors', np.int64),
+    ('neighbor_offsets', np.int64),
+    ('neighbors', np.int64),
+]
+GRAPH_IMAGE_HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'),
+    ('version', np.int64),
+    ('prefix', 'S128'),
+    ('directed', np.int64),
+    ('vertex_colored', np.int64),
+    ('edge_colored', np.int64),
+    ('nvertices', np.int64),
+    ('nedge_types', np.int64),
+    ('nbytes', np.int64),
+    ('offsets', np.int64, (len(GRAPH_IMAGE_ARRAYS),)),
+    ('lengths', np.int64, (len(GRAPH_IMAGE_ARRAYS),)),
+])
+
+
+
+def CompressGraphData(data, codec, block_size = GRAPH_BLOCK_SIZE, nthreads = None):
     """
-    Read a graph data structure from disk
+    Compress the contents of a graph file into independent blocks with several threads (the
+    compressors release the GIL)
+
+    @param data: the uncompressed contents of the graph file
+    @param codec: the codec for the blocks ('bz2', 'zlib' or 'lzma')
+    @param block_size: the number of uncompressed bytes in every block
+    @param nthreads: the number of threads (defaults to the number of cores)
+    """
+    assert (codec in GRAPH_CODECS)
+    assert (block_size > 0)
+
+    codec_index, compress, _ = GRAPH_CODECS[codec]
+
+    blocks = [data[offset:offset + block_size] for offset in range(0, len(data), block_size)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = nthreads) as executor:
+        compressed_blocks = list(executor.map(compress, blocks))
+
+    compressed_graph = [struct.pack(GRAPH_BLOCKS_HEADER, GRAPH_BLOCKS_MAGIC, GRAPH_BLOCKS_VERSION, codec_index, len(blocks), len(data))]
+    for block, compressed_block in zip(blocks, compressed_blocks):
+        compressed_graph.append(struct.pack('qq', len(compressed_block), len(block)))
+    compressed_graph += compressed_blocks
+
+    return b''.join(compressed_graph)
+
+
+
+def GraphBlocksDecompressor(codec_index):
+    """
+    Return the decompression function for the codec of a graph file with blocks
+
+    @param codec_index: the codec recorded in the graph file
+    """
+    for index, _, decompress in GRAPH_CODECS.values():
+        if index == codec_index: return decompress
+
+    raise Exception('Unknown graph codec {}'.format(codec_index))
+
+
+
+def DecompressGraphData(compressed_graph, nthreads = None):
+    """
+    Decompress the contents of a graph file with either a single bz2 stream or independent blocks
+
+    @param compressed_graph: the contents of the graph file
+    @param nthreads: the number of threads for files with blocks (defaults to the number of cores)
+    """
+    if not compressed_graph.startswith(GRAPH_BLOCKS_MAGIC):
+        return bz2.decompress(compressed_graph)
+
+    header_size = struct.calcsize(GRAPH_BLOCKS_HEADER)
+    _, version, codec_index, nblocks, nbytes = struct.unpack(GRAPH_BLOCKS_HEADER, compressed_graph[:header_size])
+    assert (version == GRAPH_BLOCKS_VERSION)
+
+    decompress = GraphBlocksDecompressor(codec_index)
+
+    sizes = np.frombuffer(compressed_graph, dtype=np.int64, count=2 * nblocks, offset=header_size).reshape(nblocks, 2)
+    assert (np.sum(sizes[:,1]) == nbytes)
+
+    # the blocks follow the table of sizes
+    offsets = header_size + 16 * nblocks + np.concatenate(([0], np.cumsum(sizes[:,0])))
+    assert (offsets[-1] == len(compressed_graph))
+
+    blocks = [compressed_graph[offsets[ib]:offsets[ib + 1]] for ib in range(nblocks)]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = nthreads) as executor:
+        data = b''.join(executor.map(decompress, blocks))
+
+    assert (len(data) == nbytes)
+
+    return data
+
+
+
+def DecompressGraphFile(input_filename, nbytes = None, chunk_size = 65536):
+    """
+    Decompress a graph file. With nbytes, decompress incrementally and stop once the first nbytes
+    are available (the result may be longer, or shorter for smaller graphs).
 
     @param input_filename: the filename where the graph data is stored
-    @param vertices_only: boolean flag that determines if edges are read
+    @param nbytes: the number of bytes needed from the start of the graph (None for all)
+    @param chunk_size: the number of compressed bytes to read at once from a single bz2 stream
     """
-    assert (input_filename.endswith('.graph.bz2'))
+    with open(input_filename, 'rb') as fd:
+        if nbytes is None: return DecompressGraphData(fd.read())
+
+        data = []
+        ndecompressed = 0
+
+        if fd.read(len(GRAPH_BLOCKS_MAGIC)) == GRAPH_BLOCKS_MAGIC:
+            fd.seek(0)
 
-    data = bz2.decompress(open(input_filename, 'rb').read())
+            header_size = struct.calcsize(GRAPH_BLOCKS_HEADER)
+            _, version, codec_index, nblocks, _ = struct.unpack(GRAPH_BLOCKS_HEADER, fd.read(header_size))
+            assert (version == GRAPH_BLOCKS_VERSION)
+
+            decompress = GraphBlocksDecompressor(codec_index)
+            sizes = np.frombuffer(fd.read(16 * nblocks), dtype=np.int64).reshape(nblocks, 2)
+
+            # the blocks are consecutive so read only as many as needed
+            for compressed_size, _ in sizes.tolist():
+                if ndecompressed >= nbytes: break
+
+                data.append(decompress(fd.read(compressed_size)))
+                ndecompressed += len(data[-1])
+        else:
+            fd.seek(0)
+
+            decompressor = bz2.BZ2Decompressor()
+            while ndecompressed < nbytes and not decompressor.eof:
+                chunk = fd.read(chunk_size)
+                if not len(chunk): raise Exception('Truncated graph file: {}'.format(input_filename))
+
+                data.append(decompressor.decompress(chunk))
+                ndecompressed += len(data[-1])
+
+    return b''.join(data)
+
+
+
+def ParseGraphHeader(data):
+    """
+    Return the graph (with only the header), the number of vertices and the number of edges from
+    the start of the decompressed graph
+
+    @param data: at least the first GRAPH_HEADER_SIZE bytes of the decompressed graph
+    """
+    assert (len(data) >= GRAPH_HEADER_SIZE)
 
     byte_index = 0
 
@@ -31,27 +232,17 @@ def ReadGraph(input_filename, header_only = False, vertices_only = False):
 
     prefix = prefix.decode().strip('\0')
 
-    graph = Graph(prefix, directed, vertex_colored, edge_colored)
+    return Graph(prefix, directed, vertex_colored, edge_colored), nvertices, nedges
 
-    if header_only: return graph
 
-    # read all the vertices and add them to the graph
-    for _ in range(nvertices):
-        index, enumeration_index, community, color, = struct.unpack('qqqh', data[byte_index:byte_index + 26])
-        byte_index += 26
 
-        graph.AddVertex(index, enumeration_index, community, color)
-
-    # if the flag to read only vertices is on, avoid reading edges
-    if vertices_only: return graph
-
-    # read all of the edges and add them to the graph
-    for _ in range(nedges):
-        source_index, destination_index, weight, color, = struct.unpack('qqdb', data[byte_index:byte_index + 25])
-        byte_index += 25
-
-        graph.AddEdge(source_index, destination_index, weight, color)
+def ParseTypeMappings(data, byte_index):
+    """
+    Return the vertex and edge type mappings that start at byte_index of the decompressed graph
 
+    @param data: the decompressed graph (or metadata)
+    @param byte_index: the location of the number of vertex types
+    """
     # read the vertex type mappings
     nvertex_types, = struct.unpack('q', data[byte_index:byte_index + 8])
     assert (nvertex_types <= 65536)
@@ -67,8 +258,6 @@ def ReadGraph(input_filename, header_only = False, vertices_only = False):
 
         vertex_type_mapping[index] = vertex_type.decode().strip('\0')
 
-    if graph.vertex_colored: graph.SetVertexTypeMapping(vertex_type_mapping)
-
     # read the edge type mappings
     nedge_types, = struct.unpack('q', data[byte_index:byte_index + 8])
     assert (nedge_types <= 7)
@@ -84,89 +273,310 @@ def ReadGraph(input_filename, header_only = False, vertices_only = False):
 
         edge_type_mapping[index] = edge_type.decode().strip('\0')
 
-    if graph.edge_colored: graph.SetEdgeTypeMapping(edge_type_mapping)
+    return vertex_type_mapping, edge_type_mapping
 
-    return graph
 
 
+def GraphMetadataFilename(input_filename):
+    """
+    Return the location of the metadata sidecar (.graph.meta) next to a graph
 
-def ReadPrefix(input_filename):
+    @param input_filename: the filename where the graph data is stored
     """
-    Read the prefix of a graph data structure from disk
+    assert (input_filename.endswith('.graph.bz2'))
+
+    return '{}.meta'.format(input_filename[:-len('.bz2')])
+
+
+
+def CreateGraphMetadata(input_filename):
+    """
+    Write the metadata sidecar with the counts, flags, prefix and type mappings of a graph. Header
+    reads then skip decompression and vertices_only reads include the type mappings.
+
+    @param input_filename: the filename where the graph data is stored
+    """
+    data = DecompressGraphFile(input_filename)
+
+    _, nvertices, nedges = ParseGraphHeader(data)
+
+    # the type mappings follow the vertex and edge sections
+    byte_index = GRAPH_HEADER_SIZE + nvertices * VERTEX_DTYPE.itemsize + nedges * EDGE_DTYPE.itemsize
+
+    metadata = b''.join([struct.pack('8sq', GRAPH_METADATA_MAGIC, GRAPH_METADATA_VERSION), data[:GRAPH_HEADER_SIZE], data[byte_index:]])
+
+    with open(GraphMetadataFilename(input_filename), 'wb') as fd:
+        fd.write(metadata)
+
+
+
+def ReadGraphMetadata(input_filename):
+    """
+    Read the metadata sidecar of a graph. Returns the graph (with only the header and the type
+    mappings), the number of vertices and the number of edges, or None if there is no metadata
+    at least as new as the graph.
+
+    @param input_filename: the filename where the graph data is stored
+    """
+    metadata_filename = GraphMetadataFilename(input_filename)
+
+    if not os.path.exists(metadata_filename): return None
+    if os.stat(metadata_filename).st_mtime_ns < os.stat(input_filename).st_mtime_ns: return None
+
+    with open(metadata_filename, 'rb') as fd:
+        data = fd.read()
+
+    magic, version = struct.unpack('8sq', data[:16])
+    if not magic == GRAPH_METADATA_MAGIC or not version == GRAPH_METADATA_VERSION:
+        raise Exception('Invalid graph metadata: {}'.format(metadata_filename))
+
+    graph, nvertices, nedges = ParseGraphHeader(data[16:])
+    vertex_type_mapping, edge_type_mapping = ParseTypeMappings(data, 16 + GRAPH_HEADER_SIZE)
+
+    # the mappings are only kept for colored graphs as in ReadGraph
+    if graph.vertex_colored: graph.vertex_type_mapping = vertex_type_mapping
+    if graph.edge_colored: graph.edge_type_mapping = edge_type_mapping
+
+    return graph, nvertices, nedges
+
+
+
+def ReadGraphHeader(input_filename):
+    """
+    Return the graph (with only the header), the number of vertices and the number of edges.
+    Uses the metadata sidecar (with the type mappings) if available and otherwise only decompresses
+    the start of the graph.
 
     @param input_filename: the filename where the graph data is stored
     """
     assert (input_filename.endswith('.graph.bz2'))
 
-    data = bz2.decompress(open(input_filename, 'rb').read())
+    metadata = ReadGraphMetadata(input_filename)
+    if metadata is not None: return metadata
 
-    byte_index = 0
+    return ParseGraphHeader(DecompressGraphFile(input_filename, GRAPH_HEADER_SIZE))
 
-    # read the basic attributes for the graph
-    nvertices, nedges, directed, vertex_colored, edge_colored = struct.unpack('qq???', data[byte_index:byte_index + 19])
-    byte_index += 19
 
-    # read the prefix
-    prefix, = struct.unpack('128s', data[byte_index:byte_index + 128])
-    byte_index += 128
 
-    prefix = prefix.decode().strip('\0')
+def ReadGraph(input_filename, header_only = False, vertices_only = False, arrays = False):
+    """
+    Read a graph data structure from disk
+
+    @param input_filename: the filename where the graph data is stored
+    @param header_only: boolean flag to only read the header (decompresses only the start of the graph)
+    @param vertices_only: boolean flag that determines if edges are read (decompresses only through
+    the vertices, with the type mappings only if there is a metadata sidecar)
+    @param arrays: return the graph (with only the header and type mappings) and the structured
+    arrays of vertices and edges (None if vertices_only) instead of adding them to the graph
+    """
+    assert (input_filename.endswith('.graph.bz2'))
+
+    if header_only or vertices_only:
+        graph, nvertices, nedges = ReadGraphHeader(input_filename)
+
+        if header_only: return graph
+
+        # only decompress the header and the vertices
+        data = DecompressGraphFile(input_filename, GRAPH_HEADER_SIZE + nvertices * VERTEX_DTYPE.itemsize)
+    else:
+        data = DecompressGraphFile(input_filename)
+
+        graph, nvertices, nedges = ParseGraphHeader(data)
+
+    byte_index = GRAPH_HEADER_SIZE
+
+    # read all the vertices at once
+    vertices = np.frombuffer(data, dtype=VERTEX_DTYPE, count=nvertices, offset=byte_index)
+    byte_index += nvertices * VERTEX_DTYPE.itemsize
+
+    if not arrays:
+        for index, enumeration_index, community, color in vertices.tolist():
+            graph.AddVertex(index, enumeration_index, community, color)
+
+    # if the flag to read only vertices is on, avoid reading edges (the type mappings come from the metadata if available)
+    if vertices_only:
+        if arrays: return graph, vertices, None
+        else: return graph
+
+    # read all of the edges at once
+    edges = np.frombuffer(data, dtype=EDGE_DTYPE, count=nedges, offset=byte_index)
+    byte_index += nedges * EDGE_DTYPE.itemsize
+
+    if not arrays:
+        for source_index, destination_index, weight, color in edges.tolist():
+            graph.AddEdge(source_index, destination_index, weight, color)
+
+    vertex_type_mapping, edge_type_mapping = ParseTypeMappings(data, byte_index)
+
+    if graph.vertex_colored and not arrays: graph.SetVertexTypeMapping(vertex_type_mapping)
+    elif graph.vertex_colored: graph.vertex_type_mapping = vertex_type_mapping
+
+    if graph.edge_colored and not arrays: graph.SetEdgeTypeMapping(edge_type_mapping)
+    elif graph.edge_colored: graph.edge_type_mapping = edge_type_mapping
+
+    if arrays: return graph, vertices, edges
+    else: return graph
+
+
+
+def ReadGraphImage(image_filename):
+    """
+    Memory map an uncompressed graph image (e.g., a sidecar or an image from CreateGraphImage).
+    Returns the graph (with only the header) and a dictionary of read only arrays: the vertices
+    in enumeration order (dense indices) with their original indices, enumeration indices,
+    communities and colors, index_order (dense indices by original index), and compressed sparse
+    rows (offsets and neighbors as dense indices) of the outgoing, incoming and all neighbors.
+
+    @param image_filename: the filename where the graph image is stored
+    """
+    data = np.memmap(image_filename, dtype=np.uint8, mode='r')
+    if len(data) < GRAPH_IMAGE_HEADER_DTYPE.itemsize:
+        raise Exception('Invalid graph image: {}'.format(image_filename))
+
+    header = np.frombuffer(data, dtype=GRAPH_IMAGE_HEADER_DTYPE, count=1)[0]
+    if not header['magic'] == GRAPH_IMAGE_MAGIC or not header['version'] == GRAPH_IMAGE_VERSION or not header['nbytes'] == len(data):
+        raise Exception('Invalid graph image: {}'.format(image_filename))
+
+    graph = Graph(header['prefix'].decode().strip('\0'), bool(header['directed']), bool(header['vertex_colored']), bool(header['edge_colored']))
+
+    # the arrays are views of the mapping without copies
+    arrays = {}
+    for (name, dtype), offset, length in zip(GRAPH_IMAGE_ARRAYS, header['offsets'], header['lengths']):
+        arrays[name] = np.frombuffer(data, dtype=dtype, count=int(length), offset=int(offset))
+
+    return graph, arrays
+
+
+
+def GraphSidecarFilename(input_filename):
+    """
+    Return the location of the uncompressed sidecar (.graph.csr) next to a graph
+
+    @param input_filename: the filename where the graph data is stored
+    """
+    assert (input_filename.endswith('.graph.bz2'))
+
+    return '{}.csr'.format(input_filename[:-len('.bz2')])
+
+
+
+def ReadGraphSidecar(input_filename):
+    """
+    Memory map the sidecar of a graph (see ReadGraphImage). Returns None if there is no sidecar
+    at least as new as the graph.
+
+    @param input_filename: the filename where the graph data is stored
+    """
+    sidecar_filename = GraphSidecarFilename(input_filename)
+
+    if not os.path.exists(sidecar_filename): return None
+    if os.stat(sidecar_filename).st_mtime_ns < os.stat(input_filename).st_mtime_ns: return None
+
+    return ReadGraphImage(sidecar_filename)
+
+
+
+def ReadPrefix(input_filename):
+    """
+    Read the prefix of a graph data structure from disk
 
-    return prefix
+    @param input_filename: the filename where the graph data is stored
+    """
+    graph, _, _ = ReadGraphHeader(input_filename)
 
+    return graph.prefix
 
 
-def WriteGraph(graph, output_filename):
+
+def WriteGraph(graph, output_filename, codec = None, block_size = GRAPH_BLOCK_SIZE, nthreads = None):
     """
     Write a graph to disk for later I/O access
 
     @param graph: the graph data structure to save to disk
     @param output_filename: the location to save the graph data structure
+    @param codec: compress independent blocks in parallel with this codec ('bz2', 'zlib' or 'lzma')
+    instead of writing a single bz2 stream
+    @param block_size: the number of uncompressed bytes in every block
+    @param nthreads: the number of threads that compress blocks (defaults to the number of cores)
     """
-    assert (output_filename.endswith('.graph.bz2'))
+    # convert the vertices and edges into structured arrays in the order of the dictionaries
+    vertices = np.fromiter(((vertex.index, vertex.enumeration_index, vertex.community, vertex.color) for vertex in graph.vertices.values()), dtype=VERTEX_DTYPE, count=len(graph.vertices))
+    edges = np.fromiter(((edge.source_index, edge.destination_index, edge.weight, edge.color) for edge in graph.edges.values()), dtype=EDGE_DTYPE, count=len(graph.edges))
+
+    WriteGraphSections(graph, vertices, edges, graph.NEdges(), output_filename, codec, block_size, nthreads)
+
+
+
+def WriteGraphArrays(graph, vertices, edges, output_filename, codec = None, block_size = GRAPH_BLOCK_SIZE, nthreads = None):
+    """
+    Write a graph from structured arrays of vertices and edges (e.g., from ReadGraph with arrays)
+
+    @param graph: the graph with the attributes and type mappings to save (its vertices and edges are ignored)
+    @param vertices: the structured array of vertices (VERTEX_DTYPE)
+    @param edges: the structured array of edges (EDGE_DTYPE)
+    @param output_filename: the location to save the graph data structure
+    @param codec: compress independent blocks in parallel with this codec instead of a single bz2 stream
+    @param block_size: the number of uncompressed bytes in every block
+    @param nthreads: the number of threads that compress blocks (defaults to the number of cores)
+    """
+    WriteGraphSections(graph, np.asarray(vertices, dtype=VERTEX_DTYPE), np.asarray(edges, dtype=EDGE_DTYPE), len(edges), output_filename, codec, block_size, nthreads)
+
 
-    # create a new compression object
-    compressor = bz2.BZ2Compressor()
+
+def WriteGraphSections(graph, vertices, edges, nedges, output_filename, codec = None, block_size = GRAPH_BLOCK_SIZE, nthreads = None):
+    """
+    Write the header, the vertex and edge sections and the type mappings of a graph
+
+    @param graph: the graph with the attributes and type mappings to save
+    @param vertices: the structured array of vertices (VERTEX_DTYPE)
+    @param edges: the structured array of edges (EDGE_DTYPE)
+    @param nedges: the number of edges in the header
+    @param output_filename: the location to save the graph data structure
+    @param codec: compress independent blocks in parallel with this codec instead of a single bz2 stream
+    @param block_size: the number of uncompressed bytes in every block
+    @param nthreads: the number of threads that compress blocks (defaults to the number of cores)
+    """
+    assert (output_filename.endswith('.graph.bz2'))
 
     # write the basic attributes for the graph to disk
-    nvertices = graph.NVertices()
-    nedges = graph.NEdges()
+    nvertices = len(vertices)
     directed = graph.directed
     vertex_colored = graph.vertex_colored
     edge_colored = graph.edge_colored
     prefix = graph.prefix
 
     # create an empty byte array which we will concatenate later
-    compressed_graph = []
-
-    compressed_graph.append(compressor.compress(struct.pack('qq???', nvertices, nedges, directed, vertex_colored, edge_colored)))
-    compressed_graph.append(compressor.compress(struct.pack('128s', prefix.encode())))
+    sections = []
 
-    # write all of the vertices and their attributes
-    for vertex in graph.vertices.values():
-        compressed_graph.append(compressor.compress(struct.pack('qqqh', vertex.index, vertex.enumeration_index, vertex.community, vertex.color)))
+    sections.append(struct.pack('qq???', nvertices, nedges, directed, vertex_colored, edge_colored))
+    sections.append(struct.pack('128s', prefix.encode()))
 
-    # write all of the edges and their attributes
-    for edge in graph.edges.values():
-        compressed_graph.append(compressor.compress(struct.pack('qqdb', edge.source_index, edge.destination_index, edge.weight, edge.color)))
+    # write all of the vertices and edges and their attributes at once
+    sections.append(vertices.tobytes())
+    sections.append(edges.tobytes())
 
     # write the vertex types
     nvertex_types = len(graph.vertex_type_mapping)
-    compressed_graph.append(compressor.compress(struct.pack('q', nvertex_types)))
+    sections.append(struct.pack('q', nvertex_types))
     for index, vertex_type in graph.vertex_type_mapping.items():
-        compressed_graph.append(compressor.compress(struct.pack('q128s', index, vertex_type.encode())))
+        sections.append(struct.pack('q128s', index, vertex_type.encode()))
 
     # write the edge types
     nedge_types = len(graph.edge_type_mapping)
-    compressed_graph.append(compressor.compress(struct.pack('q', nedge_types)))
+    sections.append(struct.pack('q', nedge_types))
     for index, edge_type in graph.edge_type_mapping.items():
-        compressed_graph.append(compressor.compress(struct.pack('q128s', index, edge_type.encode())))
+        sections.append(struct.pack('q128s', index, edge_type.encode()))
 
-    # flush the data
-    compressed_graph.append(compressor.flush())
+    if codec is None:
+        # compress a single bz2 stream
+        compressor = bz2.BZ2Compressor()
+        compressed_graph = [compressor.compress(section) for section in sections]
+        compressed_graph.append(compressor.flush())
 
-    # convert the array into a binary string - faster than native implementation
-    compressed_graph = b''.join(compressed_graph)
+        # convert the array into a binary string - faster than native implementation
+        compressed_graph = b''.join(compressed_graph)
+    else:
+        compressed_graph = CompressGraphData(b''.join(sections), codec, block_size, nthreads)
 
     # write the compressed string to file
     with open(output_filename, 'wb') as fd:
@@ -174,6 +584,91 @@ def WriteGraph(graph, output_filename):
 
 
 
+def CertificateRecordDtype(key_width):
+    """
+    Return the dtype of the certificate records in binary certificate files
+
+    @param key_width: the number of bytes in every packed certificate key
+    """
+    return np.dtype([('key', np.uint8, (key_width,)), ('count', np.uint32)])
+
+
+
+def ReadCertificateRecords(certificate_filename):
+    """
+    Read a binary certificate file written with binary_output. Returns the header, the summary of
+    every root (CERTIFICATE_SUMMARY_DTYPE) and the certificate records of all roots
+    (CertificateRecordDtype) in the order of the file.
+
+    @param certificate_filename: the location of the binary certificate file
+    """
+    data = np.fromfile(certificate_filename, dtype=np.uint8)
+
+    header_size = CERTIFICATE_FILE_HEADER_DTYPE.itemsize
+    if len(data) < header_size:
+        raise Exception('Invalid certificate file: {}'.format(certificate_filename))
+
+    header = data[:header_size].view(CERTIFICATE_FILE_HEADER_DTYPE)[0]
+    if not header['magic'] == CERTIFICATE_FILE_MAGIC or not header['version'] == CERTIFICATE_FILE_VERSION:
+        raise Exception('Invalid certificate file: {}'.format(certificate_filename))
+
+    record_dtype = CertificateRecordDtype(int(header['key_width']))
+    summary_size = CERTIFICATE_SUMMARY_DTYPE.itemsize
+    nrecords_offset = CERTIFICATE_SUMMARY_DTYPE.fields['nrecords'][1]
+
+    # every summary gives the number of certificate records before the next summary
+    summary_offsets = []
+    byte_index = header_size
+    while byte_index < len(data):
+        summary_offsets.append(byte_index)
+
+        nrecords, = struct.unpack_from('q', data, byte_index + nrecords_offset)
+        byte_index += summary_size + nrecords * record_dtype.itemsize
+
+    if not byte_index == len(data):
+        raise Exception('Truncated certificate file: {}'.format(certificate_filename))
+
+    # gather the bytes of the summaries and of the certificate records separately
+    summary_bytes = (np.array(summary_offsets, dtype=np.int64)[:,np.newaxis] + np.arange(summary_size)).reshape(-1)
+
+    is_record = np.ones(len(data), dtype=bool)
+    is_record[:header_size] = False
+    is_record[summary_bytes] = False
+
+    summaries = data[summary_bytes].view(CERTIFICATE_SUMMARY_DTYPE)
+    records = data[is_record].view(record_dtype)
+
+    return header, summaries, records
+
+
+
+def CertificateHexStrings(keys, k, mode):
+    """
+    Return the hexadecimal certificates (as in the text certificate files) for the packed keys of
+    binary certificate records
+
+    @param keys: the array of keys (one row of bytes per certificate)
+    @parak k: the motif subgraph size
+    @param mode: the mode of the certificate file header
+    """
+    keys = np.asarray(keys, dtype=np.uint8)
+
+    # only the edge colors are packed (four bits per edge in the order of the adjacency bits)
+    if mode & CERTIFICATE_MODE_EDGE_COLORED:
+        colors = np.empty((len(keys), 2 * (keys.shape[1] - k)), dtype=np.uint8)
+        colors[:,0::2] = keys[:,k:] & 15
+        colors[:,1::2] = keys[:,k:] >> 4
+
+        certificates = np.concatenate((keys[:,:k], colors), axis=1)
+        lengths = k + np.unpackbits(keys[:,:k], axis=1).sum(axis=1)
+    else:
+        certificates = keys
+        lengths = np.full(len(keys), keys.shape[1], dtype=np.int64)
+
+    return [certificate[:length].tobytes().hex() for certificate, length in zip(certificates, lengths.tolist())]
+
+
+
 def PickleData(data, filename):
     """
     Pickle the data and write to disk